@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس سرعة البوت كاملاً (قراءة، استعلام، استخراج، كتابة، حفظ التقدم) بدون إنترنت:
+VoterInquiryBot يعمل ضد الموقع المحلي (fake_inquiry_site.py) وشيت في الذاكرة،
+ويُطبع عدد الصفوف في الدقيقة وطلبات Google Sheets لكل تركيبة من عدد العمال وطريقة الاستعلام وإعدادات الانتظار
+
+الاستخدام:
+    python benchmarks/bench_end_to_end.py --rows 200 --workers 1,2,4 --backends http,selenium
+    python benchmarks/bench_end_to_end.py --latency 0.3 --failure-rate 0.05 --poll 0.25,0.1
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+import itertools
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import main as bot_module  # noqa: E402
+from fake_inquiry_site import FakeSiteServer  # noqa: E402
+from fake_sheets import FakeSheetsClient, synthetic_voters, seed_source_sheet  # noqa: E402
+from perf_trace import TRACER  # noqa: E402
+
+
+class BenchmarkBot(bot_module.VoterInquiryBot):
+    """نفس البوت مع شيت في الذاكرة بدلاً من Google Sheets"""
+
+    def __init__(self, client):
+        super().__init__()
+        self.bench_client = client
+
+    def connect_to_sheets(self):
+        self.gc = self.bench_client
+        self.spreadsheet = self.open_spreadsheet()
+
+
+def run_once(site, voters, workers, backend, poll, wait_timeout, rps, verbose):
+    """تشغيل واحد كامل في مجلد مؤقت (تقدم وذاكرة نتائج جديدة) ويرجع الصفوف في الدقيقة"""
+    settings = {
+        'INQUIRY_URL': site.inquiry_url,
+        'WORKER_COUNT': workers,
+        'QUERY_BACKEND': backend,
+        'MAX_REQUESTS_PER_SECOND': rps,
+        'OUTCOME_POLL_INTERVAL': poll,
+        'OUTCOME_WAIT_TIMEOUT': wait_timeout,
+        'RETRY_BASE_DELAY': 0.5,
+        'RETRY_MAX_DELAY': 2,
+        'PIPELINE_STATS_INTERVAL': 5,
+    }
+    previous = {name: getattr(bot_module, name) for name in settings}
+    cwd = os.getcwd()
+    lookups_before = site.counters.get('lookups', 0)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        for name, value in settings.items():
+            setattr(bot_module, name, value)
+        output = sys.stdout if verbose else io.StringIO()
+        bot = None
+        try:
+            client = FakeSheetsClient()
+            seed_source_sheet(client, bot_module.SPREADSHEET_ID, bot_module.SOURCE_SHEET, voters)
+            with contextlib.redirect_stdout(output):
+                bot = BenchmarkBot(client)
+                started = time.perf_counter()
+                bot.run()
+                elapsed = time.perf_counter() - started
+        finally:
+            if bot is not None:
+                bot.checkpoints.close()
+            for name, value in previous.items():
+                setattr(bot_module, name, value)
+            os.chdir(cwd)
+
+    results = client.spreadsheet(bot_module.SPREADSHEET_ID).sheet(bot_module.RESULTS_SHEET).rows
+    sheets_calls = client.stats.totals()['calls']
+    statuses = {}
+    for row_number, values in results.items():
+        if row_number > 1:
+            # صفوف "ليس له حق الانتخاب" تُكتب بعمود حالة فارغ (انظر format_result_row)
+            status = values[6] or 'no_voting_right'
+            statuses[status] = statuses.get(status, 0) + 1
+    written = sum(statuses.values())
+    summary = TRACER.summary()
+    return {
+        'rows': written,
+        'seconds': elapsed,
+        'rows_per_minute': written / elapsed * 60 if elapsed > 0 else 0.0,
+        'site_lookups': site.counters.get('lookups', 0) - lookups_before,
+        'sheets_calls': sheets_calls,
+        'p50': summary['total']['p50'],
+        'p95': summary['total']['p95'],
+        'statuses': statuses,
+    }
+
+
+def parse_list(value, cast):
+    return [cast(item) for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس سرعة البوت ضد الموقع المحلي")
+    parser.add_argument('--rows', type=int, default=100, help="عدد الصفوف في الشيت")
+    parser.add_argument('--duplicates', type=float, default=0.1, help="نسبة الأرقام المكررة")
+    parser.add_argument('--workers', default='1,2,4', help="أعداد العمال (مفصولة بفاصلة)")
+    parser.add_argument('--backends', default='http', help="selenium و/أو http")
+    parser.add_argument('--poll', default='0.25', help="فترات فحص النتيجة بالثواني (Selenium)")
+    parser.add_argument('--wait-timeout', type=float, default=20, help="أقصى انتظار للنتيجة (Selenium)")
+    parser.add_argument('--rps', type=float, default=0, help="حد الطلبات في الثانية (0 = بدون حد)")
+    parser.add_argument('--latency', type=float, default=0.5, help="متوسط زمن الاستعلام في الموقع المحلي")
+    parser.add_argument('--page-latency', type=float, default=0.1)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--captcha-rate', type=float, default=0.0)
+    parser.add_argument('--verbose', action='store_true', help="عرض مخرجات البوت")
+    args = parser.parse_args()
+
+    voters = synthetic_voters(args.rows, args.duplicates)
+    site = FakeSiteServer(
+        latency=args.latency,
+        page_latency=args.page_latency,
+        failure_rate=args.failure_rate,
+        captcha_rate=args.captcha_rate,
+    ).start()
+    print(f"الموقع المحلي: {site.inquiry_url} | {args.rows} صف | التأخير {args.latency} ثانية | "
+          f"أخطاء {args.failure_rate:.0%} | Captcha {args.captcha_rate:.0%}\n")
+
+    print(f"{'الطريقة':<10}{'العمال':>7}{'الفحص':>7}{'الصفوف':>8}{'الثواني':>9}"
+          f"{'صف/دقيقة':>10}{'طلبات':>7}{'Sheets':>8}{'p50':>7}{'p95':>7}  الحالات")
+    try:
+        polls = parse_list(args.poll, float)
+        combinations = [
+            (backend, workers, poll)
+            for backend, workers, poll in itertools.product(
+                parse_list(args.backends, str), parse_list(args.workers, int), polls
+            )
+            # فترة الفحص تخص انتظار المتصفح فقط
+            if backend == 'selenium' or poll == polls[0]
+        ]
+        for backend, workers, poll in combinations:
+            try:
+                result = run_once(site, voters, workers, backend, poll, args.wait_timeout, args.rps, args.verbose)
+            except Exception as e:
+                print(f"{backend:<10}{workers:>7}{poll:>7}  ✗ فشل التشغيل: {str(e)[:80]}")
+                continue
+            statuses = ', '.join(f"{status}={count}" for status, count in sorted(result['statuses'].items()))
+            print(f"{backend:<10}{workers:>7}{poll:>7}{result['rows']:>8}{result['seconds']:>9.1f}"
+                  f"{result['rows_per_minute']:>10.0f}{result['site_lookups']:>7}{result['sheets_calls']:>8}"
+                  f"{result['p50']:>7.2f}{result['p95']:>7.2f}  {statuses}")
+    finally:
+        site.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس سرعة ودقة استخراج البيانات من صفحات النتيجة المحفوظة (بدون متصفح):
+نفس خطوات query_election_data بعد الانتظار - تصنيف الصفحة ثم extract_voter_data -
+مع مقارنة الناتج بالنتيجة المتوقعة لكل صفحة (<اسم الصفحة>.json)
+
+يطبع عدد الصفحات في الثانية وأقصى ذاكرة يحجزها الاستخراج لكل صفحة،
+ويخرج برمز خطأ إذا اختلف أي ناتج أو تجاوز حداً محدداً (لاكتشاف التراجع)
+
+الاستخدام:
+    python benchmarks/bench_extraction.py [--iterations 200] [--min-rate 50] [--max-kb 2048]
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tracemalloc
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from extraction import PageSnapshot, classify_page_text, extract_voter_data  # noqa: E402
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+
+def load_corpus():
+    """الصفحات المحفوظة مع النتيجة المتوقعة لكل صفحة"""
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(PAGES_DIR, '*.html'))):
+        expected_path = path[:-len('.html')] + '.json'
+        if not os.path.exists(expected_path):
+            print(f"⚠️ لا توجد نتيجة متوقعة لـ {os.path.basename(path)} - سيتم قياس السرعة فقط")
+            expected = None
+        else:
+            with open(expected_path, 'r', encoding='utf-8') as f:
+                expected = json.load(f)
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        # النتيجة التي كانت مرحلة الانتظار ستحددها من نص الصفحة (خارج القياس)
+        outcome = classify_page_text(PageSnapshot(html).text)
+        corpus.append((os.path.basename(path), html, outcome, expected))
+    return corpus
+
+
+def extract(html, outcome):
+    trace = {}
+    result = extract_voter_data(html, outcome=outcome, trace=trace)
+    return result, trace.get('strategy')
+
+
+def diff(expected, actual):
+    """الحقول المختلفة بين النتيجة المتوقعة والفعلية"""
+    keys = sorted(set(expected) | set(actual))
+    return {key: (expected.get(key), actual.get(key)) for key in keys if expected.get(key) != actual.get(key)}
+
+
+def measure_rate(html, outcome, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        extract(html, outcome)
+    elapsed = time.perf_counter() - started
+    return iterations / elapsed if elapsed > 0 else 0.0
+
+
+def measure_memory(html, outcome):
+    """أقصى ذاكرة يحجزها استخراج صفحة واحدة بالكيلوبايت (tracemalloc)"""
+    tracemalloc.start()
+    try:
+        start_size, _ = tracemalloc.get_traced_memory()
+        extract(html, outcome)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (peak - start_size) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس سرعة ودقة استخراج البيانات")
+    parser.add_argument('--iterations', type=int, default=200, help="عدد مرات استخراج كل صفحة")
+    parser.add_argument('--min-rate', type=float, default=0, help="أقل عدد مقبول من الصفحات في الثانية")
+    parser.add_argument('--max-kb', type=float, default=0, help="أقصى ذاكرة مقبولة لكل صفحة بالكيلوبايت")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    if not corpus:
+        print(f"✗ لا توجد صفحات محفوظة في {PAGES_DIR}")
+        sys.exit(1)
+
+    failures = []
+    print(f"{'الصفحة':<24}{'الحالة':<18}{'الطريقة':<16}{'صفحة/ثانية':>12}{'ذاكرة KB':>10}  الدقة")
+    total_rate = 0.0
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        rows = []
+        for name, html, outcome, expected in corpus:
+            result, strategy = extract(html, outcome)
+            mismatch = diff(expected, result) if expected is not None else {}
+            rate = measure_rate(html, outcome, args.iterations)
+            peak_kb = measure_memory(html, outcome)
+            rows.append((name, result, strategy, rate, peak_kb, expected, mismatch))
+
+    for name, result, strategy, rate, peak_kb, expected, mismatch in rows:
+        total_rate += rate
+        if expected is None:
+            accuracy = "-"
+        elif mismatch:
+            accuracy = "✗"
+            failures.append(f"{name}: ناتج مختلف {mismatch}")
+        else:
+            accuracy = "✓"
+        if args.min_rate and rate < args.min_rate:
+            failures.append(f"{name}: {rate:.0f} صفحة/ثانية أقل من الحد {args.min_rate:.0f}")
+        if args.max_kb and peak_kb > args.max_kb:
+            failures.append(f"{name}: {peak_kb:.0f} KB أكثر من الحد {args.max_kb:.0f}")
+        print(f"{name:<24}{result['status']:<18}{strategy or '-':<16}{rate:>12.0f}{peak_kb:>10.0f}  {accuracy}")
+
+    print(f"{'المتوسط':<58}{total_rate / len(rows):>12.0f}")
+
+    if failures:
+        print("\n✗ تراجع في الاستخراج:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n✓ كل الصفحات مطابقة للنتائج المتوقعة")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس تكلفة تصنيف أسطر صفحة النتيجة لكل صفحة:
+الطريقة القديمة (فحص كل نمط على كل سطر) مقابل المطابق المجمع مسبقاً
+
+الاستخدام:
+    python benchmarks/bench_matcher.py [عدد_التكرارات]
+"""
+
+import os
+import sys
+import glob
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from extraction import (  # noqa: E402
+    PageSnapshot, PAGE_MATCHER,
+    CENTER_PATTERNS, ADDRESS_PATTERNS, COMMITTEE_PATTERNS, LIST_PATTERNS,
+    NO_VOTING_RIGHT_KEYWORDS, ERROR_KEYWORDS, CAPTCHA_KEYWORDS
+)
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+
+def classify_legacy(text, lines):
+    """الطريقة القديمة: فحص النص الكامل لكل مجموعة ثم كل نمط على كل سطر"""
+    found = set()
+    if any(keyword in text for keyword in NO_VOTING_RIGHT_KEYWORDS):
+        found.add('no_voting_right')
+    if any(keyword in text.lower() for keyword in ERROR_KEYWORDS):
+        found.add('error')
+    if any(keyword in text.lower() for keyword in CAPTCHA_KEYWORDS):
+        found.add('captcha')
+
+    groups = [
+        ('مركز_الانتخاب', CENTER_PATTERNS),
+        ('العنوان', ADDRESS_PATTERNS),
+        ('رقم_اللجنة_الفرعية', COMMITTEE_PATTERNS),
+        ('الرقم_في_الكشوف', LIST_PATTERNS),
+    ]
+    labels = []
+    for line in lines:
+        line_clean = line.strip()
+        labels.append({
+            field for field, patterns in groups
+            if any(pattern in line_clean for pattern in patterns)
+        })
+    return found, labels
+
+
+def classify_compiled(text, lines):
+    """المطابق المجمع: مرور واحد على النص الكامل يصنف الحالة وكل الأسطر معاً"""
+    return PAGE_MATCHER.classify_lines(text)
+
+
+def bench(func, text, lines, iterations):
+    """متوسط الوقت لكل صفحة بالميكروثانية"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func(text, lines)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    pages = sorted(glob.glob(os.path.join(PAGES_DIR, '*.html')))
+    if not pages:
+        print(f"✗ لا توجد صفحات محفوظة في {PAGES_DIR}")
+        sys.exit(1)
+
+    print(f"{'الصفحة':<24}{'قديم (µs)':>12}{'مجمع (µs)':>12}{'التسريع':>10}")
+    total_legacy = total_compiled = 0.0
+    for path in pages:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = PageSnapshot(f.read()).text
+        lines = text.split('\n')
+
+        legacy = bench(classify_legacy, text, lines, iterations)
+        compiled = bench(classify_compiled, text, lines, iterations)
+        total_legacy += legacy
+        total_compiled += compiled
+        print(f"{os.path.basename(path):<24}{legacy:>12.1f}{compiled:>12.1f}{legacy / compiled:>9.2f}x")
+
+    print(f"{'المتوسط':<24}{total_legacy / len(pages):>12.1f}{total_compiled / len(pages):>12.1f}"
+          f"{total_legacy / total_compiled:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+عدد طلبات Google Sheets (والخلايا والبايتات) لكل 1000 صف حسب طريقة القراءة والكتابة،
+باستخدام الشيت في الذاكرة (fake_sheets.py) ونفس كود البوت:
+- القراءة: get_voters_data (الورقة كاملة) مقابل iter_voters بأحجام صفحات مختلفة
+- الكتابة: write_result (طلب لكل صف) مقابل BufferedResultsWriter بأحجام دفعات مختلفة
+  (بترتيب الصفوف، وبترتيب عشوائي كما تصل النتائج من عدة عمال)
+
+الاستخدام:
+    python benchmarks/bench_sheets_calls.py [--rows 5000] [--batches 10,50,200,1000] [--pages 100,500,2000]
+"""
+
+import io
+import os
+import sys
+import random
+import argparse
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import main as bot_module  # noqa: E402
+from results_writer import BufferedResultsWriter, format_result_row  # noqa: E402
+from fake_sheets import FakeSheetsClient, synthetic_voters, seed_source_sheet  # noqa: E402
+
+SAMPLE_RESULT = {
+    'مركز_الانتخاب': 'مدرسة النصر الابتدائية رقم 12',
+    'العنوان': '45 شارع الجمهورية',
+    'رقم_اللجنة_الفرعية': '27',
+    'الرقم_في_الكشوف': '1432',
+    'status': 'success',
+    'error_message': '',
+}
+
+
+@contextlib.contextmanager
+def quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@contextlib.contextmanager
+def bot_in_tempdir(client):
+    """بوت بسجل تقدم جديد في مجلد مؤقت متصل بالشيت في الذاكرة"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        bot = bot_module.VoterInquiryBot()
+        try:
+            bot.gc = client
+            bot.spreadsheet = client.spreadsheet(bot_module.SPREADSHEET_ID)
+            yield bot
+        finally:
+            bot.checkpoints.close()
+            os.chdir(cwd)
+
+
+def new_client(voters):
+    client = FakeSheetsClient()
+    seed_source_sheet(client, bot_module.SPREADSHEET_ID, bot_module.SOURCE_SHEET, voters)
+    return client
+
+
+def read_full(voters):
+    client = new_client(voters)
+    with bot_in_tempdir(client) as bot, quiet():
+        bot.get_voters_data()
+    return client
+
+
+def read_paged(voters, page_size):
+    client = new_client(voters)
+    with bot_in_tempdir(client) as bot, quiet():
+        for _ in bot.iter_voters(page_size=page_size):
+            pass
+    return client
+
+
+def results_sheet(client, rows):
+    return client.spreadsheet(bot_module.SPREADSHEET_ID).seed(bot_module.RESULTS_SHEET, [], rows=rows + 10, cols=8)
+
+
+def result_rows(voters):
+    return [
+        (row_number, format_result_row(name, national_id, SAMPLE_RESULT))
+        for row_number, (national_id, name) in enumerate(voters, start=2)
+    ]
+
+
+def write_per_row(voters):
+    client = new_client(voters)
+    worksheet = results_sheet(client, len(voters))
+    rows = result_rows(voters)
+    with bot_in_tempdir(client) as bot, quiet():
+        for row_number, values in rows:
+            bot.write_result(worksheet, row_number, values[0], values[1], SAMPLE_RESULT)
+    return client
+
+
+def write_buffered(voters, batch_size, shuffle=False):
+    client = new_client(voters)
+    worksheet = results_sheet(client, len(voters))
+    rows = result_rows(voters)
+    if shuffle:
+        random.Random(1).shuffle(rows)
+    writer = BufferedResultsWriter(worksheet, batch_size=batch_size, flush_interval=3600)
+    with quiet():
+        for row_number, values in rows:
+            writer.add(row_number, values)
+        writer.flush()
+    return client
+
+
+def per_thousand(value, rows):
+    return value / rows * 1000
+
+
+def print_row(label, client, rows):
+    totals = client.stats.totals()
+    print(f"{label:<34}{totals['calls']:>8}{per_thousand(totals['calls'], rows):>12.1f}"
+          f"{per_thousand(totals['cells'], rows):>12.0f}{per_thousand(totals['bytes'], rows) / 1024:>12.1f}")
+
+
+def parse_list(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="عدد طلبات Google Sheets لكل 1000 صف")
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--batches', default='10,50,200,1000', help="أحجام دفعات الكتابة")
+    parser.add_argument('--pages', default='100,500,2000', help="أحجام صفحات القراءة")
+    args = parser.parse_args()
+
+    voters = synthetic_voters(args.rows)
+    print(f"{args.rows} صف في ورقة المصدر\n")
+    header = f"{'الطريقة':<34}{'الطلبات':>8}{'طلب/1000':>12}{'خلية/1000':>12}{'KB/1000':>12}"
+
+    print("القراءة")
+    print(header)
+    print_row("get_voters_data (الورقة كاملة)", read_full(voters), args.rows)
+    for page_size in parse_list(args.pages):
+        print_row(f"iter_voters صفحة {page_size}", read_paged(voters, page_size), args.rows)
+
+    print("\nالكتابة")
+    print(header)
+    print_row("write_result (طلب لكل صف)", write_per_row(voters), args.rows)
+    for batch_size in parse_list(args.batches):
+        print_row(f"دفعات {batch_size} بالترتيب", write_buffered(voters, batch_size), args.rows)
+        print_row(f"دفعات {batch_size} بترتيب عشوائي", write_buffered(voters, batch_size, shuffle=True), args.rows)
+
+
+if __name__ == "__main__":
+    main()
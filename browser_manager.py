@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+إدارة دورة حياة متصفح كل عامل: إعادة تشغيله بعد عدد محدد من الاستعلامات
+أو عند تجاوز استهلاك الذاكرة (Chrome وكل العمليات التابعة له)،
+وإعادة تشغيله تلقائياً إذا توقف عن الاستجابة
+"""
+
+import os
+import time
+import threading
+
+from metrics import METRICS
+
+# psutil اختياري - بدونه تتم قراءة الذاكرة من /proc مباشرة (Linux)
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def _proc_children():
+    """خريطة {pid الأب: [pids الأبناء]} من /proc"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # اسم العملية بين أقواس وقد يحتوي مسافات: الحقول تبدأ بعد آخر ')'
+                fields = f.read().rsplit(')', 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+
+def _proc_rss(pid):
+    """الذاكرة المستخدمة للعملية بالبايت من /proc/<pid>/statm"""
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def process_tree_rss(pid):
+    """مجموع الذاكرة (RSS) لعملية وكل العمليات التابعة لها بالميجابايت"""
+    if not pid:
+        return 0.0
+
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return 0.0
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+
+    if not os.path.isdir('/proc'):
+        return 0.0
+
+    children = _proc_children()
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        total += _proc_rss(current)
+        pending.extend(children.get(current, []))
+    return total / (1024 * 1024)
+
+
+def driver_pid(driver):
+    """pid الخاص بـ chromedriver (Chrome وعملياته تابعة له)"""
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+class DriverManager:
+    """
+    متصفح لكل عامل يُفتح عبر bot.setup_selenium() ويُعاد تشغيله عند:
+    - الوصول إلى max_queries استعلام في نفس الجلسة
+    - تجاوز ذاكرة Chrome لـ max_rss_mb (يتم الفحص كل memory_check_interval استعلام)
+    - توقف المتصفح عن الاستجابة بعد استعلام فاشل
+    """
+
+    def __init__(self, bot, max_queries=300, max_rss_mb=1500, memory_check_interval=20):
+        self.bot = bot
+        self.max_queries = max_queries
+        self.max_rss_mb = max_rss_mb
+        self.memory_check_interval = memory_check_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.sessions = 0
+        self.recycles = 0
+        self.crashes = 0
+        self.launch_seconds = 0.0
+        self.peak_rss_mb = 0.0
+
+    @property
+    def session(self):
+        """إحصائيات جلسة المتصفح الحالية لهذا العامل"""
+        return getattr(self._local, 'session', None)
+
+    def ensure(self):
+        """فتح متصفح العامل الحالي إذا لم يكن مفتوحاً"""
+        if self.bot.driver is None:
+            self.launch()
+        return self.bot.driver
+
+    def launch(self):
+        started = time.monotonic()
+        self.bot.setup_selenium()
+        launch_seconds = time.monotonic() - started
+
+        self._local.session = {
+            'number': None,
+            'launch_seconds': launch_seconds,
+            'queries': 0,
+            'peak_rss_mb': 0.0,
+        }
+        METRICS.inc('browser_sessions_total')
+        METRICS.observe('browser_launch', launch_seconds)
+        with self._lock:
+            self.sessions += 1
+            self.launch_seconds += launch_seconds
+            self._local.session['number'] = self.sessions
+
+    def is_responsive(self):
+        """هل لا يزال المتصفح يستجيب (بعد خطأ قد يكون بسبب توقف Chrome)"""
+        try:
+            self.bot.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def measure(self):
+        """قياس ذاكرة Chrome الحالية وتحديث القمة للجلسة وللتشغيل كاملاً"""
+        rss = process_tree_rss(driver_pid(self.bot.driver))
+        session = self.session
+        if session is not None:
+            session['peak_rss_mb'] = max(session['peak_rss_mb'], rss)
+        with self._lock:
+            self.peak_rss_mb = max(self.peak_rss_mb, rss)
+        METRICS.set_gauge('browser_peak_rss_mb', round(self.peak_rss_mb, 1))
+        return rss
+
+    def after_query(self, result):
+        """تحديث عداد الجلسة وإعادة تشغيل المتصفح إذا لزم الأمر"""
+        session = self.session
+        if self.bot.driver is None or session is None:
+            return
+        session['queries'] += 1
+
+        if result.get('retryable') and not self.is_responsive():
+            with self._lock:
+                self.crashes += 1
+            METRICS.inc('browser_restarts_total', reason='crash')
+            self.close("توقف المتصفح عن الاستجابة")
+            return
+
+        if session['queries'] >= self.max_queries:
+            self.recycle("الوصول للحد الأقصى للاستعلامات")
+            return
+
+        if session['queries'] % self.memory_check_interval == 0:
+            rss = self.measure()
+            if rss > self.max_rss_mb:
+                self.recycle(f"الذاكرة {rss:.0f} MB")
+
+    def recycle(self, reason):
+        """إغلاق الجلسة الحالية؛ جلسة جديدة تُفتح عند الاستعلام التالي"""
+        with self._lock:
+            self.recycles += 1
+        METRICS.inc('browser_restarts_total', reason='recycle')
+        self.close(reason)
+
+    def close(self, reason="انتهاء العمل"):
+        """إغلاق متصفح العامل الحالي مع طباعة إحصائيات الجلسة"""
+        driver = self.bot.driver
+        if driver is None:
+            return
+
+        session = self.session
+        if session is not None:
+            self.measure()
+            print(f"  🔄 إغلاق المتصفح #{session['number']} ({reason}): "
+                  f"{session['queries']} استعلام | التشغيل {session['launch_seconds']:.1f} ثانية | "
+                  f"أقصى ذاكرة {session['peak_rss_mb']:.0f} MB")
+
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        self.bot.driver = None
+        self._local.session = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions': self.sessions,
+                'recycles': self.recycles,
+                'crashes': self.crashes,
+                'avg_launch_seconds': round(self.launch_seconds / self.sessions, 2) if self.sessions else 0.0,
+                'peak_rss_mb': round(self.peak_rss_mb, 1),
+            }
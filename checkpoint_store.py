@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+سجل التقدم لكل صف (SQLite في وضع WAL) بدلاً من إعادة كتابة progress.json بالكامل
+كل صف يُسجل كـ pending عند قراءته ثم done بعد تأكيد كتابة نتيجته،
+والتسجيل يتم في معاملات مجمعة (fsync واحد لكل دفعة) وليس لكل صف
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+PENDING = 'pending'
+DONE = 'done'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (
+    row_number INTEGER PRIMARY KEY,
+    national_id TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+-- فهرس جزئي: الصفوف المعلقة فقط، فالبحث عنها يتناسب مع عددها وليس مع حجم الورقة
+CREATE INDEX IF NOT EXISTS rows_pending ON rows (row_number) WHERE status = 'pending';
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def store_files(path):
+    """ملف قاعدة البيانات والملفات المصاحبة لوضع WAL"""
+    return [path, f"{path}-wal", f"{path}-shm"]
+
+
+def read_summary(path):
+    """
+    ملخص التقدم من قاعدة البيانات (للقراءة فقط، يستخدمه الـ dashboard أثناء عمل البوت)
+    يرجع None إذا لم تكن القاعدة موجودة
+    """
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=5)
+    try:
+        return _summary(conn)
+    finally:
+        conn.close()
+
+
+def _summary(conn):
+    meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+    pending = conn.execute("SELECT COUNT(*) FROM rows WHERE status = ?", (PENDING,)).fetchone()[0]
+    return {
+        'last_row': int(meta.get('last_row', 0)),
+        'total_processed': int(meta.get('total_processed', 0)),
+        'pending': pending,
+        'read_cursor': int(meta.get('read_cursor', 2)),
+        'last_updated': meta.get('last_updated'),
+    }
+
+
+class CheckpointStore:
+    """سجل حالة كل صف مع عدادات الملخص في نفس المعاملة"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # FULL: كل commit يعمل fsync - والـ commit يتم مرة لكل دفعة
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def _get_meta(self, key, default):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value))
+        )
+
+    def is_empty(self):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM rows LIMIT 1").fetchone() is None
+
+    def migrate_progress_file(self, progress_file):
+        """
+        نقل التقدم من progress.json القديم (done_ranges أو last_row) مرة واحدة
+        ثم إعادة تسمية الملف حتى لا يُنقل مرة أخرى
+        """
+        if not os.path.exists(progress_file) or not self.is_empty():
+            return 0
+
+        with open(progress_file, 'r', encoding='utf-8') as f:
+            progress = json.load(f)
+
+        ranges = progress.get('done_ranges')
+        if ranges is None:
+            ranges = [[1, progress['last_row']]] if progress.get('last_row') else []
+
+        now = time.time()
+        with self._lock, self._conn:
+            migrated = 0
+            for start, end in ranges:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO rows (row_number, national_id, status, updated_at) VALUES (?, '', ?, ?)",
+                    ((row, DONE, now) for row in range(max(start, 2), end + 1))
+                )
+                migrated += max(0, end - max(start, 2) + 1)
+            self._set_meta('total_processed', progress.get('total_processed', 0))
+            self._set_meta('last_row', progress.get('last_row', 0))
+            self._set_meta('last_updated', progress.get('last_updated') or datetime.now().isoformat())
+
+        os.replace(progress_file, f"{progress_file}.migrated")
+        print(f"✓ تم نقل التقدم من {progress_file} ({migrated} صف منتهي)")
+        return migrated
+
+    @property
+    def read_cursor(self):
+        """أول صف في الورقة لم تتم قراءته بعد"""
+        with self._lock:
+            return int(self._get_meta('read_cursor', 2))
+
+    def done_rows_between(self, start, end):
+        """الصفوف المنتهية في نطاق (لتخطيها أثناء القراءة)"""
+        with self._lock:
+            return {
+                row for (row,) in self._conn.execute(
+                    "SELECT row_number FROM rows WHERE row_number BETWEEN ? AND ? AND status != ?",
+                    (start, end, PENDING)
+                )
+            }
+
+    def register_page(self, rows, next_cursor):
+        """
+        تسجيل صفوف صفحة مقروءة كـ pending وتقديم مؤشر القراءة في معاملة واحدة
+        rows: قائمة من (رقم_الصف, الرقم_القومي, الاسم)
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO rows (row_number, national_id, name, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                ((row, national_id, name, PENDING, now) for row, national_id, name in rows)
+            )
+            self._set_meta('read_cursor', next_cursor)
+
+    def pending_rows(self, before=None, page_size=500):
+        """
+        الصفوف المعلقة من تشغيل سابق بالترتيب (عبر الفهرس الجزئي - O(عدد المعلق))
+        يرجع (رقم_الصف, الرقم_القومي, الاسم) على دفعات حتى لا تُحمّل كلها في الذاكرة
+        """
+        after = 0
+        while True:
+            with self._lock:
+                page = self._conn.execute(
+                    "SELECT row_number, national_id, name FROM rows "
+                    "WHERE status = ? AND row_number > ? AND row_number < ? "
+                    "ORDER BY row_number LIMIT ?",
+                    (PENDING, after, before if before is not None else 2 ** 62, page_size)
+                ).fetchall()
+            if not page:
+                return
+            yield from page
+            after = page[-1][0]
+
+    def mark_done(self, row_numbers):
+        """تسجيل دفعة صفوف كمنتهية وتحديث العدادات في commit واحد"""
+        if not row_numbers:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO rows (row_number, national_id, status, updated_at) VALUES (?, '', ?, ?) "
+                "ON CONFLICT (row_number) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+                ((row, DONE, now) for row in row_numbers)
+            )
+            total = int(self._get_meta('total_processed', 0)) + len(row_numbers)
+            last_row = max(int(self._get_meta('last_row', 0)), max(row_numbers))
+            self._set_meta('total_processed', total)
+            self._set_meta('last_row', last_row)
+            self._set_meta('last_updated', datetime.now().isoformat())
+
+    def summary(self):
+        with self._lock:
+            return _summary(self._conn)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
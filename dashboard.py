@@ -7,43 +7,128 @@
 import os
 import json
 import time
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, Response, stream_with_context
 from datetime import datetime
+from collections import deque
 import threading
 import subprocess
 import sys
+from checkpoint_store import read_summary, store_files
+from source_sheets import parse_sources, source_file
+from metrics import render_prometheus
 
 app = Flask(__name__)
 
 PROGRESS_FILE = "progress.json"
+CHECKPOINT_DB = "checkpoints.db"
+# نفس القيم في main.py (بدون استيراده): لكل مصدر في SOURCES سجل تقدم خاص به
+SPREADSHEET_ID = "1-rCGPx6vyEMm3zmR7ks3xZh63XcJk4ks78e5e9jfuyo"
+SOURCE_SHEET = "Voters"
+RESULTS_SHEET = "نتائج_الاستعلام"
+SOURCES = parse_sources(os.environ.get('SOURCES', ''), SPREADSHEET_ID, SOURCE_SHEET, RESULTS_SHEET)
+PIPELINE_STATS_FILE = "pipeline_stats.json"
+METRICS_FILE = "bot_metrics.json"
+LOG_FILE = "bot_output.log"
 bot_process = None
 bot_thread = None
 
+# آخر أسطر السجل في الذاكرة (يملؤها run_bot) حتى لا يُعاد قراءة ملف السجل في كل تحديث
+LOG_BUFFER_LINES = 1000
+LOG_TAIL_BYTES = 64 * 1024  # أقصى حجم يُقرأ من نهاية ملف السجل عند عدم وجود أسطر في الذاكرة
+STREAM_STATUS_INTERVAL = 2  # الفترة بين كل فحص للتقدم في البث المباشر بالثواني
+STREAM_HEARTBEAT_INTERVAL = 15  # إرسال نبضة لإبقاء الاتصال مفتوحاً
+
+log_buffer = deque(maxlen=LOG_BUFFER_LINES)  # (رقم_السطر, السطر)
+log_condition = threading.Condition()
+log_seq = 0
+log_generation = 0  # يزيد مع كل تشغيل جديد للبوت
+
 def get_progress():
-    """قراءة ملف التقدم"""
+    """
+    قراءة ملخص التقدم من سجلات الصفوف لكل المصادر (أو ملف التقدم القديم إذا لم يتم نقله بعد):
+    الصفوف المنتهية والمعلقة مجموع كل المصادر، وآخر صف من المصدر الذي تم تحديثه مؤخراً
+    """
+    summaries = []
+    for source in SOURCES:
+        try:
+            summary = read_summary(source_file(CHECKPOINT_DB, source))
+        except Exception:
+            summary = None
+        if summary is not None:
+            summaries.append(dict(summary, source=source['title']))
+    if len(summaries) == 1:
+        return summaries[0]
+    if summaries:
+        latest = max(summaries, key=lambda summary: summary['last_updated'] or '')
+        return dict(
+            latest,
+            total_processed=sum(summary['total_processed'] for summary in summaries),
+            pending=sum(summary['pending'] for summary in summaries),
+            sources=summaries
+        )
     if os.path.exists(PROGRESS_FILE):
         with open(PROGRESS_FILE, 'r', encoding='utf-8') as f:
             return json.load(f)
     return {"last_row": 0, "total_processed": 0, "last_updated": None}
 
+def get_pipeline_stats():
+    """قراءة أعماق الطوابير وانشغال كل مرحلة (يكتبها البوت دورياً)"""
+    if os.path.exists(PIPELINE_STATS_FILE):
+        try:
+            with open(PIPELINE_STATS_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return None
+    return None
+
+def append_log_line(line):
+    """إضافة سطر للسجل في الذاكرة وتنبيه كل اتصالات البث المباشر"""
+    global log_seq
+    with log_condition:
+        log_seq += 1
+        log_buffer.append((log_seq, line))
+        log_condition.notify_all()
+
+def start_log_generation():
+    """بداية سجل جديد لتشغيل جديد للبوت"""
+    global log_generation
+    with log_condition:
+        log_generation += 1
+        log_buffer.clear()
+        log_condition.notify_all()
+
+def read_log_tail(path, max_bytes=LOG_TAIL_BYTES):
+    """قراءة آخر جزء من ملف السجل فقط (بدون قراءة الملف كاملاً)"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - max_bytes))
+        data = f.read()
+    lines = data.decode('utf-8', errors='replace').splitlines(keepends=True)
+    # السطر الأول قد يكون مقطوعاً
+    return lines[1:] if size > max_bytes else lines
+
+def recent_log_lines(limit=100):
+    """آخر أسطر السجل من الذاكرة، أو من نهاية ملف السجل"""
+    with log_condition:
+        if log_buffer:
+            return [line for _, line in list(log_buffer)[-limit:]]
+    if os.path.exists(LOG_FILE):
+        return read_log_tail(LOG_FILE)[-limit:]
+    return []
+
 def get_logs():
     """قراءة آخر السجلات"""
     try:
-        # محاولة قراءة ملف سجل البوت
-        bot_log_file = "bot_output.log"
-        
-        if os.path.exists(bot_log_file):
-            with open(bot_log_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                if lines:
-                    # إرجاع آخر 100 سطر
-                    return ''.join(lines[-100:])
+        lines = recent_log_lines()
+        if lines:
+            # إرجاع آخر 100 سطر
+            return ''.join(lines)
         
         # إذا لم يوجد ملف السجل، التحقق من وجود progress
-        if os.path.exists(PROGRESS_FILE):
-            progress = get_progress()
-            if progress.get('total_processed', 0) > 0:
-                return f"✓ البوت يعمل...\n✓ تمت معالجة {progress['total_processed']} صف\n\nللمزيد من التفاصيل، شغّل البوت مرة أخرى..."
+        progress = get_progress()
+        if progress.get('total_processed', 0) > 0:
+            return f"✓ البوت يعمل...\n✓ تمت معالجة {progress['total_processed']} صف\n\nللمزيد من التفاصيل، شغّل البوت مرة أخرى..."
         
         return "📋 في انتظار بدء العملية...\n\nاضغط على زر 'بدء العملية' للبدء في معالجة الأرقام القومية"
         
@@ -55,7 +140,8 @@ def run_bot():
     global bot_process
     try:
         # فتح ملف لحفظ السجلات
-        log_file_path = "bot_output.log"
+        log_file_path = LOG_FILE
+        start_log_generation()
         
         with open(log_file_path, 'w', encoding='utf-8') as log_file:
             bot_process = subprocess.Popen(
@@ -70,14 +156,16 @@ def run_bot():
             for line in bot_process.stdout:
                 log_file.write(line)
                 log_file.flush()  # تأكد من الكتابة الفورية
+                append_log_line(line)
                 print(line, end='')  # طباعة في الكونسول أيضاً
                 
     except Exception as e:
         error_msg = f"خطأ في تشغيل البوت: {str(e)}\n"
         print(error_msg)
         # كتابة الخطأ في ملف السجل
-        with open("bot_output.log", 'a', encoding='utf-8') as f:
+        with open(LOG_FILE, 'a', encoding='utf-8') as f:
             f.write(error_msg)
+        append_log_line(error_msg)
 
 @app.route('/')
 def index():
@@ -95,11 +183,100 @@ def status():
     
     return jsonify({
         'progress': progress,
+        'pipeline': get_pipeline_stats(),
         'logs': logs,
         'timestamp': datetime.now().isoformat(),
         'bot_running': is_running
     })
 
+def sse_event(event, data):
+    """تنسيق حدث Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def current_status():
+    """الحالة بدون السجلات (تُرسل في البث المباشر عند تغيرها فقط)"""
+    global bot_process
+    return {
+        'progress': get_progress(),
+        'pipeline': get_pipeline_stats(),
+        'bot_running': bot_process is not None and bot_process.poll() is None
+    }
+
+@app.route('/api/stream')
+def stream():
+    """
+    بث مباشر (SSE): أسطر السجل الجديدة فور وصولها،
+    والتغيرات في التقدم وحالة المراحل عند حدوثها فقط
+    """
+    def generate():
+        with log_condition:
+            last_seq = log_seq
+            generation = log_generation
+        yield sse_event('logs', {'lines': recent_log_lines(), 'reset': True})
+        
+        last_status = {}
+        last_status_check = 0
+        last_send = time.monotonic()
+        
+        while True:
+            with log_condition:
+                log_condition.wait_for(
+                    lambda: log_seq > last_seq or log_generation != generation,
+                    timeout=1
+                )
+                reset = log_generation != generation
+                if reset:
+                    generation = log_generation
+                    last_seq = 0
+                new_lines = [line for seq, line in log_buffer if seq > last_seq]
+                last_seq = log_seq
+            
+            if new_lines or reset:
+                yield sse_event('logs', {'lines': new_lines, 'reset': reset})
+                last_send = time.monotonic()
+            
+            if time.monotonic() - last_status_check >= STREAM_STATUS_INTERVAL:
+                last_status_check = time.monotonic()
+                status = current_status()
+                delta = {key: value for key, value in status.items() if last_status.get(key) != value}
+                if delta:
+                    last_status = status
+                    yield sse_event('status', delta)
+                    last_send = time.monotonic()
+            
+            if time.monotonic() - last_send >= STREAM_HEARTBEAT_INTERVAL:
+                yield ": ping\n\n"
+                last_send = time.monotonic()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/metrics')
+def metrics():
+    """مقاييس البوت بصيغة Prometheus (من آخر نسخة حفظها البوت - بدون أي طلب للبوت نفسه)"""
+    global bot_process
+    snapshot = {}
+    if os.path.exists(METRICS_FILE):
+        try:
+            with open(METRICS_FILE, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (ValueError, OSError):
+            snapshot = {}
+    
+    progress = get_progress()
+    extra = {
+        'running': int(bot_process is not None and bot_process.poll() is None),
+        'rows_processed': progress.get('total_processed', 0),
+        'rows_pending': progress.get('pending', 0),
+    }
+    if snapshot.get('updated'):
+        extra['metrics_age_seconds'] = round(time.time() - snapshot['updated'], 1)
+    
+    return Response(render_prometheus(snapshot, extra), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/api/start', methods=['POST'])
 def start_bot():
     """بدء تشغيل البوت"""
@@ -141,8 +318,12 @@ def stop_bot():
 def reset_progress():
     """إعادة تعيين التقدم"""
     try:
-        if os.path.exists(PROGRESS_FILE):
-            os.remove(PROGRESS_FILE)
+        paths = [PROGRESS_FILE]
+        for source in SOURCES:
+            paths += store_files(source_file(CHECKPOINT_DB, source))
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
         return jsonify({
             'success': True,
             'message': 'تم إعادة تعيين التقدم بنجاح. يمكنك الآن بدء العملية من جديد.'
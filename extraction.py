@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+محرك استخراج بيانات الناخب من صفحة نتيجة الاستعلام
+يعمل على نسخة HTML واحدة من الصفحة يتم تحليلها مرة واحدة في الذاكرة،
+بدلاً من مئات الطلبات المباشرة للمتصفح (find_elements و .text)
+"""
+
+from bs4 import BeautifulSoup, NavigableString
+from text_matcher import KeywordMatcher, normalize_arabic
+
+# استخدام lxml إذا كان مثبتاً لأنه أسرع بكثير من html.parser
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# الكلمات الدالة على أن الرقم القومي ليس له حق الانتخاب
+NO_VOTING_RIGHT_KEYWORDS = [
+    'ليس له حق الانتخاب',
+    'ليس له حق انتخاب',
+    'غير مدرج بقاعدة بيانات الناخبين',
+    'غير مدرج بقاعده بيانات الناخبين',
+    'ليس لديه حق الانتخاب',
+    'لا يحق له الانتخاب'
+]
+
+# الكلمات الدالة على رسالة خطأ
+ERROR_KEYWORDS = ['غير موجود', 'خطأ', 'غير صحيح', 'لا يوجد', 'invalid', 'error', 'not found']
+
+# الكلمات الدالة على صفحة Captcha
+CAPTCHA_KEYWORDS = ['captcha', 'robot']
+
+# حقول البيانات في نتيجة الاستعلام
+RESULT_FIELDS = ['مركز_الانتخاب', 'العنوان', 'رقم_اللجنة_الفرعية', 'الرقم_في_الكشوف']
+
+# أنماط بحث محتملة لمركز الانتخاب
+CENTER_PATTERNS = [
+    'مركزك الإنتخابي', 'مركزك الانتخابي', 'المركز الانتخابي',
+    'اسم اللجنة', 'اللجنة الانتخابية', 'مقر اللجنة',
+    'موقعك الانتخابي', 'لجنتك الانتخابية'
+]
+
+# أنماط بحث للعنوان
+ADDRESS_PATTERNS = ['العنوان', 'عنوان اللجنة', 'العنوان التفصيلي']
+
+# أنماط بحث لرقم اللجنة
+COMMITTEE_PATTERNS = ['رقم اللجنة الفرعية', 'اللجنة الفرعية', 'رقم اللجنة']
+
+# أنماط بحث للرقم في الكشوف
+LIST_PATTERNS = ['رقمك في الكشوف', 'رقمك بالكشوف', 'الرقم في الكشوف', 'رقم تسلسلي']
+
+# المعرفات (id أو class) المحتملة لكل حقل
+SELECTORS_MAP = {
+    'مركز_الانتخاب': ['centerName', 'center-name', 'votingCenter', 'voting-center', 'المركز'],
+    'العنوان': ['address', 'centerAddress', 'center-address', 'العنوان'],
+    'رقم_اللجنة_الفرعية': ['committeeNumber', 'committee-number', 'subCommittee', 'اللجنة'],
+    'الرقم_في_الكشوف': ['orderNumber', 'order-number', 'listNumber', 'الرقم']
+}
+
+# مطابق مجمع مسبقاً لتسميات الحقول وكلمات الحالة: يصنف كل أسطر الصفحة في مرور واحد
+PAGE_MATCHER = KeywordMatcher({
+    'مركز_الانتخاب': CENTER_PATTERNS,
+    'العنوان': ADDRESS_PATTERNS,
+    'رقم_اللجنة_الفرعية': COMMITTEE_PATTERNS,
+    'الرقم_في_الكشوف': LIST_PATTERNS,
+    'no_voting_right': NO_VOTING_RIGHT_KEYWORDS,
+    'error': ERROR_KEYWORDS,
+    'captcha': CAPTCHA_KEYWORDS,
+})
+
+# ترتيب أولوية الحالات عند ظهور أكثر من واحدة في الصفحة
+OUTCOME_PRIORITY = ['no_voting_right', 'error', 'captcha']
+
+# عدد تسميات الحقول المختلفة التي تعني ظهور صفحة النتيجة
+# (تسمية واحدة لا تكفي: عنوان نموذج الاستعلام نفسه "لجنتك الانتخابية" يطابق مركز الانتخاب)
+RESULTS_MIN_FIELDS = 2
+
+CENTER_LABELS = ['مركزك الإنتخابي:', 'مركزك الانتخابي:', 'المركز الانتخابي:', 'مركز الانتخاب:']
+
+# العناصر التي لا يظهر نصها في الصفحة
+SKIPPED_TAGS = {'script', 'style', 'noscript', 'head', 'template', 'iframe'}
+
+# العناصر التي تبدأ سطراً جديداً في النص المعروض (مثل innerText في المتصفح)
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'body', 'caption', 'center', 'dd',
+    'div', 'dl', 'dt', 'fieldset', 'figcaption', 'figure', 'footer', 'form',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'html', 'li', 'main',
+    'nav', 'ol', 'p', 'pre', 'section', 'table', 'tbody', 'tfoot', 'thead',
+    'tr', 'ul'
+}
+
+
+def empty_result(status='unknown', error_message='', retryable=False):
+    """إنشاء قاموس نتيجة فارغ (retryable: فشل مؤقت يمكن إعادة المحاولة فيه لاحقاً)"""
+    result = {field: '' for field in RESULT_FIELDS}
+    result['status'] = status
+    result['error_message'] = error_message
+    if retryable:
+        result['retryable'] = True
+    return result
+
+
+def has_data(result):
+    """هل تحتوي النتيجة على أي حقل من حقول البيانات"""
+    return any(result[field] for field in RESULT_FIELDS)
+
+
+def classify_page_text(page_text):
+    """تحديد نتيجة الاستعلام من نص الصفحة (أو None إذا لم تظهر نتيجة معروفة)"""
+    return outcome_from_categories(PAGE_MATCHER.find(page_text))
+
+
+def detect_outcome(page_text):
+    """
+    مثل classify_page_text مع اكتشاف صفحة النتيجة نفسها (تسميات الحقول في جدول أو بدونه):
+    يرجع الحالة، أو 'results'، أو None إذا لم تظهر أي نتيجة بعد
+    """
+    found = PAGE_MATCHER.find(page_text)
+    outcome = outcome_from_categories(found)
+    if outcome:
+        return outcome
+    if len(found & set(RESULT_FIELDS)) >= RESULTS_MIN_FIELDS:
+        return 'results'
+    return None
+
+
+def outcome_from_categories(found):
+    """الحالة ذات الأولوية الأعلى من التصنيفات التي وجدها المطابق"""
+    for outcome in OUTCOME_PRIORITY:
+        if outcome in found:
+            return outcome
+    return None
+
+
+def outcome_result(outcome):
+    """نتيجة نهائية للحالات التي لا تحتاج استخراج (أو None إذا كانت الصفحة تحتاج استخراج)"""
+    if outcome == 'no_voting_right':
+        return empty_result('no_voting_right', 'ليس له حق الانتخاب')
+    if outcome == 'error':
+        return empty_result('error', 'الرقم القومي غير موجود أو غير صحيح')
+    if outcome == 'captcha':
+        return empty_result('error', 'تم اكتشاف Captcha - يرجى المحاولة لاحقاً', retryable=True)
+    return None
+
+
+def _is_hidden(element):
+    """العناصر المخفية بـ display:none لا تظهر في النص المعروض"""
+    style = element.get('style')
+    return bool(style) and 'display:none' in style.replace(' ', '').lower()
+
+
+def _render(node, parts):
+    """تجميع النص المعروض للعنصر بشكل مقارب لـ innerText"""
+    for child in node.children:
+        if isinstance(child, NavigableString):
+            if type(child) is NavigableString:
+                parts.append(str(child))
+            continue
+
+        name = child.name
+        if name in SKIPPED_TAGS or _is_hidden(child):
+            continue
+        if name == 'br':
+            parts.append('\n')
+            continue
+
+        if name in BLOCK_TAGS:
+            parts.append('\n')
+            _render(child, parts)
+            parts.append('\n')
+        else:
+            _render(child, parts)
+            if name in ('td', 'th'):
+                parts.append(' ')
+
+
+def render_text(node):
+    """النص المعروض للعنصر، سطراً لكل عنصر كتلة، بدون مسافات زائدة"""
+    parts = []
+    _render(node, parts)
+    lines = (' '.join(line.split()) for line in ''.join(parts).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def _first_text(element):
+    """أول نص مباشر داخل العنصر (نفس سلوك text() في XPath)"""
+    for child in element.children:
+        if type(child) is NavigableString:
+            return str(child)
+    return ''
+
+
+def _elements_with_text(root, keywords):
+    """العناصر التي يحتوي أول نص مباشر فيها على إحدى الكلمات"""
+    return [
+        element for element in root.find_all(True)
+        if element.name not in SKIPPED_TAGS and
+        any(keyword in _first_text(element) for keyword in keywords)
+    ]
+
+
+class PageSnapshot:
+    """نسخة واحدة محللة من صفحة النتيجة يتم تشغيل جميع طرق الاستخراج عليها"""
+
+    def __init__(self, html):
+        self.html = html or ''
+        self.soup = BeautifulSoup(self.html, HTML_PARSER)
+        self.root = self.soup.body or self.soup
+        self._text = None
+        self._line_labels = None
+
+    @property
+    def text(self):
+        """النص المعروض للصفحة (يُحسب مرة واحدة)"""
+        if self._text is None:
+            self._text = render_text(self.root)
+        return self._text
+
+    @property
+    def line_labels(self):
+        """تصنيفات كل سطر في النص {رقم_السطر: التصنيفات} (تُحسب مرة واحدة)"""
+        if self._line_labels is None:
+            self._line_labels = PAGE_MATCHER.classify_lines(self.text)
+        return self._line_labels
+
+    def outcome(self):
+        """حالة الصفحة من نفس مرور التصنيف (أو None)"""
+        found = set().union(*self.line_labels.values())
+        return outcome_from_categories(found)
+
+
+def _value_from_lines(lines, i, line_clean, min_length, rejected_keywords=None):
+    """القيمة بعد ':' في نفس السطر، أو في السطر التالي إذا لم تكن تسمية أخرى"""
+    if ':' in line_clean:
+        value = line_clean.split(':', 1)[1].strip()
+        if value and len(value) > min_length:
+            return value
+
+    if i + 1 < len(lines):
+        next_line = lines[i + 1].strip()
+        if next_line and len(next_line) > min_length:
+            if not rejected_keywords or not any(kw in next_line for kw in rejected_keywords):
+                return next_line
+    return ''
+
+
+def extract_from_lines(snapshot, result):
+    """الطريقة الأولى: البحث في أسطر النص المعروض للصفحة"""
+    lines = snapshot.text.split('\n')
+    rules = [
+        ('مركز_الانتخاب', 3, ['محافظة', 'قسم', 'العنوان', 'رقم']),
+        ('العنوان', 5, ['رقم', 'تاريخ', 'كثافة', 'لجنة']),
+        ('رقم_اللجنة_الفرعية', 0, None),
+        ('الرقم_في_الكشوف', 0, None),
+    ]
+
+    for i, found in sorted(snapshot.line_labels.items()):
+        line_clean = lines[i].strip()
+        for field, min_length, rejected in rules:
+            if field in found and not result[field]:
+                value = _value_from_lines(lines, i, line_clean, min_length, rejected)
+                if value:
+                    result[field] = value
+                    print(f"  ✓ وجدت {field}: {value}")
+
+
+def extract_from_selectors(snapshot, result):
+    """طريقة احتياطية: استخراج باستخدام IDs أو classes محددة"""
+    for field_name, possible_ids in SELECTORS_MAP.items():
+        for selector_id in possible_ids:
+            element = snapshot.root.find(id=selector_id) or snapshot.root.find(class_=selector_id)
+            if element is None:
+                continue
+            value = render_text(element).strip()
+            if value:
+                result[field_name] = value
+                print(f"  ✓ وجدت {field_name} من '{selector_id}': {value}")
+                break
+
+
+def _label_has(label, *words):
+    """هل تحتوي التسمية الموحدة على كل الكلمات (بعد توحيدها بنفس normalize_arabic: ة -> ه ...)"""
+    return all(normalize_arabic(word) in label for word in words)
+
+
+def extract_from_table_rows(snapshot, result):
+    """استخراج البيانات من صفوف الجداول (الخلية الأولى = التسمية، الأخيرة = القيمة)"""
+    for row in snapshot.root.find_all('tr'):
+        cells = row.find_all(['th', 'td'])
+        if len(cells) < 2:
+            continue
+
+        label_cell = normalize_arabic(render_text(cells[0]))
+        value_cell = render_text(cells[-1]).strip()
+
+        if _label_has(label_cell, 'مركز', 'انتخاب'):
+            if value_cell and len(value_cell) > 2:
+                result['مركز_الانتخاب'] = value_cell
+        elif _label_has(label_cell, 'عنوان'):
+            if value_cell and len(value_cell) > 5:
+                result['العنوان'] = value_cell
+        elif _label_has(label_cell, 'لجنة', 'فرعية'):
+            if value_cell:
+                result['رقم_اللجنة_الفرعية'] = value_cell
+        elif _label_has(label_cell, 'رقمك') or _label_has(label_cell, 'كشوف', 'انتخابية'):
+            if value_cell:
+                result['الرقم_في_الكشوف'] = value_cell
+
+
+def extract_from_address_siblings(snapshot, result):
+    """
+    عنصر "العنوان" هو التسمية: العنصر السابق له هو المركز الانتخابي
+    والعنصر التالي له هو قيمة العنوان
+    """
+    for addr_elem in _elements_with_text(snapshot.root, ['عنوان']):
+        addr_text = render_text(addr_elem).strip()
+
+        # تأكد أن هذا هو عنصر التسمية وليس القيمة
+        if 'عنوان' not in addr_text or len(addr_text) >= 50:
+            continue
+
+        prev_elem = addr_elem.find_previous_sibling()
+        next_elem = addr_elem.find_next_sibling()
+        if prev_elem is None or next_elem is None:
+            continue
+
+        prev_text = render_text(prev_elem).strip()
+        if prev_text and len(prev_text) > 2 and not result['مركز_الانتخاب']:
+            result['مركز_الانتخاب'] = prev_text
+            print(f"  ✓ وجدت المركز الانتخابي من العنصر السابق للعنوان: {prev_text}")
+
+        if not result['العنوان']:
+            addr_value = render_text(next_elem).strip()
+            if addr_value and len(addr_value) > 5:
+                result['العنوان'] = addr_value
+
+        if result['مركز_الانتخاب'] and result['العنوان']:
+            break
+
+
+def _labelled_value(element, element_text, parent_text, labels):
+    """القيمة بعد إزالة التسمية من نص العنصر الأب، أو نص العنصر التالي"""
+    full_text = parent_text if parent_text else element_text
+    for label in labels:
+        if label in full_text:
+            value = full_text.replace(label, '').strip()
+            if value:
+                return value
+            break
+
+    next_elem = element.find_next_sibling()
+    if next_elem is not None:
+        return render_text(next_elem).strip()
+    return ''
+
+
+def extract_from_label_elements(snapshot, result):
+    """الطريقة القديمة: البحث عن العناصر التي تحتوي على التسميات ثم قراءة القيم المجاورة"""
+    keywords = ['مركز', 'المركز', 'لجنة', 'عنوان', 'كشوف']
+    for element in _elements_with_text(snapshot.root, keywords):
+        element_text = render_text(element).strip()
+        parent_text = render_text(element.parent).strip() if element.parent else ''
+
+        if not result['مركز_الانتخاب'] and (('مركز' in element_text and 'انتخاب' in element_text) or 'المركز' in element_text):
+            result['مركز_الانتخاب'] = _labelled_value(element, element_text, parent_text, CENTER_LABELS)
+
+        if 'عنوان' in element_text and not result['العنوان']:
+            result['العنوان'] = _labelled_value(
+                element, element_text, parent_text, ['العنوان:', 'عنوان اللجنة:', 'عنوان المركز:']
+            )
+
+        if 'لجنة' in element_text and 'فرعية' in element_text and not result['رقم_اللجنة_الفرعية']:
+            result['رقم_اللجنة_الفرعية'] = _labelled_value(
+                element, element_text, parent_text, ['رقم اللجنة الفرعية:', 'اللجنة الفرعية:', 'لجنة فرعية رقم:']
+            )
+
+        if ('كشوف' in element_text or ('رقمك' in element_text and 'كشوف' in parent_text)) and not result['الرقم_في_الكشوف']:
+            result['الرقم_في_الكشوف'] = _labelled_value(
+                element, element_text, parent_text,
+                ['رقمك في الكشوف الانتخابية:', 'رقمك في الكشوف:', 'الرقم في الكشوف:']
+            )
+
+
+def extract_from_soup_fallback(snapshot, result):
+    """الطريقة الأخيرة: جداول HTML بدون تنسيق النص، ثم جميع عناصر النص"""
+    for row in snapshot.root.find_all('tr'):
+        cells = row.find_all('td')
+        if len(cells) < 2:
+            continue
+
+        label_text = cells[0].get_text(strip=True)
+        value_text = cells[-1].get_text(strip=True)
+
+        if 'مركز' in label_text and ('انتخاب' in label_text or 'إنتخاب' in label_text):
+            if value_text and len(value_text) > 2:
+                result['مركز_الانتخاب'] = value_text
+        elif 'عنوان' in label_text:
+            if value_text and len(value_text) > 5:
+                result['العنوان'] = value_text
+        elif 'لجنة' in label_text and 'فرعية' in label_text:
+            if value_text:
+                result['رقم_اللجنة_الفرعية'] = value_text
+        elif 'رقمك' in label_text or ('كشوف' in label_text and 'انتخابية' in label_text):
+            if value_text:
+                result['الرقم_في_الكشوف'] = value_text
+
+    if result['مركز_الانتخاب']:
+        return
+
+    for elem in snapshot.root.find_all(['div', 'span', 'p', 'td', 'th', 'label']):
+        text = elem.get_text(strip=True)
+
+        if 'مركز' in text and ('انتخاب' in text or 'إنتخاب' in text):
+            cleaned = text
+            for label in CENTER_LABELS:
+                cleaned = cleaned.replace(label, '')
+            cleaned = cleaned.strip()
+            if cleaned and len(cleaned) > 2:
+                result['مركز_الانتخاب'] = cleaned
+
+        elif 'عنوان' in text and not result['العنوان']:
+            cleaned = text.replace('العنوان:', '').replace('عنوان اللجنة:', '').strip()
+            if cleaned and len(cleaned) > 5:
+                result['العنوان'] = cleaned
+
+        elif 'لجنة' in text and 'فرعية' in text:
+            cleaned = text.replace('رقم اللجنة الفرعية:', '').replace('اللجنة الفرعية:', '').strip()
+            if cleaned:
+                result['رقم_اللجنة_الفرعية'] = cleaned
+
+        elif 'كشوف' in text or 'رقمك' in text:
+            cleaned = text.replace('رقمك في الكشوف الانتخابية:', '').replace('رقمك في الكشوف:', '').replace('الرقم في الكشوف:', '').strip()
+            if cleaned:
+                result['الرقم_في_الكشوف'] = cleaned
+
+
+# طرق الاستخراج بالترتيب، وشرط تشغيل كل طريقة
+EXTRACTION_STRATEGIES = [
+    ('lines', extract_from_lines, lambda result: True),
+    ('element_ids', extract_from_selectors, lambda result: not result['مركز_الانتخاب']),
+    ('table_rows', extract_from_table_rows, lambda result: True),
+    ('address_sibling', extract_from_address_siblings, lambda result: not result['مركز_الانتخاب']),
+    ('label_elements', extract_from_label_elements, lambda result: not result['مركز_الانتخاب']),
+    ('soup_fallback', extract_from_soup_fallback, lambda result: not has_data(result)),
+]
+
+
+def extract_voter_data(html, outcome=None, trace=None):
+    """
+    استخراج بيانات الناخب من نسخة HTML واحدة لصفحة النتيجة
+    outcome: النتيجة التي حددتها مرحلة الانتظار (إن وجدت) لتجنب فحص النص الكامل
+    trace: قاموس اختياري يُسجل فيه اسم الطريقة التي نجحت في الاستخراج
+    يرجع نفس قاموس النتيجة الذي يُكتب في الشيت
+    """
+    snapshot = PageSnapshot(html)
+
+    # إذا لم تحدد مرحلة الانتظار النتيجة، نفحص النص الكامل
+    if outcome in (None, 'timeout'):
+        outcome = snapshot.outcome()
+
+    final = outcome_result(outcome)
+    if final is not None:
+        return final
+
+    result = empty_result()
+    print(f"  📄 عينة من نص الصفحة (أول 500 حرف):\n{snapshot.text[:500]}\n")
+
+    succeeded = None
+    for name, strategy, should_run in EXTRACTION_STRATEGIES:
+        if not should_run(result):
+            continue
+        before = [result[field] for field in RESULT_FIELDS]
+        try:
+            strategy(snapshot, result)
+        except Exception as e:
+            print(f"  تحذير: خطأ في طريقة الاستخراج '{name}': {str(e)}")
+            continue
+        if succeeded is None and [result[field] for field in RESULT_FIELDS] != before:
+            succeeded = name
+
+    if trace is not None:
+        trace['strategy'] = succeeded
+
+    if has_data(result):
+        result['status'] = 'success'
+        print(f"  ✓ تم استخراج: المركز={result['مركز_الانتخاب'][:30] if result['مركز_الانتخاب'] else 'غير متوفر'}")
+    else:
+        result['status'] = 'no_data'
+        result['error_message'] = 'لم يتم العثور على بيانات - قد يحتاج الكود للتحديث حسب هيكل الموقع'
+
+    return result
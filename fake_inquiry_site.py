@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+موقع استعلام محلي يحاكي بنية موقع الهيئة لقياس سرعة البوت بدون الاتصال بالموقع الحقيقي:
+صفحة خارجية بها iframe إعلانات و iframe الـ gadget، نموذج بحقل nationalId،
+وصفحة نتيجة (جدول اللجنة، ليس له حق الانتخاب، رقم غير صحيح، Captcha)
+مع تأخير قابل للضبط وحقن أخطاء
+
+الاستخدام:
+    python fake_inquiry_site.py [--port 8765] [--latency 0.5] [--failure-rate 0.05]
+    INQUIRY_URL=http://127.0.0.1:8765/inquiry python main.py
+"""
+
+import os
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter
+
+from flask import Flask, request, abort
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+DEFAULT_PORT = 8765
+
+# الإعدادات الافتراضية (يمكن تغييرها من متغيرات البيئة أو سطر الأوامر)
+DEFAULT_SETTINGS = {
+    'latency': float(os.environ.get('FAKE_SITE_LATENCY', '0.5')),  # متوسط زمن الاستعلام بالثواني
+    'jitter': float(os.environ.get('FAKE_SITE_JITTER', '0.3')),  # التفاوت حول المتوسط (نسبة)
+    'page_latency': float(os.environ.get('FAKE_SITE_PAGE_LATENCY', '0.1')),  # زمن تحميل الصفحة والنموذج
+    'no_voting_rate': float(os.environ.get('FAKE_SITE_NO_VOTING_RATE', '0.1')),  # نسبة "ليس له حق الانتخاب"
+    'failure_rate': float(os.environ.get('FAKE_SITE_FAILURE_RATE', '0')),  # نسبة أخطاء الخادم (503)
+    'captcha_rate': float(os.environ.get('FAKE_SITE_CAPTCHA_RATE', '0')),  # نسبة صفحات Captcha
+    'hang_rate': float(os.environ.get('FAKE_SITE_HANG_RATE', '0')),  # نسبة الطلبات التي لا ترد في الوقت
+    'hang_seconds': float(os.environ.get('FAKE_SITE_HANG_SECONDS', '30')),
+}
+
+PAGE_HEAD = """<!DOCTYPE html>
+<html lang="ar" dir="rtl">
+<head>
+  <meta charset="utf-8">
+  <title>{title}</title>
+</head>
+<body>
+"""
+
+PAGE_TAIL = """
+</body>
+</html>
+"""
+
+OUTER_PAGE = """
+<h1>الاستعلام عن لجنتك الانتخابية</h1>
+<div class="ads">
+  <iframe id="ad-frame" src="/ads/banner" width="728" height="90"></iframe>
+</div>
+<div class="gadget">
+  <iframe id="inquiry-frame" src="/gadget/inquiry" width="700" height="600"></iframe>
+</div>
+"""
+
+AD_PAGE = """
+<div class="banner">مساحة إعلانية</div>
+"""
+
+FORM_PAGE = """
+<div class="nid-content">
+  <h1>الاستعلام عن لجنتك الانتخابية</h1>
+  <form id="inquiry-form" method="post" action="/gadget/result">
+    <input type="hidden" name="token" value="{token}">
+    <input type="text" id="nationalId" name="nationalId" placeholder="الرقم القومي المكون من 14 رقماً">
+    <button type="submit">استعلام</button>
+  </form>
+</div>
+"""
+
+SUCCESS_PAGE = """
+<div id="result-div">
+  <div class="alert alert-success">
+    <h2>الرقم القومي ({national_id}) له حق الانتخاب</h2>
+  </div>
+  <h3>بيانات اللجنة الانتخابية</h3>
+  <table class="table table-bordered">
+    <tr><th>مركزك الإنتخابي:</th><td>{center}</td></tr>
+    <tr><th>محافظة:</th><td>{governorate}</td></tr>
+    <tr><th>العنوان :</th><td>{address}</td></tr>
+    <tr><th>رقم اللجنة الفرعية:</th><td>{committee}</td></tr>
+    <tr><th>رقمك في الكشوف الانتخابية:</th><td>{list_number}</td></tr>
+  </table>
+</div>
+"""
+
+NO_VOTING_RIGHT_PAGE = """
+<div id="result-div">
+  <div class="alert alert-danger">
+    <h2>الرقم القومي ({national_id}) ليس له حق الانتخاب</h2>
+  </div>
+  <h3>الرقم القومي غير مدرج بقاعدة بيانات الناخبين</h3>
+</div>
+"""
+
+INVALID_PAGE = """
+<div id="result-div">
+  <div class="alert alert-danger">
+    <h2>الرقم القومي المدخل غير صحيح</h2>
+  </div>
+</div>
+"""
+
+CAPTCHA_PAGE = """
+<div id="result-div">
+  <h2>برجاء التأكد من أنك لست robot</h2>
+  <div class="g-recaptcha" data-sitekey="fake"></div>
+  <p>captcha</p>
+</div>
+"""
+
+GOVERNORATES = ['القاهرة', 'الجيزة', 'الإسكندرية', 'الدقهلية', 'مرسى مطروح', 'أسيوط']
+SCHOOLS = ['مدرسة النصر الابتدائية', 'مدرسة الشهيد أحمد حمدي', 'معهد فتيات الأزهر', 'الوحدة المحلية']
+STREETS = ['شارع الجمهورية', 'شارع بورسعيد', 'طريق الكورنيش', 'ميدان المحطة']
+
+
+def fraction(national_id, salt=''):
+    """رقم ثابت بين 0 و 1 لكل رقم قومي (نفس الرقم يعطي نفس النتيجة في كل مرة)"""
+    digest = hashlib.md5(f"{salt}{national_id}".encode('utf-8')).hexdigest()
+    return int(digest[:8], 16) / 0xFFFFFFFF
+
+
+def voter_record(national_id):
+    """بيانات لجنة ثابتة ومختلفة لكل رقم قومي"""
+    seed = int(hashlib.md5(national_id.encode('utf-8')).hexdigest()[:8], 16)
+    return {
+        'national_id': national_id,
+        'center': f"{SCHOOLS[seed % len(SCHOOLS)]} رقم {seed % 40 + 1}",
+        'governorate': GOVERNORATES[seed % len(GOVERNORATES)],
+        'address': f"{seed % 200 + 1} {STREETS[seed % len(STREETS)]}",
+        'committee': str(seed % 90 + 1),
+        'list_number': str(seed % 3000 + 1),
+    }
+
+
+def render(title, body):
+    return PAGE_HEAD.format(title=title) + body + PAGE_TAIL
+
+
+def create_app(**overrides):
+    """إنشاء الموقع بإعدادات محددة (لتشغيل أكثر من إعداد في نفس العملية)"""
+    settings = dict(DEFAULT_SETTINGS, **overrides)
+    site = Flask(__name__)
+    site.config['FAKE_SITE'] = settings
+    counters = Counter()
+    counters_lock = threading.Lock()
+    site.config['FAKE_SITE_COUNTERS'] = counters
+
+    def count(name):
+        with counters_lock:
+            counters[name] += 1
+
+    def sleep(seconds):
+        if seconds > 0:
+            jitter = settings['jitter']
+            time.sleep(seconds * random.uniform(1 - jitter, 1 + jitter))
+
+    @site.route('/inquiry')
+    def outer_page():
+        count('outer')
+        sleep(settings['page_latency'])
+        return render('خدمة الاستعلام عن اللجان الانتخابية', OUTER_PAGE)
+
+    @site.route('/ads/banner')
+    def ad_page():
+        count('ads')
+        return render('إعلان', AD_PAGE)
+
+    @site.route('/gadget/inquiry')
+    def form_page():
+        count('form')
+        sleep(settings['page_latency'])
+        return render('الاستعلام عن لجنتك الانتخابية', FORM_PAGE.format(token='fake-token'))
+
+    @site.route('/gadget/result', methods=['GET', 'POST'])
+    def result_page():
+        count('lookups')
+        national_id = (request.values.get('nationalId') or '').strip()
+
+        roll = random.random()
+        if roll < settings['failure_rate']:
+            count('failures')
+            abort(503)
+        roll -= settings['failure_rate']
+        if roll < settings['hang_rate']:
+            count('hangs')
+            time.sleep(settings['hang_seconds'])
+            abort(504)
+        roll -= settings['hang_rate']
+
+        sleep(settings['latency'])
+
+        if roll < settings['captcha_rate']:
+            count('captcha')
+            return render('التحقق', CAPTCHA_PAGE)
+        if not (len(national_id) == 14 and national_id.isdigit()):
+            count('invalid')
+            return render('نتيجة الاستعلام', INVALID_PAGE)
+        if fraction(national_id, 'no_voting') < settings['no_voting_rate']:
+            count('no_voting_right')
+            return render('نتيجة الاستعلام', NO_VOTING_RIGHT_PAGE.format(national_id=national_id))
+
+        count('success')
+        return render('نتيجة الاستعلام', SUCCESS_PAGE.format(**voter_record(national_id)))
+
+    @site.route('/stats')
+    def stats():
+        with counters_lock:
+            return dict(counters, settings=settings)
+
+    return site
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """بدون سطر سجل لكل طلب (يؤثر على القياس ويغطي مخرجات البوت)"""
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class FakeSiteServer:
+    """تشغيل الموقع في thread منفصل داخل نفس العملية (للـ benchmarks)"""
+
+    def __init__(self, host='127.0.0.1', port=0, **settings):
+        self.app = create_app(**settings)
+        self._server = make_server(host, port, self.app, threaded=True, request_handler=QuietRequestHandler)
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self._server.host}:{self._server.port}"
+
+    @property
+    def inquiry_url(self):
+        return f"{self.url}/inquiry"
+
+    @property
+    def counters(self):
+        return dict(self.app.config['FAKE_SITE_COUNTERS'])
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-site", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="موقع استعلام محلي لقياس سرعة البوت")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', DEFAULT_PORT)))
+    for name, value in DEFAULT_SETTINGS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=value)
+    args = parser.parse_args()
+
+    settings = {name: getattr(args, name) for name in DEFAULT_SETTINGS}
+    site = create_app(**settings)
+    print(f"✓ الموقع المحلي يعمل على http://{args.host}:{args.port}/inquiry")
+    print(f"  التأخير {settings['latency']} ثانية | أخطاء {settings['failure_rate']:.0%} | "
+          f"Captcha {settings['captcha_rate']:.0%} | بدون رد {settings['hang_rate']:.0%}")
+    site.run(host=args.host, port=args.port, debug=False, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+بديل محلي لـ Google Sheets في الذاكرة بنفس دوال gspread التي يستخدمها البوت
+(open_by_key، worksheet، add_worksheet، get، get_all_values، update، batch_update، add_rows)
+يحسب عدد الطلبات والخلايا والبايتات لكل دالة، ويمكنه محاكاة بطء الرد وأخطاء 429
+(عشوائياً أو عند تجاوز حد الطلبات في الدقيقة) - لقياس استهلاك الحصة بدون شيت حقيقي
+
+يتم اختياره من main.py عبر SHEETS_BACKEND=memory
+"""
+
+import re
+import json
+import time
+import random
+import threading
+from collections import deque
+
+import requests
+import gspread
+
+# الدوال التي تُحسب كقراءة (الباقي كتابة)
+READ_METHODS = {'open_by_key', 'worksheet', 'worksheets', 'get', 'get_all_values'}
+
+CELL_PATTERN = re.compile(r'^([A-Z]+)?(\d+)?$')
+
+
+def column_index(letters):
+    """'A' -> 0، 'H' -> 7، 'AA' -> 26"""
+    index = 0
+    for char in letters:
+        index = index * 26 + (ord(char) - ord('A') + 1)
+    return index - 1
+
+
+def parse_range(range_name, row_count, col_count):
+    """'B2:C501' أو 'A1' أو 'A5:H' -> (أول صف، آخر صف، أول عمود، آخر عمود) بترقيم يبدأ من 1 للصفوف و0 للأعمدة"""
+    if '!' in range_name:
+        range_name = range_name.split('!', 1)[1]
+    parts = range_name.upper().split(':')
+    start = CELL_PATTERN.match(parts[0])
+    end = CELL_PATTERN.match(parts[-1])
+    if start is None or end is None:
+        raise ValueError(f"نطاق غير مفهوم: {range_name}")
+    first_row = int(start.group(2) or 1)
+    first_col = column_index(start.group(1) or 'A')
+    if len(parts) == 1:
+        return first_row, first_row, first_col, first_col
+    last_row = int(end.group(2)) if end.group(2) else row_count
+    last_col = column_index(end.group(1)) if end.group(1) else col_count - 1
+    return first_row, last_row, first_col, last_col
+
+
+def quota_error(retry_after, message="Quota exceeded for quota metric 'Requests' (simulated)"):
+    """خطأ 429 بنفس شكل رد Google حتى يُعامل كما يُعامل الخطأ الحقيقي"""
+    response = requests.Response()
+    response.status_code = 429
+    response.reason = 'Too Many Requests'
+    response.headers['Retry-After'] = str(max(1, int(round(retry_after))))
+    response.headers['Content-Type'] = 'application/json'
+    response._content = json.dumps({
+        'error': {'code': 429, 'message': message, 'status': 'RESOURCE_EXHAUSTED'}
+    }).encode('utf-8')
+    return gspread.exceptions.APIError(response)
+
+
+class SheetsCallStats:
+    """عدد الطلبات والخلايا والبايتات لكل دالة"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.methods = {}
+            self.quota_errors = 0
+
+    def record(self, method, cells=0, sent=0, received=0):
+        with self._lock:
+            stats = self.methods.setdefault(method, {'calls': 0, 'cells': 0, 'bytes_sent': 0, 'bytes_received': 0})
+            stats['calls'] += 1
+            stats['cells'] += cells
+            stats['bytes_sent'] += sent
+            stats['bytes_received'] += received
+
+    def record_quota_error(self):
+        with self._lock:
+            self.quota_errors += 1
+
+    def totals(self):
+        with self._lock:
+            totals = {'calls': 0, 'reads': 0, 'writes': 0, 'cells': 0, 'bytes': 0, 'quota_errors': self.quota_errors}
+            for method, stats in self.methods.items():
+                totals['calls'] += stats['calls']
+                totals['reads' if method in READ_METHODS else 'writes'] += stats['calls']
+                totals['cells'] += stats['cells']
+                totals['bytes'] += stats['bytes_sent'] + stats['bytes_received']
+            return totals
+
+    def snapshot(self):
+        with self._lock:
+            return {method: dict(stats) for method, stats in self.methods.items()}
+
+    def report(self):
+        """طباعة جدول الطلبات لكل دالة"""
+        snapshot = self.snapshot()
+        totals = self.totals()
+        print(f"{'الدالة':<16}{'الطلبات':>9}{'الخلايا':>10}{'KB مرسل':>10}{'KB مستقبل':>11}")
+        for method, stats in sorted(snapshot.items()):
+            print(f"{method:<16}{stats['calls']:>9}{stats['cells']:>10}"
+                  f"{stats['bytes_sent'] / 1024:>10.1f}{stats['bytes_received'] / 1024:>11.1f}")
+        print(f"الإجمالي: {totals['calls']} طلب ({totals['reads']} قراءة، {totals['writes']} كتابة) | "
+              f"{totals['cells']} خلية | {totals['bytes'] / 1024:.1f} KB | {totals['quota_errors']} خطأ 429")
+
+
+class FakeSheetsClient:
+    """
+    بديل gspread.Client: كل الأوراق في الذاكرة
+    latency: زمن كل طلب بالثواني
+    quota_error_rate: نسبة الطلبات التي ترجع 429 عشوائياً
+    read_quota / write_quota: عدد الطلبات المسموح بها في الدقيقة (0 = بدون حد)
+    """
+
+    def __init__(self, latency=0.0, quota_error_rate=0.0, read_quota=0, write_quota=0, seed=None):
+        self.latency = latency
+        self.quota_error_rate = quota_error_rate
+        self.quota = {'read': read_quota, 'write': write_quota}
+        self.stats = SheetsCallStats()
+        self.spreadsheets = {}
+        self._windows = {'read': deque(), 'write': deque()}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def call(self, method, cells=0, sent=None, received=None):
+        """كل طلب يمر من هنا: تأخير، فحص الحصة، ثم التسجيل"""
+        kind = 'read' if method in READ_METHODS else 'write'
+        with self._lock:
+            now = time.monotonic()
+            window = self._windows[kind]
+            while window and now - window[0] >= 60:
+                window.popleft()
+            limit = self.quota[kind]
+            if limit and len(window) >= limit:
+                retry_after = 60 - (now - window[0])
+                over_quota = True
+            else:
+                retry_after = 1
+                over_quota = self._random.random() < self.quota_error_rate
+            if not over_quota:
+                window.append(now)
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+        if over_quota:
+            self.stats.record_quota_error()
+            raise quota_error(retry_after)
+        self.stats.record(
+            method,
+            cells=cells,
+            sent=len(json.dumps(sent, ensure_ascii=False).encode('utf-8')) if sent is not None else 0,
+            received=len(json.dumps(received, ensure_ascii=False).encode('utf-8')) if received is not None else 0
+        )
+
+    def open_by_key(self, key):
+        self.call('open_by_key', sent=key)
+        return self.spreadsheet(key)
+
+    def spreadsheet(self, key):
+        """الملف بدون احتساب طلب (لتجهيز البيانات قبل التشغيل)"""
+        with self._lock:
+            if key not in self.spreadsheets:
+                self.spreadsheets[key] = FakeSpreadsheet(self, key)
+            return self.spreadsheets[key]
+
+
+class FakeSpreadsheet:
+    def __init__(self, client, key):
+        self.client = client
+        self.id = key
+        self._sheets = {}
+
+    def worksheet(self, title):
+        self.client.call('worksheet', sent=title)
+        if title not in self._sheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self._sheets[title]
+
+    def sheet(self, title):
+        """الورقة بدون احتساب طلب (لفحص النتائج بعد التشغيل)"""
+        return self._sheets[title]
+
+    def worksheets(self):
+        self.client.call('worksheets')
+        return list(self._sheets.values())
+
+    def add_worksheet(self, title, rows, cols):
+        self.client.call('add_worksheet', cells=rows * cols, sent={'title': title, 'rows': rows, 'cols': cols})
+        return self.seed(title, [], rows=rows, cols=cols)
+
+    def seed(self, title, values, rows=None, cols=None):
+        """إنشاء ورقة بقيم مبدئية بدون احتساب طلبات (الصف الأول = values[0])"""
+        width = max([len(row) for row in values] + [cols or 0, 1])
+        worksheet = FakeWorksheet(self, title, rows or len(values), width)
+        for row_number, row in enumerate(values, start=1):
+            worksheet.rows[row_number] = list(row)
+        self._sheets[title] = worksheet
+        return worksheet
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, rows, cols):
+        self.spreadsheet = spreadsheet
+        self.client = spreadsheet.client
+        self.title = title
+        self.row_count = rows
+        self.col_count = cols
+        self.rows = {}  # {رقم الصف: [قيم الأعمدة]}
+
+    def _read(self, first_row, last_row, first_col, last_col):
+        values = []
+        for row_number in range(first_row, min(last_row, self.row_count) + 1):
+            row = self.rows.get(row_number, [])[first_col:last_col + 1]
+            while row and row[-1] in ('', None):
+                row.pop()
+            values.append(row)
+        # مثل Sheets API: الصفوف الفارغة في النهاية لا تُرجع
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def get(self, range_name):
+        values = self._read(*parse_range(range_name, self.row_count, self.col_count))
+        self.client.call('get', cells=sum(len(row) for row in values), sent=range_name, received=values)
+        return values
+
+    def get_all_values(self):
+        values = self._read(1, self.row_count, 0, self.col_count - 1)
+        values = [row + [''] * (max(map(len, values)) - len(row)) for row in values] if values else []
+        self.client.call('get_all_values', cells=sum(len(row) for row in values), received=values)
+        return values
+
+    def _write(self, values, range_name):
+        first_row, last_row, first_col, _ = parse_range(range_name, self.row_count, self.col_count)
+        if first_row + len(values) - 1 > self.row_count:
+            raise gspread.exceptions.GSpreadException(
+                f"النطاق {range_name} خارج حدود الورقة ({self.row_count} صف)"
+            )
+        for offset, row in enumerate(values):
+            current = self.rows.setdefault(first_row + offset, [])
+            if len(current) < first_col + len(row):
+                current.extend([''] * (first_col + len(row) - len(current)))
+            current[first_col:first_col + len(row)] = list(row)
+
+    def update(self, values=None, range_name=None, **kwargs):
+        values = values or []
+        range_name = range_name or 'A1'
+        self.client.call('update', cells=sum(len(row) for row in values),
+                         sent={'range': range_name, 'values': values})
+        self._write(values, range_name)
+        return {'updatedCells': sum(len(row) for row in values)}
+
+    def batch_update(self, data, **kwargs):
+        cells = sum(len(row) for item in data for row in item['values'])
+        self.client.call('batch_update', cells=cells, sent=data)
+        for item in data:
+            self._write(item['values'], item['range'])
+        return {'totalUpdatedCells': cells}
+
+    def add_rows(self, rows):
+        self.client.call('add_rows', cells=rows * self.col_count, sent={'rows': rows})
+        self.row_count += rows
+
+
+def synthetic_voters(count, duplicate_rate=0.1, seed=1):
+    """[(الرقم القومي، الاسم)] بأرقام صالحة الشكل (14 رقم) مع نسبة أرقام مكررة"""
+    rng = random.Random(seed)
+    voters = []
+    for idx in range(count):
+        if voters and rng.random() < duplicate_rate:
+            voters.append(rng.choice(voters))
+            continue
+        national_id = (f"2{rng.randint(50, 99):02d}{rng.randint(1, 12):02d}"
+                       f"{rng.randint(1, 28):02d}{rng.randint(0, 9999999):07d}")
+        voters.append((national_id, f"ناخب {idx + 1}"))
+    return voters
+
+
+def seed_source_sheet(client, spreadsheet_id, title, voters):
+    """ورقة المصدر بنفس شكل ورقة Voters: الرقم القومي في B والاسم في C"""
+    spreadsheet = client.spreadsheet(spreadsheet_id)
+    rows = [['', 'الرقم القومي', 'الاسم']] + [['', national_id, name] for national_id, name in voters]
+    return spreadsheet.seed(title, rows)
@@ -2,79 +2,236 @@
 # -*- coding: utf-8 -*-
 """
 وحدة الاتصال بـ Google Sheets عبر Replit Connector
+الـ access token يُحفظ مع وقت انتهائه ويُجدد في الخلفية قبل انتهائه بوقت كافٍ
+(عبر جلسة HTTP واحدة)، وgspread يستخدمه كـ credentials قابلة للتجديد
+فلا تتوقف الكتابة في منتصف تشغيل طويل بسبب انتهاء صلاحية التوكن
 """
 
 import os
+import threading
+from datetime import datetime, timedelta, timezone
+
 import requests
 import gspread
 from google.oauth2.credentials import Credentials
 
-def get_access_token():
-    """الحصول على access token من Replit Connector"""
-    hostname = os.environ.get('REPLIT_CONNECTORS_HOSTNAME')
-    
-    if not hostname:
-        raise Exception('REPLIT_CONNECTORS_HOSTNAME غير موجود في المتغيرات البيئية')
-    
-    # الحصول على X_REPLIT_TOKEN
-    repl_identity = os.environ.get('REPL_IDENTITY')
-    web_repl_renewal = os.environ.get('WEB_REPL_RENEWAL')
-    
-    if repl_identity:
-        x_replit_token = f'repl {repl_identity}'
-    elif web_repl_renewal:
-        x_replit_token = f'depl {web_repl_renewal}'
-    else:
-        raise Exception('لم يتم العثور على REPL_IDENTITY أو WEB_REPL_RENEWAL')
-    
-    # طلب الاتصال
-    url = f'https://{hostname}/api/v2/connection?include_secrets=true&connector_names=google-sheet'
-    headers = {
-        'Accept': 'application/json',
-        'X_REPLIT_TOKEN': x_replit_token
-    }
-    
+# التجديد قبل انتهاء التوكن بهذه المدة (يجب أن تكون أكبر من هامش google-auth وهو 3:45 دقيقة)
+TOKEN_REFRESH_MARGIN = 600
+# مدة الصلاحية المفترضة إذا لم يرجع الـ connector وقت الانتهاء
+DEFAULT_TOKEN_LIFETIME = 45 * 60
+# الانتظار قبل إعادة محاولة التجديد في الخلفية بعد فشله، وأقل انتظار بين تجديدين ناجحين
+# (توكن صلاحيته أقصر من TOKEN_REFRESH_MARGIN لا يجعل خيط التجديد يطلب توكناً جديداً بلا توقف)
+TOKEN_RETRY_INTERVAL = 30
+CONNECTOR_TIMEOUT = 10
+
+
+def _utcnow():
+    """الوقت الحالي UTC بدون timezone (الصيغة التي يتوقعها google-auth)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _parse_expiry(value):
+    """وقت الانتهاء من ISO 8601 أو epoch (ثوانٍ أو ميلي ثانية) -> datetime UTC بدون timezone"""
+    if value in (None, ''):
+        return None
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        seconds = float(value)
+        if seconds > 1e11:  # ميلي ثانية
+            seconds /= 1000
+        return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _connector_token(settings):
+    """access token ووقت انتهائه من إعدادات الاتصال (مواقع مختلفة حسب نوع الاتصال)"""
+    oauth_credentials = settings.get('oauth', {}).get('credentials', {})
+    access_token = settings.get('access_token') or oauth_credentials.get('access_token')
+
+    expiry = None
+    for source in (settings, oauth_credentials):
+        expiry = expiry or _parse_expiry(source.get('expires_at') or source.get('expiry_date') or source.get('expiry'))
+        if expiry is None and source.get('expires_in'):
+            expiry = _utcnow() + timedelta(seconds=float(source['expires_in']))
+    return access_token, expiry
+
+
+class ReplitTokenProvider:
+    """
+    access token من Replit Connector مع وقت انتهائه:
+    - token(): التوكن المحفوظ، أو توكن جديد إذا اقترب انتهاؤه
+    - start(): thread يجدد التوكن قبل انتهائه بـ refresh_margin ثانية
+    - credentials(): Credentials لـ gspread تُحدّث تلقائياً مع كل تجديد
+    """
+
+    def __init__(self, hostname=None, refresh_margin=TOKEN_REFRESH_MARGIN, timeout=CONNECTOR_TIMEOUT):
+        self.hostname = hostname or os.environ.get('REPLIT_CONNECTORS_HOSTNAME')
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+        self.refreshes = 0
+        self._session = requests.Session()
+        self._session.headers['Accept'] = 'application/json'
+        self._lock = threading.Lock()
+        self._token = None
+        self._expiry = None
+        self._issued = None  # آخر توكن تم تسليمه لـ google-auth
+        self._credentials = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def _replit_token(self):
+        repl_identity = os.environ.get('REPL_IDENTITY')
+        web_repl_renewal = os.environ.get('WEB_REPL_RENEWAL')
+        if repl_identity:
+            return f'repl {repl_identity}'
+        if web_repl_renewal:
+            return f'depl {web_repl_renewal}'
+        raise Exception('لم يتم العثور على REPL_IDENTITY أو WEB_REPL_RENEWAL')
+
+    def fetch(self):
+        """طلب توكن جديد من Replit Connector -> (التوكن، وقت الانتهاء)"""
+        if not self.hostname:
+            raise Exception('REPLIT_CONNECTORS_HOSTNAME غير موجود في المتغيرات البيئية')
+
+        url = f'https://{self.hostname}/api/v2/connection?include_secrets=true&connector_names=google-sheet'
+        try:
+            response = self._session.get(url, headers={'X_REPLIT_TOKEN': self._replit_token()}, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            raise Exception(f'خطأ في الاتصال بـ Replit Connectors: {str(e)}')
+
         if response.status_code != 200:
             raise Exception(f'فشل الحصول على الاتصال: {response.status_code} - {response.text}')
-        
-        data = response.json()
-        items = data.get('items', [])
-        
+
+        items = response.json().get('items', [])
         if not items:
             raise Exception('لم يتم العثور على اتصال Google Sheets. تأكد من إعداد التكامل في Replit.')
-        
-        connection = items[0]
-        settings = connection.get('settings', {})
-        
-        # محاولة الحصول على access token من مواقع مختلفة
-        access_token = (
-            settings.get('access_token') or
-            settings.get('oauth', {}).get('credentials', {}).get('access_token')
-        )
-        
+
+        access_token, expiry = _connector_token(items[0].get('settings', {}))
         if not access_token:
             raise Exception('لم يتم العثور على access token في الاتصال')
-        
-        return access_token
-    except requests.exceptions.RequestException as e:
-        raise Exception(f'خطأ في الاتصال بـ Replit Connectors: {str(e)}')
+        if expiry is None:
+            expiry = _utcnow() + timedelta(seconds=DEFAULT_TOKEN_LIFETIME)
+        return access_token, expiry
+
+    def _expiring(self):
+        return self._expiry is None or _utcnow() >= self._expiry - timedelta(seconds=self.refresh_margin)
+
+    def refresh(self):
+        """طلب توكن جديد وتحديث الـ credentials المستخدمة في gspread"""
+        access_token, expiry = self.fetch()
+        with self._lock:
+            self._token = access_token
+            self._expiry = expiry
+            self.refreshes += 1
+            if self._credentials is not None:
+                self._credentials.token = access_token
+                self._credentials.expiry = expiry
+                self._issued = access_token
+        return access_token, expiry
+
+    def token(self, force=False):
+        """التوكن الحالي (يُجدد فقط إذا اقترب انتهاؤه أو عند force)"""
+        with self._lock:
+            if not force and self._token and not self._expiring():
+                return self._token, self._expiry
+        return self.refresh()
+
+    def refresh_handler(self, request, scopes=None):
+        """
+        يستدعيه google-auth عند انتهاء صلاحية الـ credentials أو بعد رد 401:
+        إذا كان التوكن المحفوظ هو نفس المُسلّم ولم يقترب انتهاؤه فقد رفضه Google - نطلب توكناً جديداً
+        """
+        with self._lock:
+            rejected = self._token is not None and self._token == self._issued and not self._expiring()
+        access_token, expiry = self.token(force=rejected)
+        with self._lock:
+            self._issued = access_token
+        return access_token, expiry
+
+    def credentials(self):
+        """Credentials قابلة للتجديد لـ gspread"""
+        access_token, expiry = self.token()
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = Credentials(
+                    token=access_token,
+                    expiry=expiry,
+                    refresh_handler=self.refresh_handler
+                )
+                self._issued = access_token
+            return self._credentials
+
+    def start(self):
+        """تجديد التوكن في الخلفية قبل انتهائه"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="token-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _refresh_loop(self):
+        refreshed = False
+        while not self._stop_event.is_set():
+            with self._lock:
+                expiry = self._expiry
+            if expiry is None:
+                delay = 0
+            else:
+                delay = (expiry - _utcnow()).total_seconds() - self.refresh_margin
+            if refreshed:
+                delay = max(delay, TOKEN_RETRY_INTERVAL)
+            if delay > 0 and self._stop_event.wait(delay):
+                return
+
+            try:
+                _, expiry = self.refresh()
+                refreshed = True
+                print(f"  🔑 تم تجديد توكن Google Sheets (صالح حتى {expiry:%H:%M} UTC)")
+            except Exception as e:
+                print(f"  تحذير: فشل تجديد توكن Google Sheets: {str(e)} - إعادة المحاولة بعد {TOKEN_RETRY_INTERVAL} ثانية")
+                if self._stop_event.wait(TOKEN_RETRY_INTERVAL):
+                    return
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_token_provider():
+    """مزود توكن واحد لكل العملية"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = ReplitTokenProvider()
+        return _provider
+
+
+def get_access_token():
+    """الحصول على access token من Replit Connector (من الذاكرة إذا كان لا يزال صالحاً)"""
+    access_token, _ = get_token_provider().token()
+    return access_token
+
 
 def get_google_sheets_client():
     """إنشاء client لـ Google Sheets باستخدام Replit Connector"""
     try:
-        access_token = get_access_token()
-        
-        # إنشاء Credentials باستخدام access token
-        credentials = Credentials(token=access_token)
-        
+        provider = get_token_provider()
+        credentials = provider.credentials()
+        provider.start()
+
         # إنشاء gspread client
         gc = gspread.authorize(credentials)
-        
+
         return gc
-        
+
     except Exception as e:
         raise Exception(f'فشل الاتصال بـ Google Sheets: {str(e)}')
 
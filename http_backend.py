@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+واجهة استعلام مباشرة عبر HTTP بدون متصفح
+ترسل نفس نموذج الاستعلام الموجود في iframe الـ gadget باستخدام requests.Session
+(اتصال مستمر لكل عامل) وتعيد صفحة النتيجة كـ HTML لمحرك الاستخراج
+"""
+
+import threading
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+
+from extraction import HTML_PARSER
+
+# أسماء حقل الرقم القومي المعروفة في النموذج
+NATIONAL_ID_FIELDS = ['nid', 'nationalId', 'national_id']
+
+DEFAULT_HEADERS = {
+    'User-Agent': (
+        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+    ),
+    'Accept-Language': 'ar,en;q=0.8',
+}
+
+
+class HttpBackendError(Exception):
+    """تعذر الاستعلام عبر HTTP - يجب الرجوع لـ Selenium"""
+
+
+class HttpInquiryBackend:
+    """إرسال نموذج الاستعلام مباشرة عبر HTTP"""
+
+    def __init__(self, inquiry_url, frame_url=None, pool_size=10, timeout=15, max_form_failures=3):
+        self.inquiry_url = inquiry_url
+        self.frame_url = frame_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_form_failures = max_form_failures
+        self.disabled = False
+        self._form = None
+        self._form_failures = 0
+        # نماذج متتالية (بعد إعادة القراءة) لم يُتعرف على صفحات نتيجتها
+        self._page_failures = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        """جلسة HTTP مستمرة لكل عامل (تعيد استخدام الاتصالات بدلاً من فتح اتصال لكل طلب)"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            self._local.session = session
+        return session
+
+    def _get(self, url):
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise HttpBackendError(f"فشل طلب {url}: {str(e)}")
+        response.encoding = response.encoding or 'utf-8'
+        return response
+
+    def discover_frame_url(self):
+        """البحث عن رابط iframe الاستعلام في الصفحة الخارجية"""
+        response = self._get(self.inquiry_url)
+        soup = BeautifulSoup(response.text, HTML_PARSER)
+        for iframe in soup.find_all('iframe'):
+            src = iframe.get('src') or ''
+            if 'inquiry' in src.lower() or 'gadget' in src.lower():
+                return urljoin(response.url, src)
+        raise HttpBackendError("لم يتم العثور على iframe الاستعلام في الصفحة")
+
+    @staticmethod
+    def parse_form(html, base_url):
+        """
+        استخراج بيانات نموذج الاستعلام: الرابط، الطريقة، الحقول المخفية، واسم حقل الرقم القومي
+        النماذج التي يرسلها JavaScript فقط (action="javascript:...") غير مدعومة
+        """
+        soup = BeautifulSoup(html, HTML_PARSER)
+        for form in soup.find_all('form'):
+            field_name = None
+            for name in NATIONAL_ID_FIELDS:
+                field = form.find('input', attrs={'name': name}) or form.find('input', id=name)
+                if field is not None:
+                    field_name = field.get('name') or name
+                    break
+            if field_name is None:
+                continue
+
+            action = (form.get('action') or '').strip()
+            if action.lower().startswith('javascript:'):
+                raise HttpBackendError("النموذج يُرسل عبر JavaScript فقط")
+
+            fields = {}
+            for hidden in form.find_all('input', attrs={'type': 'hidden'}):
+                if hidden.get('name'):
+                    fields[hidden['name']] = hidden.get('value', '')
+
+            return {
+                'action': urljoin(base_url, action) if action else base_url,
+                'method': (form.get('method') or 'get').lower(),
+                'fields': fields,
+                'national_id_field': field_name,
+            }
+
+        raise HttpBackendError("لم يتم العثور على نموذج يحتوي على حقل الرقم القومي")
+
+    def _load_form(self):
+        """تحميل النموذج مرة واحدة وحفظه لكل الطلبات التالية"""
+        with self._lock:
+            if self._form is not None:
+                return self._form
+            if self.disabled:
+                raise HttpBackendError("تم تعطيل الاستعلام عبر HTTP")
+
+        try:
+            frame_url = self.frame_url or self.discover_frame_url()
+            response = self._get(frame_url)
+            form = self.parse_form(response.text, response.url)
+        except HttpBackendError:
+            with self._lock:
+                self._form_failures += 1
+                if self._form_failures >= self.max_form_failures and not self.disabled:
+                    self.disabled = True
+                    print("  ⚠️ تعطيل الاستعلام عبر HTTP بعد تكرار فشل قراءة النموذج - استخدام Selenium فقط")
+            raise
+
+        with self._lock:
+            self.frame_url = frame_url
+            self._form = form
+            self._form_failures = 0
+        print(f"  ✓ نموذج الاستعلام عبر HTTP: {form['method'].upper()} {form['action'][:100]}")
+        return form
+
+    def invalidate(self):
+        """
+        صفحة النتيجة لم يُتعرف عليها: إعادة قراءة النموذج في الطلب التالي (الحقول المخفية قد تكون تغيرت)
+        الفشل يُحسب مرة واحدة لكل نموذج، والتعطيل بعد تكرار الفشل مع نماذج أُعيدت قراءتها
+        """
+        with self._lock:
+            form = getattr(self._local, 'form', None)
+            if form is None or form is not self._form:
+                # نموذج قديم أعاد عامل آخر قراءته بالفعل
+                return
+            self._form = None
+            self._page_failures += 1
+            if self._page_failures >= self.max_form_failures and not self.disabled:
+                self.disabled = True
+                print("  ⚠️ تعطيل الاستعلام عبر HTTP بعد تكرار عدم التعرف على صفحة النتيجة - استخدام Selenium فقط")
+
+    def page_recognized(self):
+        """تم التعرف على صفحة النتيجة: النموذج الحالي صالح"""
+        if self._page_failures:
+            with self._lock:
+                self._page_failures = 0
+
+    def fetch_result_page(self, national_id):
+        """إرسال الرقم القومي وإرجاع HTML صفحة النتيجة"""
+        form = self._load_form()
+        self._local.form = form
+        data = dict(form['fields'])
+        data[form['national_id_field']] = national_id
+
+        try:
+            if form['method'] == 'post':
+                response = self.session.post(form['action'], data=data, timeout=self.timeout)
+            else:
+                response = self.session.get(form['action'], params=data, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise HttpBackendError(f"فشل إرسال النموذج: {str(e)}")
+
+        response.encoding = response.encoding or 'utf-8'
+        return response.text
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+توزيع صفوف ورقة Voters على عدة نسخ من البوت تعمل على نفس الملف:
+كل نسخة تحجز نطاق صفوف (lease) في قاعدة SQLite مشتركة (مجلد مشترك بين الحاويات)،
+وتجدد حجزها دورياً طالما تعمل عليه، ثم تسجله كمنتهي بعد كتابة كل نتائجه
+إذا توقفت نسخة فجأة ينتهي حجزها بعد lease_seconds وتأخذ نطاقها أول نسخة تطلب نطاقاً جديداً
+"""
+
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+
+LEASED = 'leased'
+DONE = 'done'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    range_start INTEGER PRIMARY KEY,
+    range_end INTEGER NOT NULL,
+    owner TEXT NOT NULL,
+    status TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    takeovers INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leases_active ON leases (expires_at) WHERE status = 'leased';
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def default_owner():
+    """اسم فريد لكل نسخة: اسم الجهاز (الحاوية) ورقم العملية"""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class LeaseStore:
+    """
+    حجز نطاقات الصفوف بين عدة نسخ:
+    - claim(): نطاق انتهى حجز صاحبه (نسخة متوقفة) أو نطاق جديد بعد آخر نطاق محجوز
+    - add_rows() / rows_done(): الصفوف المنتظرة في كل نطاق؛ النطاق يُسجل منتهياً عند كتابة آخر صف فيه
+    - start_heartbeat(): تجديد كل النطاقات المحجوزة كل lease_seconds / 3
+    - release_all(): عند الخروج تُترك النطاقات غير المنتهية لتأخذها نسخة أخرى فوراً
+    """
+
+    def __init__(self, path, range_size=500, lease_seconds=120, first_row=2, owner=None):
+        self.path = path
+        self.range_size = range_size
+        self.lease_seconds = lease_seconds
+        self.first_row = first_row
+        self.owner = owner or default_owner()
+        self.claimed = 0
+        self.takeovers = 0
+        self.lost = 0
+        self._lock = threading.Lock()
+        # النطاقات المحجوزة حالياً {بداية النطاق: {'end', 'pending': صفوف لم تُكتب, 'read': انتهت قراءته}}
+        self._held = {}
+        self._thread = None
+        self._stop_event = threading.Event()
+        # autocommit مع BEGIN IMMEDIATE صريح: الحجز يقرأ ثم يكتب ولا يجب أن تتداخل نسختان
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        # بدون WAL: ملف القاعدة على مجلد مشترك قد لا يدعم الذاكرة المشتركة التي يحتاجها WAL
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(SCHEMA)
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._conn)
+
+    def _get_meta(self, key, default):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def claim(self):
+        """
+        حجز نطاق جديد -> (أول صف، آخر صف) أو None إذا لم يبق نطاق متاح الآن
+        الأولوية للنطاقات المتروكة (انتهى حجزها) قبل النطاقات الجديدة
+        """
+        now = time.time()
+        with self._lock, self._transaction():
+            expired = self._conn.execute(
+                "SELECT range_start, range_end, owner FROM leases "
+                "WHERE status = ? AND expires_at < ? ORDER BY range_start LIMIT 1",
+                (LEASED, now)
+            ).fetchone()
+            if expired is not None:
+                start, end, previous_owner = expired
+                self._conn.execute(
+                    "UPDATE leases SET owner = ?, expires_at = ?, takeovers = takeovers + 1, updated_at = ? "
+                    "WHERE range_start = ?",
+                    (self.owner, now + self.lease_seconds, now, start)
+                )
+                self.takeovers += 1
+                print(f"  🔁 استلام الصفوف {start}-{end} من نسخة متوقفة ({previous_owner})")
+            else:
+                start = self._get_meta('next_start', self.first_row)
+                end_row = self._get_meta('end_row', None)
+                if end_row is not None and start > end_row:
+                    return None
+                end = start + self.range_size - 1
+                if end_row is not None:
+                    end = min(end, end_row)
+                self._conn.execute(
+                    "INSERT INTO leases (range_start, range_end, owner, status, expires_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (start, end, self.owner, LEASED, now + self.lease_seconds, now)
+                )
+                self._set_meta('next_start', end + 1)
+            self._held[start] = {'end': end, 'pending': set(), 'read': False}
+            self.claimed += 1
+            return start, end
+
+    def mark_end(self, last_row):
+        """
+        آخر صف في الورقة (حجمها عند بدء القراءة):
+        لا تُحجز نطاقات بعده، والنطاقات التي تبدأ بعده تُسجل منتهية
+        """
+        now = time.time()
+        with self._lock, self._transaction():
+            current = self._get_meta('end_row', None)
+            if current is None or last_row < current:
+                self._set_meta('end_row', last_row)
+            self._conn.execute(
+                "UPDATE leases SET status = ?, updated_at = ? WHERE range_start > ? AND status = ?",
+                (DONE, now, last_row, LEASED)
+            )
+            for start in [start for start in self._held if start > last_row]:
+                del self._held[start]
+
+    def add_rows(self, start, row_numbers, read_complete=True):
+        """الصفوف التي أُرسلت للاستعلام من النطاق (يُسجل منتهياً عندما تُكتب كلها)"""
+        with self._lock:
+            lease = self._held.get(start)
+            if lease is None:
+                return
+            lease['pending'].update(row_numbers)
+            lease['read'] = lease['read'] or read_complete
+        self._release_finished()
+
+    def rows_done(self, row_numbers):
+        """تم تأكيد كتابة هذه الصفوف في الشيت"""
+        with self._lock:
+            for lease in self._held.values():
+                if lease['pending']:
+                    lease['pending'].difference_update(row_numbers)
+        self._release_finished()
+
+    def _release_finished(self):
+        with self._lock:
+            finished = [start for start, lease in self._held.items() if lease['read'] and not lease['pending']]
+            if not finished:
+                return
+            now = time.time()
+            with self._transaction():
+                self._conn.executemany(
+                    "UPDATE leases SET status = ?, updated_at = ? WHERE range_start = ? AND owner = ?",
+                    ((DONE, now, start, self.owner) for start in finished)
+                )
+            for start in finished:
+                del self._held[start]
+
+    def renew(self):
+        """تجديد كل النطاقات المحجوزة؛ النطاقات التي أخذتها نسخة أخرى (بعد توقف طويل) تُترك"""
+        with self._lock:
+            if not self._held:
+                return 0
+            now = time.time()
+            with self._transaction():
+                self._conn.executemany(
+                    "UPDATE leases SET expires_at = ?, updated_at = ? WHERE range_start = ? AND owner = ? AND status = ?",
+                    ((now + self.lease_seconds, now, start, self.owner, LEASED) for start in self._held)
+                )
+                owned = {
+                    start for (start,) in self._conn.execute(
+                        "SELECT range_start FROM leases WHERE owner = ? AND status = ?", (self.owner, LEASED)
+                    )
+                }
+            lost = [start for start in self._held if start not in owned]
+            for start in lost:
+                print(f"  ⚠️ انتهى حجز الصفوف {start}-{self._held[start]['end']} وأخذته نسخة أخرى")
+                del self._held[start]
+            self.lost += len(lost)
+            return len(self._held)
+
+    def others_active(self):
+        """عدد الثواني حتى ينتهي أقرب حجز لنسخة أخرى لم ينته نطاقها، أو None إذا لم يبق شيء"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(expires_at) FROM leases WHERE status = ? AND owner != ?", (LEASED, self.owner)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def start_heartbeat(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._heartbeat_loop, name="lease-heartbeat", daemon=True)
+        self._thread.start()
+
+    def _heartbeat_loop(self):
+        while not self._stop_event.wait(max(1.0, self.lease_seconds / 3)):
+            try:
+                self.renew()
+            except sqlite3.Error as e:
+                print(f"  تحذير: فشل تجديد حجز الصفوف: {str(e)}")
+
+    def release_all(self):
+        """ترك النطاقات غير المنتهية (تصبح متاحة فوراً لنسخة أخرى)"""
+        with self._lock:
+            if not self._held:
+                return 0
+            with self._transaction():
+                self._conn.executemany(
+                    "UPDATE leases SET expires_at = 0 WHERE range_start = ? AND owner = ? AND status = ?",
+                    ((start, self.owner, LEASED) for start in self._held)
+                )
+            released = len(self._held)
+            self._held.clear()
+            return released
+
+    def summary(self):
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM leases GROUP BY status").fetchall())
+            active_owners = self._conn.execute(
+                "SELECT COUNT(DISTINCT owner) FROM leases WHERE status = ? AND expires_at >= ?", (LEASED, time.time())
+            ).fetchone()[0]
+            return {
+                'owner': self.owner,
+                'done': counts.get(DONE, 0),
+                'leased': counts.get(LEASED, 0),
+                'active_owners': active_owners,
+                'claimed': self.claimed,
+                'takeovers': self.takeovers,
+                'lost': self.lost,
+            }
+
+    def close(self):
+        self._stop_event.set()
+        self.release_all()
+        with self._lock:
+            self._conn.close()
+
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE ... COMMIT (أو ROLLBACK عند الخطأ) - قفل الكتابة من أول المعاملة"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
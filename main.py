@@ -8,18 +8,35 @@
 import os
 import json
 import time
+import threading
 import gspread
 from google.oauth2.service_account import Credentials
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
 import pandas as pd
-from datetime import datetime
+from collections import Counter
+from results_writer import BufferedResultsWriter, format_result_row
+from extraction import extract_voter_data, detect_outcome, empty_result
+from worker_pool import BrowserWorkerPool, RateLimiter
+from pipeline import InquiryPipeline
+from http_backend import HttpInquiryBackend, HttpBackendError
+from result_cache import ResultCache
+from text_matcher import normalize_national_id
+from checkpoint_store import CheckpointStore
+from lease_store import LeaseStore
+from source_sheets import parse_sources, source_file, describe
+from retry_queue import RetryScheduler
+from browser_manager import DriverManager
+from metrics import METRICS
+from perf_trace import TRACER
+from fake_sheets import FakeSheetsClient, synthetic_voters, seed_source_sheet
+from sheets_limiter import SheetsRateLimiter
 
 # استيراد وحدة الاتصال بـ Google Sheets عبر Replit
 try:
@@ -35,14 +52,150 @@ except ImportError:
     app = None
 
 # إعدادات الملفات
-PROGRESS_FILE = "progress.json"
+PROGRESS_FILE = "progress.json"  # الصيغة القديمة - يتم نقلها لسجل الصفوف تلقائياً
+CHECKPOINT_DB = "checkpoints.db"  # حالة كل صف (SQLite)
 SPREADSHEET_ID = "1-rCGPx6vyEMm3zmR7ks3xZh63XcJk4ks78e5e9jfuyo"
 SOURCE_SHEET = "Voters"
 RESULTS_SHEET = "نتائج_الاستعلام"
-INQUIRY_URL = "https://www.elections.eg/inquiry"
+INQUIRY_URL = os.environ.get('INQUIRY_URL', "https://www.elections.eg/inquiry")  # يمكن توجيهه لموقع محلي (fake_inquiry_site.py)
 
-# الحد الأقصى للصفوف
-MAX_ROWS = 80000
+# مصدر الشيت: google أو memory (شيت في الذاكرة من fake_sheets.py لقياس عدد الطلبات بدون شيت حقيقي)
+SHEETS_BACKEND = os.environ.get('SHEETS_BACKEND', 'google').strip().lower()
+FAKE_SHEETS_ROWS = int(os.environ.get('FAKE_SHEETS_ROWS', '1000'))  # عدد الصفوف في ورقة المصدر
+FAKE_SHEETS_LATENCY = float(os.environ.get('FAKE_SHEETS_LATENCY', '0'))  # زمن كل طلب بالثواني
+FAKE_SHEETS_QUOTA_ERROR_RATE = float(os.environ.get('FAKE_SHEETS_QUOTA_ERROR_RATE', '0'))  # نسبة أخطاء 429
+
+# حصة Google Sheets في الدقيقة (كل الطلبات تمر من حد مشترك وتنتظر بدلاً من أن تفشل)
+SHEETS_READ_PER_MINUTE = int(os.environ.get('SHEETS_READ_PER_MINUTE', '60'))
+SHEETS_WRITE_PER_MINUTE = int(os.environ.get('SHEETS_WRITE_PER_MINUTE', '60'))
+SHEETS_BURST = 10  # عدد الطلبات المسموح بها دفعة واحدة قبل الالتزام بالمعدل
+SHEETS_MAX_RETRIES = 6  # إعادة المحاولة عند 429 أو 5xx أو انقطاع الاتصال
+SHEETS_BACKOFF_BASE = 2  # التأخير الأول بالثواني (يتضاعف بعد كل محاولة) إذا لم يحدد الرد Retry-After
+SHEETS_BACKOFF_MAX = 64
+
+# أوراق المصدر: أسماء أوراق في نفس الملف أو <معرف ملف>:<اسم ورقة>، مفصولة بفاصلة (تُعالج بالترتيب)
+# كل مصدر غير Voters له ورقة نتائج "<RESULTS_SHEET>_<اسم الورقة>" وسجل تقدم منفصل
+SOURCES = parse_sources(os.environ.get('SOURCES', ''), SPREADSHEET_ID, SOURCE_SHEET, RESULTS_SHEET)
+
+# ورقة النتائج تبدأ صغيرة وتزيد أثناء الكتابة (لا يوجد حد أقصى لعدد الصفوف)
+RESULTS_INITIAL_ROWS = 1000
+RESULTS_GROW_ROWS = 5000  # عدد الصفوف المضافة في كل طلب add_rows
+
+# القراءة التدريجية لورقة المصدر (العمودين B:C فقط)
+SOURCE_PAGE_SIZE = 500  # عدد الصفوف في كل طلب قراءة
+
+# تشغيل عدة نسخ على نفس الملف: كل نسخة تحجز نطاقات صفوف في قاعدة مشتركة (مسار على مجلد مشترك)
+# فارغ = نسخة واحدة تقرأ الورقة كاملة من سجل التقدم المحلي
+LEASE_DB = os.environ.get('LEASE_DB', '')
+LEASE_RANGE_SIZE = int(os.environ.get('LEASE_RANGE_SIZE', '500'))  # عدد الصفوف في كل نطاق
+LEASE_SECONDS = int(os.environ.get('LEASE_SECONDS', '120'))  # مدة الحجز بدون تجديد قبل أن تأخذه نسخة أخرى
+LEASE_POLL_INTERVAL = 10  # الانتظار قبل إعادة الطلب إذا كانت كل النطاقات المتبقية محجوزة لنسخ أخرى
+
+# إعادة تشغيل متصفح كل عامل دورياً (Chrome تزيد ذاكرته مع كثرة التنقل)
+BROWSER_MAX_QUERIES = 300  # عدد الاستعلامات قبل فتح متصفح جديد
+BROWSER_MAX_RSS_MB = 1500  # الحد الأقصى لذاكرة Chrome وعملياته بالميجابايت
+BROWSER_MEMORY_CHECK_INTERVAL = 20  # فحص الذاكرة كل N استعلام
+
+# إعدادات التوازي: عدد المتصفحات المستقلة والحد الأقصى العام لعدد الطلبات في الثانية
+WORKER_COUNT = int(os.environ.get('WORKER_COUNT', '1'))
+MAX_REQUESTS_PER_SECOND = float(os.environ.get('MAX_REQUESTS_PER_SECOND', '0.5'))
+
+# طريقة الاستعلام: 'selenium' (متصفح لكل عامل) أو 'http' (إرسال النموذج مباشرة مع الرجوع للمتصفح عند الحاجة)
+QUERY_BACKEND = os.environ.get('QUERY_BACKEND', 'selenium').strip().lower()
+HTTP_TIMEOUT = 15  # مهلة كل طلب HTTP بالثواني
+
+# إعدادات مراحل التشغيل (قراءة ← استعلام ← كتابة ← حفظ التقدم)
+PIPELINE_QUEUE_SIZE = 100  # الحد الأقصى لكل طابور بين مرحلتين
+PIPELINE_STATS_FILE = "pipeline_stats.json"  # أعماق الطوابير وانشغال المراحل (يقرأه الـ dashboard)
+PIPELINE_STATS_INTERVAL = 30  # الفترة بين كل تقرير وآخر بالثواني
+
+# ذاكرة النتائج المحلية (تبقى بين مرات التشغيل حتى بعد إعادة التعيين)
+RESULT_CACHE_FILE = "results_cache.db"
+# مدة صلاحية كل حالة بالثواني؛ النتائج المؤقتة (no_data وكل ما يُعاد محاولته - انظر is_transient)
+# لا تُحفظ أبداً، وأي حالة غير موجودة هنا لا تُحفظ
+RESULT_CACHE_TTL = {
+    'success': 30 * 24 * 3600,
+    'no_voting_right': 30 * 24 * 3600,
+    'error': 15 * 60,
+}
+
+# إعادة محاولة الأخطاء المؤقتة (انقطاع، مهلة، Captcha، صفحة غير مفهومة) بعد انتهاء القراءة
+RETRY_MAX_ATTEMPTS = 4  # الحد الأقصى للمحاولات لكل رقم قومي
+RETRY_BASE_DELAY = 30  # التأخير قبل المحاولة الثانية بالثواني (يتضاعف بعد كل محاولة)
+RETRY_MAX_DELAY = 600  # الحد الأقصى للتأخير
+
+# مقاييس التشغيل (يقرأها الـ dashboard ويعرضها على /metrics)
+METRICS_FILE = "bot_metrics.json"
+METRICS_INTERVAL = 10  # الفترة بين كل حفظ وآخر بالثواني
+
+# سجل زمني لكل استعلام (JSON لكل سطر) وتقرير الأداء في نهاية التشغيل
+PERF_TRACE_FILE = "perf_trace.jsonl"
+PERF_REPORT_FILE = "perf_report.json"
+
+# إعدادات الكتابة المجمعة في ورقة النتائج
+RESULTS_BATCH_SIZE = 50  # عدد الصفوف قبل الكتابة
+RESULTS_FLUSH_INTERVAL = 30  # أقصى مدة (بالثواني) قبل كتابة الصفوف المعلقة
+
+# إعدادات انتظار نتيجة الاستعلام
+OUTCOME_WAIT_TIMEOUT = 20  # الحد الأقصى (بالثواني) لانتظار ظهور أي نتيجة
+OUTCOME_POLL_INTERVAL = 0.25  # الفترة بين كل فحص وآخر
+PAGE_READY_TIMEOUT = 10  # الحد الأقصى لانتظار ظهور الإطارات بعد فتح الصفحة
+FORM_READY_TIMEOUT = 5  # الحد الأقصى لانتظار النموذج عند فتح رابط الإطار المحفوظ مباشرة
+INPUT_READY_TIMEOUT = 15  # الحد الأقصى لانتظار حقل الرقم القومي (بكل الأسماء المعروفة معاً)
+
+# أسماء حقل الرقم القومي المعروفة (nid في صفحة gadget الحالية - انظر test_result.html)
+NATIONAL_ID_LOCATORS = [
+    (By.NAME, "nationalId"),
+    (By.ID, "nationalId"),
+    (By.ID, "nid"),
+    (By.NAME, "nid"),
+]
+
+# الوضع الخفيف للمتصفح: تحميل eager، بدون صور، وحجب الإعلانات والتتبع والخطوط عبر CDP
+LEAN_BROWSER = os.environ.get('LEAN_BROWSER', '1') == '1'
+BLOCKED_URL_PATTERNS = [
+    # الإعلانات والتحليلات
+    '*doubleclick.net*',
+    '*googlesyndication.com*',
+    '*googleadservices.com*',
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*facebook.net*',
+    '*facebook.com/tr*',
+    '*hotjar.com*',
+    # الخطوط والصور
+    '*fonts.googleapis.com*',
+    '*fonts.gstatic.com*',
+    '*.woff', '*.woff2', '*.ttf',
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.webp', '*.ico',
+]
+# Network.setBlockedURLs لا يدعم استثناءات: القائمة أعلاه هي كل ما يُحجب، ولا يجب أن تحتوي
+# نمطاً يطابق سكربتات reCAPTCHA في الـ gadget (www.google.com/recaptcha و www.gstatic.com/recaptcha)
+# إذا توقف ظهور الـ Captcha أو فشل حله في الوضع الخفيف: LEAN_BROWSER=0
+
+# سكريبت يقيس حجم البيانات المنقولة ووقت التحميل للصفحة الحالية من Performance API
+PAGE_METRICS_SCRIPT = """
+var nav = performance.getEntriesByType('navigation')[0];
+var resources = performance.getEntriesByType('resource');
+var bytes = nav ? (nav.transferSize || 0) : 0;
+for (var i = 0; i < resources.length; i++) { bytes += resources[i].transferSize || 0; }
+performance.clearResourceTimings();
+return {
+    bytes: bytes,
+    resources: resources.length,
+    load_ms: nav ? (nav.domContentLoadedEventEnd || nav.responseEnd) : 0
+};
+"""
+
+# سكريبت يقرأ نص الصفحة ويتحقق من وجود جدول النتائج في طلب واحد للمتصفح
+OUTCOME_PROBE_SCRIPT = """
+var body = document.body;
+var table = document.evaluate(
+    "//table//*[self::th or self::td][contains(text(), 'مركز')]", document, null,
+    XPathResult.FIRST_ORDERED_NODE_TYPE, null
+).singleNodeValue;
+return {text: body ? body.innerText : '', has_table: table !== null};
+"""
 
 
 class VoterInquiryBot:
@@ -51,26 +204,93 @@ class VoterInquiryBot:
     def __init__(self):
         self.gc = None
         self.spreadsheet = None
+        self._local = threading.local()  # متصفح مستقل لكل عامل
         self.driver = None
-        self.progress = self.load_progress()
-        
-    def load_progress(self):
-        """تحميل التقدم السابق"""
-        if os.path.exists(PROGRESS_FILE):
-            with open(PROGRESS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {"last_row": 0, "total_processed": 0, "last_updated": None}
+        self.inquiry_frame_url = None  # رابط iframe النموذج بعد اكتشافه لأول مرة
+        self.rate_limiter = RateLimiter(MAX_REQUESTS_PER_SECOND)  # حد واحد لكل الطلبات للموقع
+        self.http_backend = None
+        if QUERY_BACKEND == 'http':
+            self.http_backend = HttpInquiryBackend(INQUIRY_URL, pool_size=WORKER_COUNT, timeout=HTTP_TIMEOUT)
+        self.browsers = DriverManager(
+            self,
+            max_queries=BROWSER_MAX_QUERIES,
+            max_rss_mb=BROWSER_MAX_RSS_MB,
+            memory_check_interval=BROWSER_MEMORY_CHECK_INTERVAL
+        )
+        self.sheets_limiter = SheetsRateLimiter(
+            read_per_minute=SHEETS_READ_PER_MINUTE,
+            write_per_minute=SHEETS_WRITE_PER_MINUTE,
+            burst=SHEETS_BURST,
+            max_retries=SHEETS_MAX_RETRIES,
+            base_delay=SHEETS_BACKOFF_BASE,
+            max_delay=SHEETS_BACKOFF_MAX
+        )
+        self.source = None
+        self.checkpoints = None
+        self.leases = None
+        self.use_source(SOURCES[0])
+        
+    @property
+    def driver(self):
+        """متصفح العامل الحالي (كل thread له متصفحه الخاص)"""
+        return getattr(self._local, 'driver', None)
+    
+    @driver.setter
+    def driver(self, value):
+        self._local.driver = value
+    
+    def on_results_flushed(self, row_numbers):
+        """تسجيل الصفوف كمنتهية بعد تأكيد كتابة دفعة من النتائج في الشيت (commit واحد للدفعة)"""
+        with TRACER.batch_phase('checkpoint', row_numbers):
+            self.checkpoints.mark_done(row_numbers)
+            if self.leases is not None:
+                self.leases.rows_done(row_numbers)
+        TRACER.complete(row_numbers)
+    
+    def open_spreadsheet(self, spreadsheet_id=SPREADSHEET_ID):
+        """فتح الملف بحيث تمر كل طلبات القراءة والكتابة عليه من حد Google Sheets"""
+        return self.sheets_limiter.wrap(
+            self.sheets_limiter.call('read', self.gc.open_by_key, spreadsheet_id)
+        )
     
-    def save_progress(self):
-        """حفظ التقدم الحالي"""
-        self.progress["last_updated"] = datetime.now().isoformat()
-        with open(PROGRESS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.progress, f, ensure_ascii=False, indent=2)
+    def use_source(self, source):
+        """
+        اختيار ورقة المصدر الحالية: سجل التقدم وقاعدة الحجز الخاصين بها،
+        والملف الذي يحتويها إذا كان غير الملف المفتوح
+        """
+        if self.source is not source:
+            if self.checkpoints is not None:
+                self.checkpoints.close()
+            if self.leases is not None:
+                self.leases.close()
+            self.source = source
+            self.checkpoints = CheckpointStore(source_file(CHECKPOINT_DB, source))
+            if not source['key']:
+                self.checkpoints.migrate_progress_file(PROGRESS_FILE)
+            self.leases = None
+            if LEASE_DB:
+                self.leases = LeaseStore(
+                    source_file(LEASE_DB, source),
+                    range_size=LEASE_RANGE_SIZE,
+                    lease_seconds=LEASE_SECONDS
+                )
+        
+        if self.gc is not None and (self.spreadsheet is None or self.spreadsheet.id != source['spreadsheet_id']):
+            self.spreadsheet = self.open_spreadsheet(source['spreadsheet_id'])
     
     def connect_to_sheets(self):
         """الاتصال بـ Google Sheets"""
         print("جاري الاتصال بـ Google Sheets...")
         
+        if SHEETS_BACKEND == 'memory':
+            self.gc = FakeSheetsClient(latency=FAKE_SHEETS_LATENCY, quota_error_rate=FAKE_SHEETS_QUOTA_ERROR_RATE)
+            for index, source in enumerate(SOURCES):
+                seed_source_sheet(self.gc, source['spreadsheet_id'], source['title'],
+                                  synthetic_voters(FAKE_SHEETS_ROWS, seed=index + 1))
+            self.spreadsheet = self.open_spreadsheet()
+            print(f"✓ استخدام شيت في الذاكرة ({FAKE_SHEETS_ROWS} صف) - لن يتم الاتصال بـ Google Sheets")
+            return
+        
         # تعريف الصلاحيات المطلوبة
         scope = [
             'https://spreadsheets.google.com/feeds',
@@ -85,7 +305,7 @@ class VoterInquiryBot:
                 creds_dict = json.loads(creds_json_str)
                 credentials = Credentials.from_service_account_info(creds_dict, scopes=scope)
                 self.gc = gspread.authorize(credentials)
-                self.spreadsheet = self.gc.open_by_key(SPREADSHEET_ID)
+                self.spreadsheet = self.open_spreadsheet()
                 print("✓ تم الاتصال بنجاح عبر متغير البيئة")
                 return
             except Exception as e:
@@ -96,7 +316,7 @@ class VoterInquiryBot:
             try:
                 print("  استخدام Replit Google Sheets Connector...")
                 self.gc = get_google_sheets_client()
-                self.spreadsheet = self.gc.open_by_key(SPREADSHEET_ID)
+                self.spreadsheet = self.open_spreadsheet()
                 print("✓ تم الاتصال بنجاح عبر Replit Connector")
                 return
             except Exception as e:
@@ -120,7 +340,7 @@ class VoterInquiryBot:
             try:
                 credentials = Credentials.from_service_account_file(creds_file, scopes=scope)
                 self.gc = gspread.authorize(credentials)
-                self.spreadsheet = self.gc.open_by_key(SPREADSHEET_ID)
+                self.spreadsheet = self.open_spreadsheet()
                 print("✓ تم الاتصال بنجاح عبر credentials.json")
                 return
             except Exception as e:
@@ -150,6 +370,14 @@ class VoterInquiryBot:
         chrome_options.add_argument('--lang=ar')
         chrome_options.add_argument('--disable-blink-features=AutomationControlled')
         
+        if LEAN_BROWSER:
+            # لا ننتظر الصور والإطارات الفرعية - النموذج يكفيه اكتمال DOM
+            chrome_options.page_load_strategy = 'eager'
+            chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+            chrome_options.add_experimental_option('prefs', {
+                'profile.managed_default_content_settings.images': 2
+            })
+        
         # محاولة استخدام ChromeDriver المثبت من النظام
         import shutil
         chromedriver_path = shutil.which('chromedriver')
@@ -167,16 +395,41 @@ class VoterInquiryBot:
             print("  تحميل ChromeDriver تلقائياً...")
             self.driver = webdriver.Chrome(options=chrome_options)
         
+        if LEAN_BROWSER:
+            self.block_urls()
+        
         print("✓ تم إعداد المتصفح بنجاح")
     
+    def block_urls(self):
+        """حجب الروابط غير الضرورية عبر CDP (أنماط BLOCKED_URL_PATTERNS كما هي)"""
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+            print(f"  الوضع الخفيف: حجب {len(BLOCKED_URL_PATTERNS)} نمط (إعلانات، تحليلات، خطوط، صور)")
+        except Exception as e:
+            print(f"  تحذير: تعذر حجب الروابط عبر CDP: {str(e)}")
+    
+    def log_page_metrics(self):
+        """تسجيل حجم البيانات المنقولة ووقت تحميل الصفحة للاستعلام الحالي"""
+        try:
+            metrics = self.driver.execute_script(PAGE_METRICS_SCRIPT) or {}
+        except Exception:
+            return None
+        print(f"  📦 الصفحة: {metrics.get('bytes', 0) / 1024:.1f} KB "
+              f"({metrics.get('resources', 0)} مورد) | التحميل {metrics.get('load_ms', 0) / 1000:.2f} ثانية")
+        return metrics
+    
     def get_voters_data(self):
-        """قراءة البيانات من ورقة Voters"""
-        print(f"جاري قراءة البيانات من ورقة {SOURCE_SHEET}...")
+        """
+        قراءة ورقة المصدر كاملة في طلب واحد (الذاكرة تتناسب مع حجم الورقة؛
+        التشغيل يستخدم iter_voters التي تقرأ على صفحات)
+        """
+        print(f"جاري قراءة البيانات من ورقة {self.source['title']}...")
         
         try:
-            worksheet = self.spreadsheet.worksheet(SOURCE_SHEET)
+            worksheet = self.spreadsheet.worksheet(self.source['title'])
         except gspread.exceptions.WorksheetNotFound:
-            raise Exception(f"لم يتم العثور على ورقة باسم '{SOURCE_SHEET}' في الملف")
+            raise Exception(f"لم يتم العثور على ورقة باسم '{self.source['title']}' في الملف")
         
         # قراءة جميع البيانات دفعة واحدة للحصول على العدد الفعلي للصفوف
         all_data = worksheet.get_all_values()
@@ -184,115 +437,303 @@ class VoterInquiryBot:
         if len(all_data) < 2:
             raise Exception("الورقة فارغة أو لا تحتوي على بيانات")
         
-        # تنظيف البيانات وإنشاء القائمة
-        data = []
-        for row_idx in range(1, min(len(all_data), MAX_ROWS + 1)):  # نبدأ من الصف 2 (index 1)
+        # تنظيف البيانات وتجميع الصفوف التي تحمل نفس الرقم القومي في ناخب واحد
+        voters = {}
+        total_rows = 0
+        for row_idx in range(1, len(all_data)):  # نبدأ من الصف 2 (index 1)
             row = all_data[row_idx]
             
             # استخراج الرقم القومي من العمود B (index 1)
             nat_id = row[1] if len(row) > 1 else ""
             nat_id_str = str(nat_id).strip() if nat_id else ""
+            nat_id_key = normalize_national_id(nat_id_str)
             
             # استخراج الاسم من العمود C (index 2) إذا كان موجوداً
             name = row[2] if len(row) > 2 else ""
             name_str = str(name).strip() if name else ""
             
             # إضافة الصف إذا كان الرقم القومي موجوداً
-            if nat_id_str:
-                data.append({
+            if nat_id_key:
+                total_rows += 1
+                row_info = {
                     'row_number': row_idx + 1,  # +1 لأن Excel/Sheets يبدأ من 1
                     'national_id': nat_id_str,
                     'name': name_str
-                })
+                }
+                if nat_id_key in voters:
+                    voters[nat_id_key]['rows'].append(row_info)
+                else:
+                    # الاستعلام يتم مرة واحدة بالرقم الموحد، والنتيجة تُكتب في كل صفوفه
+                    voters[nat_id_key] = {
+                        'row_number': row_info['row_number'],
+                        'national_id': nat_id_key,
+                        'name': name_str,
+                        'rows': [row_info]
+                    }
         
-        print(f"✓ تم العثور على {len(data)} رقم قومي من إجمالي {len(all_data) - 1} صف")
+        data = list(voters.values())
+        print(f"✓ تم العثور على {total_rows} رقم قومي من إجمالي {len(all_data) - 1} صف")
+        if total_rows > len(data):
+            print(f"  {len(data)} رقم قومي مختلف - تم توفير {total_rows - len(data)} استعلام مكرر")
         return data
     
-    def query_election_data(self, national_id):
-        """الاستعلام عن بيانات الناخب من موقع الهيئة"""
+    @staticmethod
+    def make_voter(row_number, nat_id_str, name_str):
+        """ناخب بصف واحد؛ الصفوف المكررة لنفس الرقم تُضاف لاحقاً في مرحلة القراءة"""
+        return {
+            'row_number': row_number,
+            'national_id': normalize_national_id(nat_id_str),
+            'name': name_str,
+            'rows': [{'row_number': row_number, 'national_id': nat_id_str, 'name': name_str}]
+        }
+    
+    def iter_voters(self, page_size=SOURCE_PAGE_SIZE):
+        """
+        قراءة ورقة المصدر الحالية تدريجياً: العمودين B:C فقط على صفحات ثابتة الحجم
+        أولاً الصفوف المعلقة من تشغيل سابق (من سجل التقدم)، ثم بقية الورقة من مؤشر القراءة،
+        فتبقى الذاكرة ووقت البدء ثابتين مهما كبر حجم الورقة
+        الصفحات الفارغة بالكامل (فراغات بين كتل البيانات) تُتخطى والقراءة تستمر حتى نهاية الورقة
+        """
+        print(f"جاري قراءة البيانات من ورقة {self.source['title']}...")
+        
         try:
-            # الذهاب لصفحة الاستعلام
-            self.driver.get(INQUIRY_URL)
-            time.sleep(3)
+            worksheet = self.spreadsheet.worksheet(self.source['title'])
+        except gspread.exceptions.WorksheetNotFound:
+            raise Exception(f"لم يتم العثور على ورقة باسم '{self.source['title']}' في الملف")
+        
+        if self.leases is not None:
+            yield from self.iter_leased_voters(worksheet, page_size)
+            return
+        
+        cursor = self.checkpoints.read_cursor
+        resumed = 0
+        for row_number, nat_id_str, name_str in self.checkpoints.pending_rows(before=cursor):
+            resumed += 1
+            yield self.make_voter(row_number, nat_id_str, name_str)
+        if resumed:
+            print(f"  تم استكمال {resumed} صف معلق من التشغيل السابق")
+        
+        last_row = worksheet.row_count
+        start = cursor
+        if start > 2:
+            print(f"  متابعة القراءة من الصف رقم {start}")
+        
+        while start <= last_row:
+            end = min(start + page_size - 1, last_row)
+            page = worksheet.get(f'B{start}:C{end}')
+            voters = self.parse_source_page(page, start, end)
+            
+            # تسجيل صفوف الصفحة كمعلقة وتقديم مؤشر القراءة في معاملة واحدة
+            self.checkpoints.register_page(
+                [(v['row_number'], v['rows'][0]['national_id'], v['name']) for v in voters],
+                end + 1
+            )
+            yield from voters
+            
+            start = end + 1
+    
+    def parse_source_page(self, page, start, end):
+        """صفوف صفحة من العمودين B:C -> ناخبون (بدون الصفوف الفارغة والمنتهية في سجل التقدم)"""
+        done = self.checkpoints.done_rows_between(start, end)
+        voters = []
+        for offset, row in enumerate(page):
+            row_number = start + offset
+            nat_id_str = str(row[0]).strip() if len(row) > 0 and row[0] else ""
+            name_str = str(row[1]).strip() if len(row) > 1 and row[1] else ""
+            
+            if not normalize_national_id(nat_id_str) or row_number in done:
+                continue
+            voters.append(self.make_voter(row_number, nat_id_str, name_str))
+        return voters
+    
+    def iter_leased_voters(self, worksheet, page_size):
+        """
+        القراءة عند تشغيل عدة نسخ: نطاق محجوز تلو الآخر بدلاً من مؤشر القراءة المحلي
+        النطاق يُسجل منتهياً بعد كتابة كل صفوفه (on_results_flushed)، وعند انتهاء النطاقات
+        تنتظر النسخة ما دامت نسخ أخرى تحجز نطاقات لم تنته، لتأخذها إذا توقفت تلك النسخ
+        (وترجع None كل فترة أثناء الانتظار حتى يعيد الـ pipeline المحاولات المستحقة)
+        """
+        last_row = worksheet.row_count
+        self.leases.mark_end(last_row)
+        print(f"  توزيع الصفوف بين النسخ عبر {LEASE_DB} (هذه النسخة: {self.leases.owner})")
+        
+        while True:
+            lease = self.leases.claim()
+            if lease is None:
+                wait = self.leases.others_active()
+                if wait is None:
+                    return
+                time.sleep(min(max(wait, 1), LEASE_POLL_INTERVAL))
+                # الـ pipeline يعيد الأرقام المؤجلة أثناء الانتظار: نطاقات هذه النسخة التي تنتظر
+                # إعادة محاولة تنتهي، فلا تنتظر نسختان نطاقات بعضهما إلى الأبد
+                yield None
+                continue
             
-            # الانتقال إلى iframe الذي يحتوي على نموذج الاستعلام
-            wait = WebDriverWait(self.driver, 15)
+            lease_start, lease_end = lease
+            print(f"  📌 تم حجز الصفوف {lease_start}-{lease_end}")
+            start = lease_start
+            while start <= lease_end:
+                end = min(start + page_size - 1, lease_end)
+                page = worksheet.get(f'B{start}:C{end}')
+                voters = self.parse_source_page(page, start, end)
+                self.leases.add_rows(lease_start, [v['row_number'] for v in voters], read_complete=False)
+                yield from voters
+                start = end + 1
+            self.leases.add_rows(lease_start, [], read_complete=True)
+    
+    def wait_for_outcome(self, timeout=None):
+        """
+        انتظار أول نتيجة معروفة بعد إرسال النموذج بدلاً من الانتظار لمدة ثابتة
+        (المهلة الافتراضية OUTCOME_WAIT_TIMEOUT تُقرأ عند كل استدعاء)
+        يرجع: 'results' أو 'no_voting_right' أو 'error' أو 'captcha' أو 'timeout'
+        """
+        if timeout is None:
+            timeout = OUTCOME_WAIT_TIMEOUT
+        
+        def outcome_ready(driver):
             try:
-                # البحث عن iframe الاستعلام الصحيح (وليس iframe الإعلانات)
-                # محاولة 1: البحث عن iframe يحتوي على 'Inquiry' أو 'inquiry' في src
-                iframe_found = False
-                iframes = self.driver.find_elements(By.TAG_NAME, "iframe")
-                print(f"  وجدت {len(iframes)} إطار iframe")
-                
+                probe = driver.execute_script(OUTCOME_PROBE_SCRIPT) or {}
+            except Exception:
+                return False
+            
+            outcome = detect_outcome(probe.get('text') or '')
+            if outcome:
+                return outcome
+            if probe.get('has_table'):
+                return 'results'
+            return False
+        
+        started = time.monotonic()
+        try:
+            outcome = WebDriverWait(
+                self.driver, timeout, poll_frequency=OUTCOME_POLL_INTERVAL
+            ).until(outcome_ready)
+        except TimeoutException:
+            outcome = 'timeout'
+        
+        print(f"  ⏱ النتيجة: {outcome} بعد {time.monotonic() - started:.2f} ثانية")
+        return outcome
+    
+    def discover_inquiry_frame(self):
+        """
+        فتح صفحة الاستعلام الخارجية والبحث عن iframe النموذج والانتقال إليه
+        يرجع رابط src الخاص بالإطار إذا تم العثور عليه
+        """
+        # الذهاب لصفحة الاستعلام
+        with TRACER.phase('navigate'):
+            self.driver.get(INQUIRY_URL)
+        
+        discovery_started = time.monotonic()
+        
+        # انتظار ظهور الإطارات بدلاً من الانتظار لمدة ثابتة
+        try:
+            WebDriverWait(self.driver, PAGE_READY_TIMEOUT).until(
+                EC.presence_of_element_located((By.TAG_NAME, "iframe"))
+            )
+        except TimeoutException:
+            pass
+        
+        # الانتقال إلى iframe الذي يحتوي على نموذج الاستعلام
+        frame_src = None
+        try:
+            # البحث عن iframe الاستعلام الصحيح (وليس iframe الإعلانات)
+            # محاولة 1: البحث عن iframe يحتوي على 'Inquiry' أو 'inquiry' في src
+            iframe_found = False
+            iframes = self.driver.find_elements(By.TAG_NAME, "iframe")
+            print(f"  وجدت {len(iframes)} إطار iframe")
+            
+            for idx, iframe in enumerate(iframes):
+                try:
+                    src = iframe.get_attribute('src') or ''
+                    print(f"  iframe {idx}: src={src[:100] if src else 'no src'}")
+                    
+                    # البحث عن iframe الاستعلام
+                    if 'inquiry' in src.lower() or 'gadget' in src.lower():
+                        print(f"  ✓ تم العثور على iframe الاستعلام: {src[:100]}")
+                        self.driver.switch_to.frame(iframe)
+                        iframe_found = True
+                        frame_src = src
+                        break
+                except:
+                    continue
+            
+            # إذا لم نجد iframe بناءً على src، نحاول البحث عن iframe يحتوي على حقل الرقم القومي
+            if not iframe_found and len(iframes) > 0:
+                print("  محاولة البحث عن iframe من خلال وجود حقل الرقم القومي...")
                 for idx, iframe in enumerate(iframes):
                     try:
+                        self.driver.switch_to.default_content()
                         src = iframe.get_attribute('src') or ''
-                        print(f"  iframe {idx}: src={src[:100] if src else 'no src'}")
+                        self.driver.switch_to.frame(iframe)
                         
-                        # البحث عن iframe الاستعلام
-                        if 'inquiry' in src.lower() or 'gadget' in src.lower():
-                            print(f"  ✓ تم العثور على iframe الاستعلام: {src[:100]}")
-                            self.driver.switch_to.frame(iframe)
+                        # محاولة العثور على حقل الرقم القومي بأي من أسمائه المعروفة
+                        if any(self.driver.find_elements(*locator) for locator in NATIONAL_ID_LOCATORS):
+                            print(f"  ✓ وجدت حقل الرقم القومي في iframe {idx}")
                             iframe_found = True
-                            time.sleep(2)
+                            frame_src = src
                             break
+                        self.driver.switch_to.default_content()
                     except:
                         continue
-                
-                # إذا لم نجد iframe بناءً على src، نحاول البحث عن iframe يحتوي على حقل الرقم القومي
-                if not iframe_found and len(iframes) > 0:
-                    print("  محاولة البحث عن iframe من خلال وجود حقل الرقم القومي...")
-                    for idx, iframe in enumerate(iframes):
-                        try:
-                            self.driver.switch_to.default_content()
-                            self.driver.switch_to.frame(iframe)
-                            
-                            # محاولة العثور على حقل الرقم القومي
-                            try:
-                                input_field = self.driver.find_element(By.NAME, "nationalId")
-                                print(f"  ✓ وجدت حقل الرقم القومي في iframe {idx}")
-                                iframe_found = True
-                                time.sleep(2)
-                                break
-                            except:
-                                try:
-                                    input_field = self.driver.find_element(By.ID, "nationalId")
-                                    print(f"  ✓ وجدت حقل الرقم القومي في iframe {idx}")
-                                    iframe_found = True
-                                    time.sleep(2)
-                                    break
-                                except:
-                                    self.driver.switch_to.default_content()
-                                    continue
-                        except:
-                            continue
-                
-                if not iframe_found:
-                    print("  تحذير: لم يتم العثور على iframe مناسب، المتابعة بدون تبديل")
-                    self.driver.switch_to.default_content()
-                    
-            except Exception as e:
-                print(f"  تحذير: خطأ في البحث عن iframe: {str(e)}")
+            
+            if not iframe_found:
+                print("  تحذير: لم يتم العثور على iframe مناسب، المتابعة بدون تبديل")
                 self.driver.switch_to.default_content()
+                
+        except Exception as e:
+            print(f"  تحذير: خطأ في البحث عن iframe: {str(e)}")
+            self.driver.switch_to.default_content()
+        
+        TRACER.observe('find_iframe', time.monotonic() - discovery_started)
+        return frame_src or None
+    
+    def inquiry_form_present(self, timeout=None):
+        """التحقق من ظهور حقل الرقم القومي في الصفحة الحالية (المهلة الافتراضية FORM_READY_TIMEOUT)"""
+        if timeout is None:
+            timeout = FORM_READY_TIMEOUT
+        try:
+            WebDriverWait(self.driver, timeout).until(EC.any_of(
+                *[EC.presence_of_element_located(locator) for locator in NATIONAL_ID_LOCATORS]
+            ))
+            return True
+        except TimeoutException:
+            return False
+    
+    def open_inquiry_form(self):
+        """فتح نموذج الاستعلام مباشرة من رابط الإطار المحفوظ، أو اكتشافه من جديد"""
+        if self.inquiry_frame_url:
+            with TRACER.phase('navigate'):
+                self.driver.get(self.inquiry_frame_url)
+            if self.inquiry_form_present():
+                return
             
-            # البحث عن حقل الرقم القومي بطرق متعددة
-            input_field = None
+            # الرابط المحفوظ لم يعد يعرض النموذج - نعيد الاكتشاف
+            print("  تحذير: رابط نموذج الاستعلام المحفوظ لم يعد صالحاً، إعادة البحث عن iframe...")
+            self.inquiry_frame_url = None
+        
+        frame_src = self.discover_inquiry_frame()
+        if frame_src:
+            self.inquiry_frame_url = frame_src
+            print(f"  ✓ تم حفظ رابط نموذج الاستعلام للاستخدام المباشر: {frame_src[:100]}")
+    
+    def query_election_data(self, national_id):
+        """الاستعلام عن بيانات الناخب من موقع الهيئة"""
+        try:
+            # فتح نموذج الاستعلام (مباشرة من الرابط المحفوظ إن وجد)
+            self.open_inquiry_form()
             
-            # محاولة العثور على حقل الإدخال بطرق مختلفة
-            try:
-                input_field = wait.until(
-                    EC.presence_of_element_located((By.NAME, "nationalId"))
-                )
-            except:
-                try:
-                    input_field = wait.until(
-                        EC.presence_of_element_located((By.ID, "nationalId"))
-                    )
-                except:
-                    input_field = wait.until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "input[type='text']"))
-                    )
+            locate_started = time.monotonic()
             
+            # انتظار واحد لكل أسماء حقل الرقم القومي معاً (أول ما يظهر منها)،
+            # وأي حقل نصي كحل أخير إذا تغيرت أسماء الحقول في الموقع
+            input_field = WebDriverWait(self.driver, INPUT_READY_TIMEOUT).until(EC.any_of(
+                *[EC.presence_of_element_located(locator) for locator in NATIONAL_ID_LOCATORS],
+                EC.presence_of_element_located((By.CSS_SELECTOR, "input[type='text']"))
+            ))
+            
+            TRACER.observe('locate_input', time.monotonic() - locate_started)
+            
+            submit_started = time.monotonic()
             input_field.clear()
             input_field.send_keys(national_id)
             
@@ -323,461 +764,32 @@ class VoterInquiryBot:
                 # إذا لم نجد زر، نحاول إرسال النموذج مباشرة
                 from selenium.webdriver.common.keys import Keys
                 input_field.send_keys(Keys.RETURN)
+            TRACER.observe('submit', time.monotonic() - submit_started)
             
-            # انتظار النتائج - انتظار أطول للتأكد من تحميل البيانات
-            time.sleep(5)
+            # انتظار أول نتيجة معروفة (جدول النتائج أو رسالة أو Captcha)
+            with TRACER.phase('wait'):
+                outcome = self.wait_for_outcome()
             
-            result = {
-                'مركز_الانتخاب': '',
-                'العنوان': '',
-                'رقم_اللجنة_الفرعية': '',
-                'الرقم_في_الكشوف': '',
-                'status': 'unknown',
-                'error_message': ''
-            }
+            self.log_page_metrics()
             
-            # استخراج البيانات من الصفحة باستخدام BeautifulSoup
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            page_text = soup.get_text()
-            
-            # التحقق من حالة "ليس له حق الانتخاب"
-            no_voting_right_keywords = [
-                'ليس له حق الانتخاب',
-                'ليس له حق انتخاب',
-                'غير مدرج بقاعدة بيانات الناخبين',
-                'غير مدرج بقاعده بيانات الناخبين',
-                'ليس لديه حق الانتخاب',
-                'لا يحق له الانتخاب'
-            ]
+            # نسخة واحدة من الصفحة يتم تحليلها مرة واحدة بدلاً من طلبات متعددة للمتصفح
+            page_html = self.driver.page_source
+            extraction_trace = {}
+            with TRACER.phase('extract'):
+                result = extract_voter_data(page_html, outcome=outcome, trace=extraction_trace)
+            TRACER.annotate(outcome=outcome, strategy=extraction_trace.get('strategy'))
             
-            if any(keyword in page_text for keyword in no_voting_right_keywords):
-                result['status'] = 'no_voting_right'
-                result['error_message'] = 'ليس له حق الانتخاب'
+            if result['status'] == 'no_voting_right':
                 print(f"  ⚠️ الرقم القومي ليس له حق الانتخاب")
-                return result
-            
-            # التحقق من وجود رسائل خطأ
-            error_keywords = ['غير موجود', 'خطأ', 'غير صحيح', 'لا يوجد', 'invalid', 'error', 'not found']
-            if any(keyword in page_text.lower() for keyword in error_keywords):
-                result['status'] = 'error'
-                result['error_message'] = 'الرقم القومي غير موجود أو غير صحيح'
-                return result
-            
-            # التحقق من Captcha
-            if 'captcha' in page_text.lower() or 'robot' in page_text.lower():
-                result['status'] = 'error'
-                result['error_message'] = 'تم اكتشاف Captcha - يرجى المحاولة لاحقاً'
-                return result
-            
-            # الطريقة الجديدة: استخراج البيانات من النص المباشر
-            print("  محاولة استخراج البيانات من النص...")
-            try:
-                # الحصول على النص الكامل للصفحة
-                page_full_text = self.driver.find_element(By.TAG_NAME, "body").text
-                
-                # حفظ HTML للتحليل إذا لم نجد البيانات
-                page_html = self.driver.page_source
-                
-                # طباعة جزء من النص للتحليل
-                print(f"  📄 عينة من نص الصفحة (أول 500 حرف):\n{page_full_text[:500]}\n")
-                
-                # تقسيم النص إلى أسطر للبحث الدقيق
-                lines = page_full_text.split('\n')
-                
-                # أنماط بحث محتملة لمركز الانتخاب
-                center_patterns = [
-                    'مركزك الإنتخابي', 'مركزك الانتخابي', 'المركز الانتخابي',
-                    'اسم اللجنة', 'اللجنة الانتخابية', 'مقر اللجنة',
-                    'موقعك الانتخابي', 'لجنتك الانتخابية'
-                ]
-                
-                # أنماط بحث للعنوان
-                address_patterns = ['العنوان', 'عنوان اللجنة', 'العنوان التفصيلي']
-                
-                # أنماط بحث لرقم اللجنة
-                committee_patterns = ['رقم اللجنة الفرعية', 'اللجنة الفرعية', 'رقم اللجنة']
-                
-                # أنماط بحث للرقم في الكشوف
-                list_patterns = ['رقمك في الكشوف', 'رقمك بالكشوف', 'الرقم في الكشوف', 'رقم تسلسلي']
-                
-                # البحث عن البيانات باستخدام الأسطر
-                for i, line in enumerate(lines):
-                    line_clean = line.strip()
-                    
-                    # استخراج مركز الانتخاب - البحث بأنماط متعددة
-                    if not result['مركز_الانتخاب']:
-                        for pattern in center_patterns:
-                            if pattern in line_clean:
-                                # البحث في السطر الحالي أولاً (إذا كانت القيمة في نفس السطر)
-                                if ':' in line_clean:
-                                    parts = line_clean.split(':', 1)
-                                    if len(parts) > 1:
-                                        value = parts[1].strip()
-                                        if value and len(value) > 3:
-                                            result['مركز_الانتخاب'] = value
-                                            print(f"  ✓ وجدت المركز الانتخابي (من نفس السطر): {value}")
-                                            break
-                                
-                                # البحث في السطر التالي
-                                if i + 1 < len(lines) and not result['مركز_الانتخاب']:
-                                    next_line = lines[i + 1].strip()
-                                    if next_line and len(next_line) > 3:
-                                        # التأكد من أنه ليس تسمية أخرى
-                                        if not any(kw in next_line for kw in ['محافظة', 'قسم', 'العنوان', 'رقم']):
-                                            result['مركز_الانتخاب'] = next_line
-                                            print(f"  ✓ وجدت المركز الانتخابي: {next_line}")
-                                            break
-                    
-                    # استخراج العنوان
-                    if not result['العنوان']:
-                        for pattern in address_patterns:
-                            if pattern in line_clean:
-                                # البحث في السطر الحالي
-                                if ':' in line_clean:
-                                    parts = line_clean.split(':', 1)
-                                    if len(parts) > 1:
-                                        value = parts[1].strip()
-                                        if value and len(value) > 5:
-                                            result['العنوان'] = value
-                                            print(f"  ✓ وجدت العنوان (من نفس السطر): {value}")
-                                            break
-                                
-                                # البحث في السطر التالي
-                                if i + 1 < len(lines) and not result['العنوان']:
-                                    next_line = lines[i + 1].strip()
-                                    if next_line and len(next_line) > 5:
-                                        if not any(kw in next_line for kw in ['رقم', 'تاريخ', 'كثافة', 'لجنة']):
-                                            result['العنوان'] = next_line
-                                            print(f"  ✓ وجدت العنوان: {next_line}")
-                                            break
-                    
-                    # استخراج رقم اللجنة الفرعية
-                    if not result['رقم_اللجنة_الفرعية']:
-                        for pattern in committee_patterns:
-                            if pattern in line_clean:
-                                # البحث في السطر الحالي
-                                if ':' in line_clean:
-                                    parts = line_clean.split(':', 1)
-                                    if len(parts) > 1:
-                                        value = parts[1].strip()
-                                        if value:
-                                            result['رقم_اللجنة_الفرعية'] = value
-                                            print(f"  ✓ وجدت رقم اللجنة (من نفس السطر): {value}")
-                                            break
-                                
-                                # البحث في السطر التالي
-                                if i + 1 < len(lines) and not result['رقم_اللجنة_الفرعية']:
-                                    next_line = lines[i + 1].strip()
-                                    if next_line:
-                                        result['رقم_اللجنة_الفرعية'] = next_line
-                                        print(f"  ✓ وجدت رقم اللجنة: {next_line}")
-                                        break
-                    
-                    # استخراج الرقم في الكشوف
-                    if not result['الرقم_في_الكشوف']:
-                        for pattern in list_patterns:
-                            if pattern in line_clean:
-                                # البحث في السطر الحالي
-                                if ':' in line_clean:
-                                    parts = line_clean.split(':', 1)
-                                    if len(parts) > 1:
-                                        value = parts[1].strip()
-                                        if value:
-                                            result['الرقم_في_الكشوف'] = value
-                                            print(f"  ✓ وجدت الرقم في الكشوف (من نفس السطر): {value}")
-                                            break
-                                
-                                # البحث في السطر التالي
-                                if i + 1 < len(lines) and not result['الرقم_في_الكشوف']:
-                                    next_line = lines[i + 1].strip()
-                                    if next_line:
-                                        result['الرقم_في_الكشوف'] = next_line
-                                        print(f"  ✓ وجدت الرقم في الكشوف: {next_line}")
-                                        break
-                
-                # حفظ HTML إذا لم نجد مركز الانتخاب (للتحليل)
-                if not result['مركز_الانتخاب']:
-                    debug_filename = f"debug_page_{national_id}.html"
-                    with open(debug_filename, 'w', encoding='utf-8') as f:
-                        f.write(page_html)
-                    print(f"  ⚠️ لم يتم العثور على مركز الانتخاب - تم حفظ HTML في {debug_filename}")
-                
-                # إذا وجدنا أي بيانات، نعتبر الاستخراج ناجحاً
-                if any([result['مركز_الانتخاب'], result['العنوان'], 
-                       result['رقم_اللجنة_الفرعية'], result['الرقم_في_الكشوف']]):
-                    print("  ✓ تم استخراج البيانات بنجاح من النص المباشر")
-            except Exception as e:
-                print(f"  تحذير: خطأ في الاستخراج من النص: {str(e)}")
             
-            # طريقة احتياطية: استخراج باستخدام IDs محددة
-            if not result['مركز_الانتخاب']:
-                print("  محاولة استخراج من العناصر المحددة...")
-                try:
-                    selectors_map = {
-                        'مركز_الانتخاب': ['centerName', 'center-name', 'votingCenter', 'voting-center', 'المركز'],
-                        'العنوان': ['address', 'centerAddress', 'center-address', 'العنوان'],
-                        'رقم_اللجنة_الفرعية': ['committeeNumber', 'committee-number', 'subCommittee', 'اللجنة'],
-                        'الرقم_في_الكشوف': ['orderNumber', 'order-number', 'listNumber', 'الرقم']
-                    }
-                    
-                    for field_name, possible_ids in selectors_map.items():
-                        for selector_id in possible_ids:
-                            try:
-                                element = self.driver.find_element(By.ID, selector_id)
-                                value = element.text.strip()
-                                if value and len(value) > 0:
-                                    result[field_name] = value
-                                    print(f"  ✓ وجدت {field_name} من ID '{selector_id}': {value}")
-                                    break
-                            except:
-                                try:
-                                    element = self.driver.find_element(By.CLASS_NAME, selector_id)
-                                    value = element.text.strip()
-                                    if value and len(value) > 0:
-                                        result[field_name] = value
-                                        print(f"  ✓ وجدت {field_name} من CLASS '{selector_id}': {value}")
-                                        break
-                                except:
-                                    continue
-                except Exception as e:
-                    print(f"  تحذير: خطأ في الاستخراج من العناصر المحددة: {str(e)}")
-            
-            # الطريقة 1: استخراج البيانات من جدول HTML
-            try:
-                # انتظار ظهور الجدول مع النتائج
-                wait = WebDriverWait(self.driver, 10)
-                try:
-                    wait.until(EC.presence_of_element_located((By.XPATH, "//table//td[contains(text(), 'مركز')]")))
-                except:
-                    pass  # في حالة عدم وجود النتائج
-                
-                # البحث عن جميع صفوف الجدول
-                table_rows = self.driver.find_elements(By.TAG_NAME, "tr")
-                
-                for row in table_rows:
-                    try:
-                        # الحصول على جميع الخلايا في الصف (td و th)
-                        cells = row.find_elements(By.CSS_SELECTOR, "th, td")
-                        
-                        if len(cells) >= 2:
-                            # الخلية الأولى = التسمية، الخلية الأخيرة = القيمة
-                            label_cell = cells[0].text.strip()
-                            value_cell = cells[-1].text.strip()
-                            
-                            # استخراج المركز الانتخابي
-                            if 'مركز' in label_cell and 'انتخاب' in label_cell:
-                                if value_cell and len(value_cell) > 2:
-                                    result['مركز_الانتخاب'] = value_cell
-                                    print(f"  ✓ وجدت المركز الانتخابي: {value_cell}")
-                            
-                            # استخراج العنوان
-                            elif 'عنوان' in label_cell:
-                                if value_cell and len(value_cell) > 5:
-                                    result['العنوان'] = value_cell
-                                    print(f"  ✓ وجدت العنوان: {value_cell}")
-                            
-                            # استخراج رقم اللجنة الفرعية
-                            elif 'لجنة' in label_cell and 'فرعية' in label_cell:
-                                if value_cell:
-                                    result['رقم_اللجنة_الفرعية'] = value_cell
-                                    print(f"  ✓ وجدت رقم اللجنة: {value_cell}")
-                            
-                            # استخراج الرقم في الكشوف
-                            elif 'رقمك' in label_cell or ('كشوف' in label_cell and 'انتخابية' in label_cell):
-                                if value_cell:
-                                    result['الرقم_في_الكشوف'] = value_cell
-                                    print(f"  ✓ وجدت الرقم في الكشوف: {value_cell}")
-                    except Exception as row_error:
-                        continue
-                
-                # إذا لم نجد البيانات في الجدول، نبحث في العناصر بطريقة مختلفة
-                if not result['مركز_الانتخاب']:
-                    # استراتيجية جديدة: ابحث عن عنصر "العنوان" أولاً، ثم احصل على العنصر السابق له (المركز الانتخابي)
-                    try:
-                        address_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'عنوان') or contains(text(), 'العنوان')]")
-                        
-                        for addr_elem in address_elements:
-                            addr_text = addr_elem.text.strip()
-                            
-                            # تأكد أن هذا هو عنصر التسمية وليس القيمة
-                            if 'عنوان' in addr_text.lower() and len(addr_text) < 50:
-                                try:
-                                    # محاولة الحصول على العنصر السابق (المركز الانتخابي)
-                                    prev_elem = addr_elem.find_element(By.XPATH, "preceding-sibling::*[1]")
-                                    if prev_elem:
-                                        prev_text = prev_elem.text.strip()
-                                        if prev_text and len(prev_text) > 2 and not result['مركز_الانتخاب']:
-                                            result['مركز_الانتخاب'] = prev_text
-                                            print(f"  ✓ وجدت المركز الانتخابي من العنصر السابق للعنوان: {prev_text}")
-                                    
-                                    # الحصول على العنوان من العنصر التالي
-                                    next_elem = addr_elem.find_element(By.XPATH, "following-sibling::*[1]")
-                                    if next_elem and not result['العنوان']:
-                                        addr_value = next_elem.text.strip()
-                                        if addr_value and len(addr_value) > 5:
-                                            result['العنوان'] = addr_value
-                                            print(f"  ✓ وجدت العنوان: {addr_value}")
-                                    
-                                    # إذا وجدنا البيانات، نوقف البحث
-                                    if result['مركز_الانتخاب'] and result['العنوان']:
-                                        break
-                                except Exception as sibling_error:
-                                    continue
-                    except Exception as addr_error:
-                        print(f"  تحذير: خطأ في البحث عن العنوان: {str(addr_error)}")
-                    
-                    # الطريقة القديمة كاحتياطي
-                    if not result['مركز_الانتخاب']:
-                        elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'مركز') or contains(text(), 'المركز') or contains(text(), 'لجنة') or contains(text(), 'عنوان') or contains(text(), 'كشوف')]")
-                        
-                        for element in elements:
-                            element_text = element.text.strip()
-                            parent_text = element.find_element(By.XPATH, "..").text.strip() if element else ""
-                            
-                            # محاولة استخراج المركز الانتخابي
-                            if ('مركز' in element_text.lower() and 'انتخاب' in element_text.lower()) or 'المركز' in element_text:
-                                # محاولة الحصول على القيمة من النص الكامل
-                                full_text = parent_text if parent_text else element_text
-                                for label in ['مركزك الإنتخابي:', 'مركزك الانتخابي:', 'المركز الانتخابي:', 'مركز الانتخاب:']:
-                                    if label in full_text:
-                                        result['مركز_الانتخاب'] = full_text.replace(label, '').strip()
-                                        break
-                                
-                                # إذا لم نجد القيمة، نحاول الحصول على العنصر التالي
-                                if not result['مركز_الانتخاب']:
-                                    try:
-                                        next_elem = element.find_element(By.XPATH, "following-sibling::*[1]")
-                                        if next_elem and next_elem.text.strip():
-                                            result['مركز_الانتخاب'] = next_elem.text.strip()
-                                    except:
-                                        pass
-                            
-                            # استخراج العنوان
-                            if 'عنوان' in element_text.lower() and not result['العنوان']:
-                                full_text = parent_text if parent_text else element_text
-                                for label in ['العنوان:', 'عنوان اللجنة:', 'عنوان المركز:']:
-                                    if label in full_text:
-                                        result['العنوان'] = full_text.replace(label, '').strip()
-                                        break
-                                
-                                if not result['العنوان']:
-                                    try:
-                                        next_elem = element.find_element(By.XPATH, "following-sibling::*[1]")
-                                        if next_elem and next_elem.text.strip():
-                                            result['العنوان'] = next_elem.text.strip()
-                                    except:
-                                        pass
-                        
-                        # استخراج رقم اللجنة
-                        if 'لجنة' in element_text.lower() and 'فرعية' in element_text.lower():
-                            full_text = parent_text if parent_text else element_text
-                            for label in ['رقم اللجنة الفرعية:', 'اللجنة الفرعية:', 'لجنة فرعية رقم:']:
-                                if label in full_text:
-                                    result['رقم_اللجنة_الفرعية'] = full_text.replace(label, '').strip()
-                                    break
-                            
-                            if not result['رقم_اللجنة_الفرعية']:
-                                try:
-                                    next_elem = element.find_element(By.XPATH, "following-sibling::*[1]")
-                                    if next_elem and next_elem.text.strip():
-                                        result['رقم_اللجنة_الفرعية'] = next_elem.text.strip()
-                                except:
-                                    pass
-                        
-                        # استخراج الرقم في الكشوف
-                        if 'كشوف' in element_text.lower() or ('رقمك' in element_text.lower() and 'كشوف' in parent_text.lower()):
-                            full_text = parent_text if parent_text else element_text
-                            for label in ['رقمك في الكشوف الانتخابية:', 'رقمك في الكشوف:', 'الرقم في الكشوف:']:
-                                if label in full_text:
-                                    result['الرقم_في_الكشوف'] = full_text.replace(label, '').strip()
-                                    break
-                            
-                            if not result['الرقم_في_الكشوف']:
-                                try:
-                                    next_elem = element.find_element(By.XPATH, "following-sibling::*[1]")
-                                    if next_elem and next_elem.text.strip():
-                                        result['الرقم_في_الكشوف'] = next_elem.text.strip()
-                                except:
-                                    pass
-            except Exception as e:
-                print(f"  تحذير: خطأ في الاستخراج باستخدام Selenium: {str(e)}")
+            # حفظ HTML إذا لم نجد مركز الانتخاب (للتحليل)
+            if result['status'] in ('success', 'no_data') and not result['مركز_الانتخاب']:
+                debug_filename = f"debug_page_{national_id}.html"
+                with open(debug_filename, 'w', encoding='utf-8') as f:
+                    f.write(page_html)
+                print(f"  ⚠️ لم يتم العثور على مركز الانتخاب - تم حفظ HTML في {debug_filename}")
             
-            # الطريقة 2: البحث في جدول HTML باستخدام BeautifulSoup (كنسخة احتياطية)
-            if not any([result['مركز_الانتخاب'], result['العنوان'], result['رقم_اللجنة_الفرعية'], result['الرقم_في_الكشوف']]):
-                # البحث عن جميع صفوف الجدول باستخدام BeautifulSoup
-                tables = soup.find_all('table')
-                
-                for table in tables:
-                    rows = table.find_all('tr')
-                    
-                    for row in rows:
-                        cells = row.find_all('td')
-                        
-                        if len(cells) >= 2:
-                            # الخلية الأولى = التسمية، الخلية الأخيرة = القيمة
-                            label_text = cells[0].get_text(strip=True)
-                            value_text = cells[-1].get_text(strip=True)
-                            
-                            # استخراج المركز الانتخابي
-                            if 'مركز' in label_text and ('انتخاب' in label_text or 'إنتخاب' in label_text):
-                                if value_text and len(value_text) > 2:
-                                    result['مركز_الانتخاب'] = value_text
-                                    print(f"  ✓ استخراج المركز من BeautifulSoup: {value_text}")
-                            
-                            # استخراج العنوان
-                            elif 'عنوان' in label_text:
-                                if value_text and len(value_text) > 5:
-                                    result['العنوان'] = value_text
-                            
-                            # استخراج رقم اللجنة الفرعية
-                            elif 'لجنة' in label_text and 'فرعية' in label_text:
-                                if value_text:
-                                    result['رقم_اللجنة_الفرعية'] = value_text
-                            
-                            # استخراج الرقم في الكشوف
-                            elif 'رقمك' in label_text or ('كشوف' in label_text and 'انتخابية' in label_text):
-                                if value_text:
-                                    result['الرقم_في_الكشوف'] = value_text
-                
-                # إذا لم نجد البيانات من الجدول، نبحث في جميع العناصر
-                if not result['مركز_الانتخاب']:
-                    all_elements = soup.find_all(['div', 'span', 'p', 'td', 'th', 'label'])
-                    
-                    for elem in all_elements:
-                        text = elem.get_text(strip=True)
-                        
-                        if 'مركز' in text and ('انتخاب' in text or 'إنتخاب' in text):
-                            cleaned = text
-                            for label in ['مركزك الإنتخابي:', 'مركزك الانتخابي:', 'المركز الانتخابي:', 'مركز الانتخاب:']:
-                                cleaned = cleaned.replace(label, '')
-                            cleaned = cleaned.strip()
-                            if cleaned and len(cleaned) > 2:
-                                result['مركز_الانتخاب'] = cleaned
-                        
-                        elif 'عنوان' in text and not result['العنوان']:
-                            cleaned = text.replace('العنوان:', '').replace('عنوان اللجنة:', '').strip()
-                            if cleaned and len(cleaned) > 5:
-                                result['العنوان'] = cleaned
-                        
-                        elif 'لجنة' in text and 'فرعية' in text:
-                            cleaned = text.replace('رقم اللجنة الفرعية:', '').replace('اللجنة الفرعية:', '').strip()
-                            if cleaned and len(cleaned) > 0:
-                                result['رقم_اللجنة_الفرعية'] = cleaned
-                        
-                        elif 'كشوف' in text or 'رقمك' in text:
-                            cleaned = text.replace('رقمك في الكشوف الانتخابية:', '').replace('رقمك في الكشوف:', '').replace('الرقم في الكشوف:', '').strip()
-                            if cleaned and len(cleaned) > 0:
-                                result['الرقم_في_الكشوف'] = cleaned
-            
-            # التحقق من وجود أي بيانات
-            if any([result['مركز_الانتخاب'], result['العنوان'], 
-                    result['رقم_اللجنة_الفرعية'], result['الرقم_في_الكشوف']]):
-                result['status'] = 'success'
-                print(f"  ✓ تم استخراج: المركز={result['مركز_الانتخاب'][:30] if result['مركز_الانتخاب'] else 'غير متوفر'}")
-            else:
-                result['status'] = 'no_data'
-                result['error_message'] = 'لم يتم العثور على بيانات - قد يحتاج الكود للتحديث حسب هيكل الموقع'
-                
+            if result['status'] == 'no_data':
                 # حفظ screenshot للمساعدة في التصحيح
                 try:
                     screenshot_path = f"debug_screenshot_{national_id}.png"
@@ -801,25 +813,63 @@ class VoterInquiryBot:
             except:
                 pass
             
-            return {
-                'مركز_الانتخاب': '',
-                'العنوان': '',
-                'رقم_اللجنة_الفرعية': '',
-                'الرقم_في_الكشوف': '',
-                'status': 'error',
-                'error_message': f'خطأ في الاتصال: {str(e)}'
-            }
+            return empty_result('error', f'خطأ في الاتصال: {str(e)}', retryable=True)
+    
+    def ensure_driver(self):
+        """فتح متصفح العامل الحالي عند الحاجة إليه فقط (أو بعد إعادة تشغيله)"""
+        return self.browsers.ensure()
+    
+    def lookup(self, national_id):
+        """
+        الاستعلام عن رقم قومي بالطريقة المحددة في QUERY_BACKEND
+        في وضع HTTP يتم الرجوع تلقائياً للمتصفح إذا لم يمكن قراءة الرد
+        """
+        TRACER.begin(national_id, source=QUERY_BACKEND)
+        try:
+            return self._lookup(national_id)
+        finally:
+            TRACER.end()
+    
+    def _lookup(self, national_id):
+        if self.http_backend is not None and not self.http_backend.disabled:
+            try:
+                with TRACER.phase('submit'):
+                    page_html = self.http_backend.fetch_result_page(national_id)
+                extraction_trace = {}
+                with TRACER.phase('extract'):
+                    result = extract_voter_data(page_html, trace=extraction_trace)
+                TRACER.annotate(strategy=extraction_trace.get('strategy'))
+                if result['status'] != 'no_data':
+                    self.http_backend.page_recognized()
+                    return result
+                print("  ⚠️ لم يتم التعرف على صفحة النتيجة عبر HTTP - الرجوع للمتصفح (مع إعادة قراءة النموذج)")
+                self.http_backend.invalidate()
+            except HttpBackendError as e:
+                print(f"  ⚠️ {str(e)} - الرجوع للمتصفح")
+            
+            # الاستعلام عبر المتصفح طلب جديد للموقع ويخضع لنفس الحد
+            self.rate_limiter.acquire()
+            TRACER.annotate(source='selenium')
+        
+        try:
+            self.ensure_driver()
+        except Exception as e:
+            return empty_result('error', f'فشل إعداد المتصفح: {str(e)}', retryable=True)
+        result = self.query_election_data(national_id)
+        self.browsers.after_query(result)
+        return result
     
     def create_results_sheet(self):
         """إنشاء ورقة النتائج إذا لم تكن موجودة"""
         try:
-            worksheet = self.spreadsheet.worksheet(RESULTS_SHEET)
-            print(f"ورقة '{RESULTS_SHEET}' موجودة بالفعل")
+            worksheet = self.spreadsheet.worksheet(self.source['results_title'])
+            print(f"ورقة '{self.source['results_title']}' موجودة بالفعل")
         except gspread.exceptions.WorksheetNotFound:
-            print(f"جاري إنشاء ورقة جديدة باسم '{RESULTS_SHEET}'...")
+            print(f"جاري إنشاء ورقة جديدة باسم '{self.source['results_title']}'...")
+            # حجم مبدئي صغير - BufferedResultsWriter يزيد الصفوف عند الكتابة بعد آخر صف
             worksheet = self.spreadsheet.add_worksheet(
-                title=RESULTS_SHEET,
-                rows=MAX_ROWS + 10,
+                title=self.source['results_title'],
+                rows=RESULTS_INITIAL_ROWS,
                 cols=8
             )
             
@@ -840,31 +890,9 @@ class VoterInquiryBot:
         return worksheet
     
     def write_result(self, worksheet, row_number, name, national_id, result):
-        """كتابة نتيجة واحدة في الشيت"""
+        """كتابة نتيجة واحدة في الشيت (للكتابة المجمعة استخدم BufferedResultsWriter)"""
         try:
-            # إذا كان الشخص ليس له حق الانتخاب، نكتب فقط الاسم والرقم القومي والملاحظة
-            if result.get('status') == 'no_voting_right':
-                data = [
-                    name,
-                    national_id,
-                    '',  # مركز الانتخاب - فارغ
-                    '',  # العنوان - فارغ
-                    '',  # رقم اللجنة الفرعية - فارغ
-                    '',  # الرقم في الكشوف - فارغ
-                    '',  # الحالة - فارغ
-                    'ليس له حق الانتخاب'  # ملاحظات
-                ]
-            else:
-                data = [
-                    name,
-                    national_id,
-                    result.get('مركز_الانتخاب', ''),
-                    result.get('العنوان', ''),
-                    result.get('رقم_اللجنة_الفرعية', ''),
-                    result.get('الرقم_في_الكشوف', ''),
-                    result.get('status', ''),
-                    result.get('error_message', '')
-                ]
+            data = format_result_row(name, national_id, result)
             
             # الكتابة في الصف المناسب (نضيف 1 للعناوين)
             cell_range = f'A{row_number}:H{row_number}'
@@ -874,57 +902,41 @@ class VoterInquiryBot:
             print(f"  ✗ خطأ في كتابة النتيجة إلى Google Sheet: {str(e)}")
             raise
     
-    def run(self):
-        """تشغيل البوت الرئيسي"""
-        print("\n" + "="*60)
-        print("بوت الاستعلام عن بيانات الناخبين")
-        print("="*60 + "\n")
-        
+    def process_source(self, cache):
+        """
+        معالجة ورقة المصدر الحالية كاملة (قراءة ← استعلام ← كتابة ← حفظ التقدم)
+        يرجع عدد الأرقام المعالجة وإحصائيات إعادة المحاولة والتكرار
+        """
+        results_writer = None
+        if self.leases is not None:
+            self.leases.start_heartbeat()
         try:
-            # الاتصال بـ Google Sheets
-            self.connect_to_sheets()
+            # قراءة البيانات تدريجياً من نقطة الاستكمال (تبدأ أثناء تشغيل العمال)
+            voters = self.iter_voters()
             
-            # قراءة البيانات
-            voters_data = self.get_voters_data()
-            
-            # تصفية البيانات التي لم تتم معالجتها بعد
-            start_row = self.progress['last_row']
-            remaining_data = [v for v in voters_data if v['row_number'] > start_row]
-            
-            if not remaining_data:
-                print("✓ تمت معالجة جميع البيانات بالفعل!")
-                return
-            
-            print(f"\nسيتم معالجة {len(remaining_data)} صف")
-            print(f"البدء من الصف رقم {remaining_data[0]['row_number']}\n")
-            
-            # إعداد المتصفح
-            self.setup_selenium()
-            
-            # إنشاء/فتح ورقة النتائج
+            # إنشاء/فتح ورقة النتائج (تزيد صفوفها أثناء الكتابة حسب الحاجة)
             results_sheet = self.create_results_sheet()
+            results_writer = BufferedResultsWriter(
+                results_sheet,
+                batch_size=RESULTS_BATCH_SIZE,
+                flush_interval=RESULTS_FLUSH_INTERVAL,
+                on_flush=self.on_results_flushed,
+                grow_rows=RESULTS_GROW_ROWS
+            )
             
-            # معالجة كل صف
-            for idx, voter in enumerate(remaining_data, 1):
-                print(f"\n[{idx}/{len(remaining_data)}] معالجة: {voter['name']} - {voter['national_id']}")
-                
-                # الاستعلام عن البيانات
-                result = self.query_election_data(voter['national_id'])
-                
-                # كتابة النتيجة
-                result_row = voter['row_number']
-                self.write_result(
-                    results_sheet,
-                    result_row,
-                    voter['name'],
-                    voter['national_id'],
-                    result
-                )
-                
-                # تحديث التقدم
-                self.progress['last_row'] = voter['row_number']
-                self.progress['total_processed'] += 1
-                self.save_progress()
+            handled = 0
+            
+            def on_result(voter, result):
+                nonlocal handled
+                METRICS.inc('results_total', status=result['status'])
+                TRACER.attach(voter, result)
+                METRICS.inc('rows_written_total', len(voter['rows']))
+                # مرحلة الكتابة: نفس النتيجة لكل الصفوف التي تحمل هذا الرقم في نفس الطلب
+                # (التقدم يُحدّث بعد تأكيد الكتابة)
+                results_writer.add_many({
+                    row['row_number']: format_result_row(row['name'], row['national_id'], result)
+                    for row in voter['rows']
+                })
                 
                 if result['status'] == 'success':
                     print(f"  ✓ تم بنجاح - المركز: {result.get('مركز_الانتخاب', 'غير متوفر')}")
@@ -933,35 +945,134 @@ class VoterInquiryBot:
                 else:
                     print(f"  ✗ خطأ: {result.get('error_message', 'غير معروف')}")
                 
-                # انتظار قصير بين الطلبات
-                time.sleep(2)
-                
                 # عرض التقدم كل 10 صفوف
+                handled += 1
+                idx = handled
                 if idx % 10 == 0:
                     print(f"\n{'='*40}")
-                    print(f"التقدم: {idx}/{len(remaining_data)} ({idx/len(remaining_data)*100:.1f}%)")
+                    print(f"التقدم: {idx} رقم قومي (آخر صف: {voter['row_number']})")
                     print(f"{'='*40}\n")
             
+            # معالجة الصفوف عبر N متصفح مستقل بحد أقصى عام لعدد الطلبات في الثانية،
+            # بينما الكتابة في الشيت وحفظ التقدم يعملان في مراحل منفصلة
+            print(f"تشغيل {WORKER_COUNT} عامل ({QUERY_BACKEND}) بحد أقصى {MAX_REQUESTS_PER_SECOND} طلب/ثانية\n")
+            pool = BrowserWorkerPool(self, WORKER_COUNT, self.rate_limiter)
+            pipeline = InquiryPipeline(
+                pool,
+                results_writer,
+                handle_result=on_result,
+                checkpoint=self.on_results_flushed,
+                queue_size=PIPELINE_QUEUE_SIZE,
+                stats_file=PIPELINE_STATS_FILE,
+                stats_interval=PIPELINE_STATS_INTERVAL,
+                cache=cache,
+                retry=RetryScheduler(RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY)
+            )
+            pipeline.run(voters)
+            
+            # كتابة ما تبقى في المخزن
+            results_writer.flush()
+            
+            retry_stats = pipeline.retry.stats()
+            return {
+                'handled': handled,
+                'retry_scheduled': retry_stats['scheduled'],
+                'retry_exhausted': retry_stats['exhausted'],
+                'duplicates': pipeline.duplicates,
+                'rows_added': results_writer.rows_added,
+            }
+        
+        finally:
+            # محاولة كتابة النتائج المعلقة قبل الانتقال للمصدر التالي أو الخروج
+            if results_writer is not None:
+                try:
+                    results_writer.flush()
+                except Exception:
+                    print("  تحذير: لم يتم كتابة بعض النتائج المعلقة - سيُعاد الاستعلام عنها في التشغيل القادم")
+            
+            # النطاقات غير المنتهية تصبح متاحة فوراً لنسخة أخرى
+            if self.leases is not None:
+                self.leases.release_all()
+    
+    def run(self):
+        """تشغيل البوت الرئيسي"""
+        print("\n" + "="*60)
+        print("بوت الاستعلام عن بيانات الناخبين")
+        print("="*60 + "\n")
+        
+        cache = None
+        try:
+            # الاتصال بـ Google Sheets
+            self.connect_to_sheets()
+            
+            # النتائج المحفوظة تُكتب مباشرة دون فتح أي متصفح
+            cache = ResultCache(RESULT_CACHE_FILE, RESULT_CACHE_TTL)
+            METRICS.start_publisher(METRICS_FILE, METRICS_INTERVAL)
+            TRACER.open(PERF_TRACE_FILE)
+            
+            # أوراق المصدر بالترتيب، كل ورقة بسجل تقدم وورقة نتائج خاصة بها
+            totals = Counter()
+            for index, source in enumerate(SOURCES):
+                self.use_source(source)
+                if len(SOURCES) > 1:
+                    print(f"\n📄 ورقة المصدر {index + 1}/{len(SOURCES)}: {describe(source, SPREADSHEET_ID)}")
+                totals.update(self.process_source(cache))
+                totals['total_processed'] += self.checkpoints.summary()['total_processed']
+            
+            if totals['handled'] == 0:
+                print("✓ تمت معالجة جميع البيانات بالفعل!")
+                return
+            
             print("\n" + "="*60)
             print("✓ اكتملت المعالجة بنجاح!")
-            print(f"تم معالجة {self.progress['total_processed']} صف إجمالي")
+            print(f"تم معالجة {totals['total_processed']} صف إجمالي")
+            cache_stats = cache.stats()
+            print(f"ذاكرة النتائج: {cache_stats['hits']} من الذاكرة، {cache_stats['misses']} استعلام جديد")
+            if totals['retry_scheduled']:
+                print(f"إعادة المحاولة: {totals['retry_scheduled']} محاولة مؤجلة، "
+                      f"{totals['retry_exhausted']} رقم استنفد المحاولات")
+            browser_stats = self.browsers.stats()
+            if browser_stats['sessions']:
+                print(f"المتصفحات: {browser_stats['sessions']} جلسة، {browser_stats['recycles']} إعادة تشغيل دورية، "
+                      f"{browser_stats['crashes']} توقف مفاجئ، متوسط التشغيل {browser_stats['avg_launch_seconds']} ثانية، "
+                      f"أقصى ذاكرة {browser_stats['peak_rss_mb']} MB")
+            if totals['duplicates']:
+                print(f"تم توفير {totals['duplicates']} استعلام لأرقام قومية مكررة")
+            if totals['rows_added']:
+                print(f"تمت زيادة أوراق النتائج {totals['rows_added']} صف أثناء الكتابة")
+            self.sheets_limiter.report()
+            if self.leases is not None:
+                lease_stats = self.leases.summary()
+                print(f"النطاقات المشتركة: {lease_stats['claimed']} نطاق لهذه النسخة "
+                      f"({lease_stats['takeovers']} من نسخ متوقفة) | {lease_stats['done']} نطاق منتهي إجمالاً")
+            if SHEETS_BACKEND == 'memory':
+                print("طلبات Google Sheets (شيت في الذاكرة):")
+                self.gc.stats.report()
             print("="*60 + "\n")
             
         except KeyboardInterrupt:
             print("\n\n⚠ تم إيقاف البرنامج من قبل المستخدم")
-            print(f"تم حفظ التقدم: آخر صف معالج هو {self.progress['last_row']}")
+            print(f"تم حفظ التقدم: آخر صف معالج هو {self.checkpoints.summary()['last_row']}")
             print("يمكنك تشغيل البرنامج مرة أخرى للمتابعة من حيث توقفت\n")
             
         except Exception as e:
             print(f"\n✗ خطأ: {str(e)}")
-            print(f"تم حفظ التقدم: آخر صف معالج هو {self.progress['last_row']}")
+            print(f"تم حفظ التقدم: آخر صف معالج هو {self.checkpoints.summary()['last_row']}")
             raise
             
         finally:
-            # إغلاق المتصفح
-            if self.driver:
-                self.driver.quit()
-                print("تم إغلاق المتصفح")
+            if self.leases is not None:
+                self.leases.close()
+            
+            METRICS.stop_publisher(METRICS_FILE)
+            TRACER.report(PERF_REPORT_FILE)
+            TRACER.close()
+            
+            if cache is not None:
+                cache.close()
+            
+            # العمال يغلقون متصفحاتهم عند الانتهاء
+            print("تم إغلاق المتصفحات")
 
 
 def main():
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مقاييس التشغيل: عدادات وتوزيعات زمنية (histograms) لكل مرحلة من مراحل الاستعلام
+البوت يحفظ نسخة منها في ملف بشكل دوري من thread منفصل، والـ dashboard يقرأ الملف
+ويعرضه بصيغة Prometheus على /metrics - فلا يؤثر جمع المقاييس على سرعة البوت
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+PREFIX = 'voter_bot'
+
+# حدود التوزيع الزمني بالثواني (من فحص سريع إلى تحميل صفحة بطيء)
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+# المراحل المعروفة (تظهر في /metrics حتى قبل أول قياس) - نفس أسماء مراحل perf_trace
+PHASES = (
+    'navigate',
+    'find_iframe',
+    'locate_input',
+    'submit',
+    'wait',
+    'extract',
+    'write',
+    'checkpoint',
+)
+
+
+class Histogram:
+    """توزيع زمني بحدود ثابتة"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def snapshot(self):
+        """الحدود التراكمية كما يتوقعها Prometheus"""
+        cumulative = []
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            cumulative.append([bound, running])
+        return {'buckets': cumulative, 'count': self.count, 'sum': round(self.sum, 6)}
+
+
+class MetricsRegistry:
+    """سجل المقاييس المشترك بين كل الـ threads في البوت"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {phase: Histogram() for phase in PHASES}
+        self._started = time.time()
+        self._publisher = None
+        self._stop_event = threading.Event()
+        self._last_rate = (time.monotonic(), 0)
+        self.throughput = 0.0
+
+    def inc(self, name, amount=1, **labels):
+        """زيادة عداد (مع تصنيفات اختيارية مثل status='success')"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, phase, seconds):
+        """تسجيل مدة مرحلة بالثواني"""
+        with self._lock:
+            histogram = self._histograms.get(phase)
+            if histogram is None:
+                histogram = self._histograms[phase] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, phase):
+        """قياس مدة كتلة كود: with METRICS.time('navigation'): ..."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.monotonic() - started)
+
+    def counter_total(self, name):
+        with self._lock:
+            return sum(value for (counter, _), value in self._counters.items() if counter == name)
+
+    def update_throughput(self):
+        """عدد النتائج في الدقيقة منذ آخر تحديث"""
+        now = time.monotonic()
+        total = self.counter_total('results_total')
+        last_time, last_total = self._last_rate
+        if now - last_time > 0:
+            self.throughput = (total - last_total) / (now - last_time) * 60
+        self._last_rate = (now, total)
+        return self.throughput
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'started': self._started,
+                'updated': time.time(),
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                'gauges': dict(self._gauges, throughput_per_minute=round(self.throughput, 2)),
+                'histograms': {phase: h.snapshot() for phase, h in self._histograms.items()},
+            }
+
+    def publish(self, path):
+        """حفظ نسخة من المقاييس في ملف (كتابة ذرية حتى لا يقرأ الـ dashboard ملفاً ناقصاً)"""
+        self.update_throughput()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def start_publisher(self, path, interval=10):
+        """حفظ المقاييس دورياً من thread منفصل"""
+        def loop():
+            while not self._stop_event.wait(interval):
+                try:
+                    self.publish(path)
+                except OSError as e:
+                    print(f"  تحذير: فشل حفظ المقاييس: {str(e)}")
+
+        self._stop_event.clear()
+        self._publisher = threading.Thread(target=loop, name="metrics-publisher", daemon=True)
+        self._publisher.start()
+
+    def stop_publisher(self, path):
+        """إيقاف الحفظ الدوري مع حفظ نسخة أخيرة"""
+        self._stop_event.set()
+        if self._publisher is not None:
+            self._publisher.join(timeout=5)
+            self._publisher = None
+        try:
+            self.publish(path)
+        except OSError:
+            pass
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for key, value in sorted(labels.items())
+    )
+    return '{' + parts + '}'
+
+
+def render_prometheus(snapshot, extra_gauges=None):
+    """تحويل نسخة المقاييس إلى صيغة Prometheus النصية"""
+    lines = []
+
+    counters = {}
+    for counter in snapshot.get('counters', []):
+        counters.setdefault(counter['name'], []).append(counter)
+    for name, samples in counters.items():
+        metric = f"{PREFIX}_{name}"
+        lines.append(f"# TYPE {metric} counter")
+        for sample in samples:
+            lines.append(f"{metric}{_format_labels(sample['labels'])} {sample['value']}")
+
+    gauges = dict(snapshot.get('gauges', {}))
+    gauges.update(extra_gauges or {})
+    for name, value in sorted(gauges.items()):
+        metric = f"{PREFIX}_{name}"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {value}")
+
+    histograms = snapshot.get('histograms', {})
+    if histograms:
+        metric = f"{PREFIX}_phase_duration_seconds"
+        lines.append(f"# HELP {metric} مدة كل مرحلة من مراحل الاستعلام والكتابة")
+        lines.append(f"# TYPE {metric} histogram")
+        for phase, histogram in sorted(histograms.items()):
+            for bound, count in histogram['buckets']:
+                lines.append(f'{metric}_bucket{{phase="{phase}",le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{phase="{phase}",le="+Inf"}} {histogram["count"]}')
+            lines.append(f'{metric}_sum{{phase="{phase}"}} {histogram["sum"]}')
+            lines.append(f'{metric}_count{{phase="{phase}"}} {histogram["count"]}')
+
+    return '\n'.join(lines) + '\n'
+
+
+# سجل واحد لكل عملية البوت
+METRICS = MetricsRegistry()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تتبع زمني لكل استعلام: سجل JSON واحد لكل رقم قومي يحتوي مدة كل مرحلة
+(الانتقال، البحث عن iframe، إيجاد الحقل، الإرسال، الانتظار، الاستخراج، الكتابة، حفظ التقدم)
+مع طريقة الاستخراج الناجحة والنتيجة، وتقرير في نهاية التشغيل (p50/p95/p99 لكل مرحلة،
+معدل الإنجاز في كل دقيقة، وأبطأ الأرقام)
+"""
+
+import json
+import time
+import heapq
+import random
+import threading
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from metrics import METRICS
+
+# المراحل بترتيب حدوثها
+PHASES = (
+    'navigate',
+    'find_iframe',
+    'locate_input',
+    'submit',
+    'wait',
+    'extract',
+    'write',
+    'checkpoint',
+)
+
+SLOWEST_COUNT = 10
+# أقصى عدد من القيم المحفوظة لكل مرحلة لحساب النسب المئوية (الذاكرة ثابتة مهما طال التشغيل)
+SAMPLE_LIMIT = 50000
+
+
+def percentile(sorted_values, pct):
+    """النسبة المئوية بطريقة nearest-rank من قائمة مرتبة"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class SampleReservoir:
+    """
+    قيم مرحلة واحدة: العدد والمجموع والأقصى بدقة، وعينة عشوائية منتظمة حتى limit قيمة
+    (reservoir sampling) لحساب النسب المئوية
+    """
+
+    def __init__(self, limit=SAMPLE_LIMIT):
+        self.limit = limit
+        self.values = array('d')
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._random = random.Random(0)
+
+    def __len__(self):
+        return self.count
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if len(self.values) < self.limit:
+            self.values.append(value)
+        else:
+            index = self._random.randrange(self.count)
+            if index < self.limit:
+                self.values[index] = value
+
+    def ordered(self):
+        return sorted(self.values)
+
+
+class PerfTracer:
+    """
+    مراحل الاستعلام تُسجل في thread العامل، ومراحل الكتابة وحفظ التقدم تُسجل لاحقاً
+    لكل الصفوف في نفس الدفعة، ثم يُكتب السجل بعد تأكيد حفظ التقدم
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._finished = {}  # {الرقم القومي: سجل} بعد الاستعلام وقبل وصوله لمرحلة الكتابة
+        self._pending = {}  # {رقم الصف: سجل} في انتظار الكتابة وحفظ التقدم
+        self._file = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.samples = {phase: SampleReservoir() for phase in PHASES}
+            self.totals = SampleReservoir()
+            self.per_minute = Counter()
+            self.outcomes = Counter()
+            self.slowest = []
+            self.started = time.time()
+
+    def open(self, path):
+        """بداية تشغيل جديد: السجلات تُضاف لملف JSONL"""
+        self.reset()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # ---- مراحل الاستعلام (في thread العامل) ----
+
+    def begin(self, national_id, source):
+        trace = {
+            'national_id': national_id,
+            'source': source,
+            'worker': threading.current_thread().name,
+            'started': time.time(),
+            'phases': {},
+            'strategy': None,
+            'outcome': None,
+            'attempt': 1,
+        }
+        self._local.trace = trace
+        return trace
+
+    def annotate(self, **fields):
+        """إضافة معلومات للسجل الحالي (مثل طريقة الاستخراج أو النتيجة)"""
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None:
+            trace.update(fields)
+
+    def observe(self, phase, seconds):
+        """تسجيل مدة مرحلة في السجل الحالي وفي المقاييس"""
+        METRICS.observe(phase, seconds)
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None:
+            trace['phases'][phase] = trace['phases'].get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, phase):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.monotonic() - started)
+
+    def end(self):
+        """انتهاء الاستعلام: السجل ينتظر وصول النتيجة لمرحلة الكتابة"""
+        trace = getattr(self._local, 'trace', None)
+        self._local.trace = None
+        if trace is None:
+            return
+        trace['query_seconds'] = time.time() - trace['started']
+        with self._lock:
+            previous = self._finished.get(trace['national_id'])
+            if previous is not None:
+                # محاولة سابقة تم تأجيلها لإعادة المحاولة
+                trace['attempt'] = previous['attempt'] + 1
+            self._finished[trace['national_id']] = trace
+
+    # ---- مراحل الكتابة وحفظ التقدم (لكل دفعة) ----
+
+    def attach(self, voter, result):
+        """ربط السجل بصفوف الناخب عند وصول نتيجته لمرحلة الكتابة"""
+        with self._lock:
+            trace = self._finished.pop(voter['national_id'], None)
+            if trace is None:
+                # نتيجة من ذاكرة النتائج (بدون استعلام)
+                trace = {
+                    'national_id': voter['national_id'],
+                    'source': 'cache',
+                    'worker': None,
+                    'started': time.time(),
+                    'phases': {},
+                    'strategy': None,
+                    'outcome': None,
+                    'attempt': 0,
+                    'query_seconds': 0.0,
+                }
+            trace['status'] = result.get('status')
+            trace['rows'] = [row['row_number'] for row in voter['rows']]
+            for row in voter['rows']:
+                self._pending[row['row_number']] = trace
+
+    @contextmanager
+    def batch_phase(self, phase, row_numbers):
+        """مرحلة تتم مرة واحدة لدفعة صفوف: نفس المدة تُسجل لكل سجل في الدفعة"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            seconds = time.monotonic() - started
+            METRICS.observe(phase, seconds)
+            with self._lock:
+                for row in row_numbers:
+                    trace = self._pending.get(row)
+                    if trace is not None:
+                        trace['phases'][phase] = seconds
+
+    def complete(self, row_numbers):
+        """كتابة سجل كل ناخب اكتملت كل مراحله (بعد حفظ التقدم)"""
+        with self._lock:
+            traces = {}
+            for row in row_numbers:
+                trace = self._pending.pop(row, None)
+                if trace is not None:
+                    traces[id(trace)] = trace
+            for trace in traces.values():
+                for row in trace['rows']:
+                    self._pending.pop(row, None)
+                self._emit(trace)
+
+    def _emit(self, trace):
+        phases = {phase: round(seconds, 4) for phase, seconds in trace['phases'].items()}
+        total = sum(trace['phases'].values())
+        record = {
+            'national_id': trace['national_id'],
+            'time': datetime.fromtimestamp(trace['started']).isoformat(),
+            'source': trace['source'],
+            'worker': trace['worker'],
+            'attempt': trace['attempt'],
+            'rows': trace['rows'],
+            'phases': phases,
+            'total_seconds': round(total, 4),
+            'strategy': trace['strategy'],
+            'outcome': trace['outcome'],
+            'status': trace['status'],
+        }
+        if self._file is not None:
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._file.flush()
+
+        for phase, seconds in trace['phases'].items():
+            self.samples.setdefault(phase, SampleReservoir()).add(seconds)
+        self.totals.add(total)
+        self.per_minute[int((trace['started'] - self.started) // 60)] += 1
+        self.outcomes[trace['status']] += 1
+
+        entry = (total, trace['national_id'])
+        if len(self.slowest) < SLOWEST_COUNT:
+            heapq.heappush(self.slowest, entry)
+        else:
+            heapq.heappushpop(self.slowest, entry)
+
+    # ---- التقرير النهائي ----
+
+    def summary(self):
+        with self._lock:
+            phases = {}
+            for phase, values in self.samples.items():
+                if not values:
+                    continue
+                ordered = values.ordered()
+                phases[phase] = {
+                    'count': values.count,
+                    'p50': round(percentile(ordered, 50), 3),
+                    'p95': round(percentile(ordered, 95), 3),
+                    'p99': round(percentile(ordered, 99), 3),
+                    'max': round(values.max, 3),
+                    'total': round(values.total, 1),
+                }
+            ordered_totals = self.totals.ordered()
+            elapsed = time.time() - self.started
+            return {
+                'lookups': len(self.totals),
+                'elapsed_seconds': round(elapsed, 1),
+                'per_minute_overall': round(len(self.totals) / elapsed * 60, 2) if elapsed > 0 else 0.0,
+                'total': {
+                    'p50': round(percentile(ordered_totals, 50), 3),
+                    'p95': round(percentile(ordered_totals, 95), 3),
+                    'p99': round(percentile(ordered_totals, 99), 3),
+                },
+                'phases': phases,
+                'throughput_per_minute': [
+                    {'minute': minute, 'lookups': count}
+                    for minute, count in sorted(self.per_minute.items())
+                ],
+                'statuses': dict(self.outcomes),
+                'slowest': [
+                    {'national_id': national_id, 'seconds': round(seconds, 3)}
+                    for seconds, national_id in sorted(self.slowest, reverse=True)
+                ],
+            }
+
+    def report(self, path=None):
+        """طباعة ملخص الأداء وحفظه في ملف JSON"""
+        summary = self.summary()
+        if not summary['lookups']:
+            return summary
+
+        print("\n" + "=" * 60)
+        print(f"تقرير الأداء: {summary['lookups']} استعلام | {summary['per_minute_overall']} في الدقيقة")
+        print(f"{'المرحلة':<14}{'العدد':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'الإجمالي':>11}")
+        for phase in PHASES:
+            stats = summary['phases'].get(phase)
+            if stats:
+                print(f"{phase:<14}{stats['count']:>8}{stats['p50']:>9.2f}{stats['p95']:>9.2f}"
+                      f"{stats['p99']:>9.2f}{stats['total']:>11.1f}")
+        if summary['slowest']:
+            slowest = ', '.join(f"{s['national_id']} ({s['seconds']:.1f}s)" for s in summary['slowest'][:5])
+            print(f"أبطأ الأرقام: {slowest}")
+        print("=" * 60)
+
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+            print(f"تم حفظ تقرير الأداء في {path}")
+        return summary
+
+
+# متتبع واحد لكل عملية البوت
+TRACER = PerfTracer()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تشغيل البوت كمراحل متوازية متصلة بطوابير محدودة الحجم:
+قراءة المصدر ← الاستعلام (عمال المتصفح) ← كتابة النتائج ← حفظ التقدم
+حتى لا ينتظر المتصفح أبداً طلبات Google Sheets أو كتابة ملف التقدم
+الأرقام الموجودة في ذاكرة النتائج تنتقل من القراءة للكتابة مباشرة دون أي استعلام،
+والصفوف المكررة لرقم لا يزال قيد المعالجة تُضاف لنفس الناخب بدلاً من استعلام جديد،
+والأخطاء المؤقتة تُؤجل لإعادة المحاولة بعد انتهاء القراءة بدلاً من كتابتها
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+from datetime import datetime
+
+from retry_queue import is_transient
+
+# علامة نهاية الطابور
+_DONE = object()
+
+
+class StageStats:
+    """إحصائيات مرحلة واحدة: عدد العناصر ووقت الانشغال"""
+
+    def __init__(self, name, parallelism=1):
+        self.name = name
+        self.parallelism = parallelism
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, items=1):
+        with self._lock:
+            self.busy_seconds += seconds
+            self.items += items
+
+    def snapshot(self, elapsed):
+        """الإحصائيات الحالية؛ utilization هي نسبة الوقت الذي كانت فيه المرحلة مشغولة"""
+        with self._lock:
+            capacity = max(elapsed, 1e-9) * self.parallelism
+            return {
+                'items': self.items,
+                'busy_seconds': round(self.busy_seconds, 2),
+                'utilization': round(min(self.busy_seconds / capacity, 1.0), 3),
+                'workers': self.parallelism,
+            }
+
+
+class InquiryPipeline:
+    """ربط مراحل القراءة والاستعلام والكتابة وحفظ التقدم بطوابير محدودة"""
+
+    def __init__(self, pool, results_writer, handle_result, checkpoint,
+                 queue_size=100, stats_file=None, stats_interval=30, cache=None, retry=None):
+        self.pool = pool
+        self.cache = cache
+        self.retry = retry
+        self.results_writer = results_writer
+        self.handle_result = handle_result
+        self.checkpoint = checkpoint
+        self.stats_file = stats_file
+        self.stats_interval = stats_interval
+
+        self.voter_queue = queue.Queue(maxsize=queue_size)
+        self.result_queue = queue.Queue(maxsize=queue_size)
+        self.checkpoint_queue = queue.Queue(maxsize=queue_size)
+
+        self.stats = {
+            'reader': StageStats('reader'),
+            'query': StageStats('query', pool.worker_count),
+            'writer': StageStats('writer'),
+            'checkpoint': StageStats('checkpoint'),
+        }
+        self.stop_event = pool.stop_event
+        self._error = None
+        self._started = None
+        # الناخبون الذين دخلوا الطوابير ولم تُكتب نتيجتهم بعد {الرقم القومي: الناخب}
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+        self.duplicates = 0
+        self._results_closed = False
+
+    def _fail(self, error):
+        """تسجيل أول خطأ في أي مرحلة وإيقاف المصدر والعمال"""
+        if self._error is None:
+            self._error = error
+        self.stop_event.set()
+
+    def _put(self, target_queue, item):
+        """إضافة عنصر لطابور محدود مع احترام طلب الإيقاف"""
+        while not self.stop_event.is_set():
+            try:
+                target_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _reader(self, voters):
+        """
+        مرحلة القراءة: تمرير الناخبين من المصدر إلى طابور الاستعلام
+        المصدر يمكنه إرجاع None أثناء انتظار صفوف جديدة، فتُستغل المدة في إعادة المحاولات المستحقة
+        """
+        try:
+            iterator = iter(voters)
+            while not self.stop_event.is_set():
+                started = time.monotonic()
+                try:
+                    voter = next(iterator)
+                except StopIteration:
+                    break
+                if voter is None:
+                    # المصدر ينتظر صفوفاً جديدة (نطاقات تحجزها نسخ أخرى):
+                    # الأرقام المؤجلة التي حان موعدها تُرسل الآن حتى تنتهي نطاقات هذه النسخة أيضاً
+                    if not self._send_due_retries():
+                        break
+                    continue
+                # رقم مكرر لا يزال قيد المعالجة: صفوفه تنتظر نفس النتيجة
+                with self._in_flight_lock:
+                    queued = self._in_flight.get(voter['national_id'])
+                    if queued is not None:
+                        queued['rows'].extend(voter['rows'])
+                        self.duplicates += 1
+                    else:
+                        self._in_flight[voter['national_id']] = voter
+                if queued is not None:
+                    self.stats['reader'].record(time.monotonic() - started)
+                    continue
+
+                cached = self.cache.get(voter['national_id']) if self.cache else None
+                self.stats['reader'].record(time.monotonic() - started)
+
+                if cached is not None:
+                    if not self._put(self.result_queue, (voter, cached)):
+                        break
+                elif not self._put(self.voter_queue, voter):
+                    break
+            self._retry_pass()
+        except Exception as e:
+            self._fail(e)
+        finally:
+            # علامة نهاية لكل عامل ما دام هناك عمال يسحبون من الطابور
+            remaining = self.pool.worker_count
+            while remaining and self.pool.is_alive():
+                try:
+                    self.voter_queue.put(_DONE, timeout=0.5)
+                    remaining -= 1
+                except queue.Full:
+                    continue
+
+    def _send_due_retries(self):
+        """إرسال كل الأرقام المؤجلة التي حان موعدها للعمال دون انتظار؛ False عند طلب الإيقاف"""
+        if self.retry is None:
+            return True
+        while True:
+            voter = self.retry.pop_due(timeout=0)
+            if voter is None:
+                return True
+            if not self._put(self.voter_queue, voter):
+                return False
+
+    def _retry_pass(self):
+        """
+        بعد انتهاء المصدر: إعادة الأرقام المؤجلة للعمال عند حلول موعدها،
+        حتى لا يبقى أي رقم قيد المعالجة أو في انتظار إعادة المحاولة
+        """
+        if self.retry is None:
+            return
+        while not self.stop_event.is_set():
+            voter = self.retry.pop_due(stop_event=self.stop_event)
+            if voter is not None:
+                if not self._put(self.voter_queue, voter):
+                    return
+                continue
+            with self._in_flight_lock:
+                if not self._in_flight and not len(self.retry):
+                    return
+
+    def _on_query_result(self, voter, result, seconds):
+        """تسليم نتيجة العامل لمرحلة الكتابة (المتصفح لا ينتظر إلا إذا امتلأ الطابور)"""
+        self.stats['query'].record(seconds)
+        if self.cache is not None and not is_transient(result):
+            self.cache.put(voter['national_id'], result)
+        self._put(self.result_queue, (voter, result))
+
+    def _close_results(self, writer):
+        """إرسال علامة النهاية لمرحلة الكتابة بعد انتهاء جميع العمال"""
+        if self._results_closed:
+            return
+        self._results_closed = True
+        while writer.is_alive():
+            try:
+                self.result_queue.put(_DONE, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _writer(self):
+        """مرحلة الكتابة: إضافة النتائج للمخزن والكتابة المجمعة في الشيت"""
+        try:
+            while True:
+                try:
+                    item = self.result_queue.get(timeout=1)
+                except queue.Empty:
+                    # الكتابة حسب الوقت حتى لو لم تصل نتائج جديدة
+                    started = time.monotonic()
+                    if self.results_writer.maybe_flush():
+                        self.stats['writer'].record(time.monotonic() - started, 0)
+                    continue
+
+                if item is _DONE:
+                    break
+
+                voter, result = item
+                started = time.monotonic()
+
+                # فشل مؤقت: الرقم يبقى قيد المعالجة (والصفوف معلقة) حتى إعادة المحاولة
+                if self.retry is not None and is_transient(result) and self.retry.schedule(voter, result):
+                    self.stats['writer'].record(time.monotonic() - started, 0)
+                    continue
+
+                # بعد هذه اللحظة أي صف مكرر يُعامل كرقم جديد (غالباً من ذاكرة النتائج)
+                with self._in_flight_lock:
+                    self._in_flight.pop(voter['national_id'], None)
+                self.handle_result(voter, result)
+                self.stats['writer'].record(time.monotonic() - started)
+
+            started = time.monotonic()
+            self.results_writer.flush()
+            self.stats['writer'].record(time.monotonic() - started, 0)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self.checkpoint_queue.put(_DONE)
+
+    def _checkpointer(self):
+        """مرحلة حفظ التقدم: تسجيل الصفوف بعد تأكيد كتابتها"""
+        while True:
+            item = self.checkpoint_queue.get()
+            if item is _DONE:
+                break
+            try:
+                started = time.monotonic()
+                self.checkpoint(item)
+                self.stats['checkpoint'].record(time.monotonic() - started, len(item))
+            except Exception as e:
+                self._fail(e)
+
+    def snapshot(self):
+        """أعماق الطوابير وإحصائيات كل مرحلة لمعرفة عنق الزجاجة"""
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        stages = {name: stats.snapshot(elapsed) for name, stats in self.stats.items()}
+        busiest = max(stages, key=lambda name: stages[name]['utilization'])
+        return {
+            'elapsed_seconds': round(elapsed, 1),
+            'queues': {
+                'voters': {'depth': self.voter_queue.qsize(), 'maxsize': self.voter_queue.maxsize},
+                'results': {'depth': self.result_queue.qsize(), 'maxsize': self.result_queue.maxsize},
+                'checkpoints': {'depth': self.checkpoint_queue.qsize(), 'maxsize': self.checkpoint_queue.maxsize},
+            },
+            'stages': stages,
+            'bottleneck': busiest,
+            'pending_writes': len(self.results_writer),
+            'duplicates': self.duplicates,
+            'cache': self.cache.stats() if self.cache else None,
+            'retries': self.retry.stats() if self.retry else None,
+            'updated': datetime.now().isoformat(),
+        }
+
+    def report(self):
+        """طباعة ملخص الإحصائيات وحفظه في ملف ليقرأه الـ dashboard"""
+        snapshot = self.snapshot()
+        queues = ' '.join(f"{name}={q['depth']}/{q['maxsize']}" for name, q in snapshot['queues'].items())
+        stages = ' '.join(f"{name}={s['utilization'] * 100:.0f}%" for name, s in snapshot['stages'].items())
+        print(f"  📈 الطوابير: {queues} | الانشغال: {stages} | عنق الزجاجة: {snapshot['bottleneck']}")
+        if snapshot['cache']:
+            cache = snapshot['cache']
+            print(f"  💾 ذاكرة النتائج: {cache['hits']} من الذاكرة | {cache['misses']} استعلام جديد")
+        if snapshot['retries']:
+            retries = snapshot['retries']
+            print(f"  ↻ إعادة المحاولة: {retries['waiting']} في الانتظار | {retries['scheduled']} مجدولة | "
+                  f"{retries['exhausted']} استنفدت المحاولات")
+
+        if self.stats_file:
+            tmp_path = f"{self.stats_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.stats_file)
+        return snapshot
+
+    def run(self, voters):
+        """تشغيل جميع المراحل حتى انتهاء المصدر وكتابة وحفظ كل النتائج"""
+        self._started = time.monotonic()
+
+        # التقدم يُحفظ في مرحلة مستقلة بعد كل كتابة ناجحة
+        self.results_writer.on_flush = lambda rows: self.checkpoint_queue.put(rows)
+
+        reader = threading.Thread(target=self._reader, args=(voters,), name="pipeline-reader", daemon=True)
+        writer = threading.Thread(target=self._writer, name="pipeline-writer", daemon=True)
+        checkpointer = threading.Thread(target=self._checkpointer, name="pipeline-checkpoint", daemon=True)
+
+        # العمال أولاً حتى تصل علامات النهاية من مرحلة القراءة إليهم
+        self.pool.start(self.voter_queue, self._on_query_result, done_marker=_DONE)
+        for thread in (reader, writer, checkpointer):
+            thread.start()
+
+        last_report = time.monotonic()
+        try:
+            while self.pool.is_alive() or writer.is_alive() or checkpointer.is_alive():
+                self.pool.join(timeout=0.5)
+                if not self.pool.is_alive():
+                    self._close_results(writer)
+                writer.join(timeout=0.1 if self.pool.is_alive() else 0.5)
+                checkpointer.join(timeout=0.1)
+
+                if time.monotonic() - last_report >= self.stats_interval:
+                    self.report()
+                    last_report = time.monotonic()
+        except KeyboardInterrupt:
+            # إيقاف المصدر والعمال، مع إكمال كتابة النتائج التي وصلت بالفعل
+            self.stop_event.set()
+            self.pool.join(timeout=30)
+            self._close_results(writer)
+            writer.join(timeout=60)
+            checkpointer.join(timeout=30)
+            raise
+        finally:
+            # بعد توقف مرحلة الحفظ، أي كتابة لاحقة تحفظ التقدم مباشرة
+            self.results_writer.on_flush = self.checkpoint
+            self.report()
+
+        if self._error is not None:
+            raise self._error
+        self.pool.raise_errors()
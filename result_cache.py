@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ذاكرة محلية دائمة لنتائج الاستعلام (SQLite) مفتاحها الرقم القومي
+تبقى بين مرات التشغيل حتى بعد إعادة تعيين التقدم أو تغيير الشيت،
+ولكل حالة مدة صلاحية مختلفة (النتائج النهائية تُحفظ طويلاً والأخطاء لفترة قصيرة)
+"""
+
+import json
+import time
+import sqlite3
+import threading
+
+from metrics import METRICS
+
+
+class ResultCache:
+    """ذاكرة نتائج الاستعلام مع مدة صلاحية لكل حالة"""
+
+    def __init__(self, path, ttl_by_status, default_ttl=0):
+        self.path = path
+        self.ttl_by_status = ttl_by_status
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+        # الاتصال مشترك بين العمال (كل العمليات تحت القفل)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                national_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                result TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def ttl_for(self, status):
+        """مدة صلاحية النتيجة بالثواني حسب حالتها"""
+        return self.ttl_by_status.get(status, self.default_ttl)
+
+    def get(self, national_id):
+        """النتيجة المحفوظة إذا كانت لا تزال صالحة، وإلا None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, result, fetched_at FROM results WHERE national_id = ?",
+                (national_id,)
+            ).fetchone()
+
+            if row is not None:
+                status, result, fetched_at = row
+                if time.time() - fetched_at < self.ttl_for(status):
+                    self.hits += 1
+                    METRICS.inc('cache_lookups_total', result='hit')
+                    return json.loads(result)
+
+            self.misses += 1
+            METRICS.inc('cache_lookups_total', result='miss')
+            return None
+
+    def put(self, national_id, result):
+        """حفظ نتيجة جديدة (الحالات التي مدة صلاحيتها صفر لا تُحفظ)"""
+        status = result.get('status', 'unknown')
+        if self.ttl_for(status) <= 0:
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (national_id, status, result, fetched_at) VALUES (?, ?, ?, ?)",
+                (national_id, status, json.dumps(result, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+            self.stores += 1
+
+    def stats(self):
+        """عدد مرات الاستخدام والاستعلامات الجديدة"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stored': self.stores,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+كاتب النتائج المجمّع لورقة النتائج
+يجمع الصفوف في الذاكرة ويرسلها في طلب batch_update واحد بدلاً من طلب لكل صف،
+ويزيد حجم الورقة على أجزاء (add_rows) عندما تكتب الدفعة بعد آخر صف فيها
+"""
+
+import time
+import threading
+
+from perf_trace import TRACER
+
+
+def format_result_row(name, national_id, result):
+    """تحويل نتيجة الاستعلام إلى قيم صف في ورقة النتائج (الأعمدة A:H)"""
+    # إذا كان الشخص ليس له حق الانتخاب، نكتب فقط الاسم والرقم القومي والملاحظة
+    if result.get('status') == 'no_voting_right':
+        return [
+            name,
+            national_id,
+            '',  # مركز الانتخاب - فارغ
+            '',  # العنوان - فارغ
+            '',  # رقم اللجنة الفرعية - فارغ
+            '',  # الرقم في الكشوف - فارغ
+            '',  # الحالة - فارغ
+            'ليس له حق الانتخاب'  # ملاحظات
+        ]
+
+    return [
+        name,
+        national_id,
+        result.get('مركز_الانتخاب', ''),
+        result.get('العنوان', ''),
+        result.get('رقم_اللجنة_الفرعية', ''),
+        result.get('الرقم_في_الكشوف', ''),
+        result.get('status', ''),
+        result.get('error_message', '')
+    ]
+
+
+def coalesce_rows(rows):
+    """
+    دمج أرقام الصفوف (بأي ترتيب) في أقل عدد ممكن من النطاقات المتصلة
+    rows: قاموس {رقم_الصف: قيم_الصف}
+    يرجع قائمة من (أول_صف, آخر_صف, [قيم الصفوف بالترتيب])
+    """
+    ranges = []
+    for row_number in sorted(rows):
+        if ranges and ranges[-1][1] + 1 == row_number:
+            start, _, values = ranges[-1]
+            values.append(rows[row_number])
+            ranges[-1] = (start, row_number, values)
+        else:
+            ranges.append((row_number, row_number, [rows[row_number]]))
+    return ranges
+
+
+class BufferedResultsWriter:
+    """كاتب نتائج يجمع الصفوف ويكتبها دفعة واحدة عند امتلاء المخزن أو مرور وقت محدد"""
+
+    def __init__(self, worksheet, batch_size=50, flush_interval=30, on_flush=None, grow_rows=0):
+        self.worksheet = worksheet
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.grow_rows = grow_rows  # 0 = لا تُزاد الورقة (الكتابة بعد آخر صف تفشل)
+        self.rows_added = 0
+        self._buffer = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self.total_flushes = 0
+        self.total_rows_written = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def add(self, row_number, values):
+        """إضافة صف للمخزن، والكتابة تلقائياً إذا وصلنا للحد"""
+        with self._lock:
+            # نفس الصف مرتين: القيمة الأحدث هي التي تُكتب
+            self._buffer[row_number] = values
+        self.maybe_flush()
+
+    def add_many(self, rows):
+        """إضافة عدة صفوف معاً {رقم_الصف: القيم} حتى تُكتب كلها في نفس الطلب"""
+        with self._lock:
+            self._buffer.update(rows)
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        """الكتابة إذا امتلأ المخزن أو انتهت مهلة الانتظار"""
+        with self._lock:
+            due = (
+                len(self._buffer) >= self.batch_size or
+                (self._buffer and time.monotonic() - self._last_flush >= self.flush_interval)
+            )
+        if due:
+            return self.flush()
+        return 0
+
+    def ensure_rows(self, last_row):
+        """زيادة صفوف الورقة بمضاعفات grow_rows حتى تتسع لـ last_row (طلب add_rows واحد)"""
+        if not self.grow_rows:
+            return 0
+        missing = last_row - self.worksheet.row_count
+        if missing <= 0:
+            return 0
+        added = -(-missing // self.grow_rows) * self.grow_rows
+        self.worksheet.add_rows(added)
+        self.rows_added += added
+        print(f"  ➕ تمت زيادة ورقة النتائج {added} صف (الحجم الآن {self.worksheet.row_count} صف)")
+        return added
+
+    def flush(self):
+        """كتابة كل الصفوف المعلقة في طلب batch_update واحد"""
+        with self._lock:
+            if not self._buffer:
+                self._last_flush = time.monotonic()
+                return 0
+            pending = dict(self._buffer)
+
+        ranges = coalesce_rows(pending)
+        data = [
+            {'range': f'A{start}:H{end}', 'values': values}
+            for start, end, values in ranges
+        ]
+
+        try:
+            with TRACER.batch_phase('write', sorted(pending)):
+                self.ensure_rows(ranges[-1][1])
+                self.worksheet.batch_update(data)
+        except Exception as e:
+            # الصفوف تبقى في المخزن لإعادة المحاولة في الكتابة التالية
+            print(f"  ✗ خطأ في كتابة {len(pending)} نتيجة إلى Google Sheet: {str(e)}")
+            raise
+
+        with self._lock:
+            for row_number, values in pending.items():
+                # لا نحذف صفاً تم تحديثه أثناء الكتابة
+                if self._buffer.get(row_number) is values:
+                    del self._buffer[row_number]
+            self._last_flush = time.monotonic()
+            self.total_flushes += 1
+            self.total_rows_written += len(pending)
+
+        print(f"  ✓ تم كتابة {len(pending)} نتيجة في Google Sheet ({len(ranges)} نطاق في طلب واحد)")
+
+        # تحديث التقدم فقط بعد تأكيد الكتابة
+        if self.on_flush:
+            self.on_flush(sorted(pending))
+
+        return len(pending)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+طابور مؤجل لإعادة محاولة الأخطاء المؤقتة (انقطاع الاتصال، انتهاء المهلة، Captcha، صفحة غير مفهومة)
+بدلاً من كتابتها في الشيت كنتيجة نهائية؛ كل محاولة تنتظر ضعف سابقتها مع تفاوت عشوائي
+"""
+
+import time
+import heapq
+import random
+import threading
+
+from metrics import METRICS
+
+
+def is_transient(result):
+    """هل النتيجة فشل مؤقت يستحق إعادة المحاولة (وليست نتيجة نهائية من الموقع)"""
+    return bool(result.get('retryable')) or result.get('status') == 'no_data'
+
+
+class RetryScheduler:
+    """جدولة إعادة المحاولة بتأخير أُسّي مع حد أقصى لعدد المحاولات لكل رقم"""
+
+    def __init__(self, max_attempts=4, base_delay=30, max_delay=600, jitter=0.3):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._heap = []
+        self._seq = 0
+        self._lock = threading.Lock()
+        self.scheduled = 0
+        self.exhausted = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._heap)
+
+    def delay_for(self, attempt):
+        """التأخير قبل المحاولة رقم attempt + 1"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def schedule(self, voter, result):
+        """
+        تأجيل الناخب لمحاولة جديدة إذا لم يستنفد محاولاته
+        يرجع False إذا كانت هذه آخر محاولة (فتُكتب النتيجة كما هي)
+        """
+        attempt = voter.get('attempts', 1)
+        if attempt >= self.max_attempts:
+            with self._lock:
+                self.exhausted += 1
+            result['error_message'] = f"{result.get('error_message', '')} (بعد {attempt} محاولات)".strip()
+            return False
+
+        delay = self.delay_for(attempt)
+        voter['attempts'] = attempt + 1
+        with self._lock:
+            self._seq += 1
+            heapq.heappush(self._heap, (time.monotonic() + delay, self._seq, voter))
+            self.scheduled += 1
+        METRICS.inc('retries_total')
+
+        print(f"  ↻ فشل مؤقت ({result.get('error_message') or result.get('status')}) - "
+              f"إعادة المحاولة {attempt + 1}/{self.max_attempts} بعد انتهاء القراءة (≥ {delay:.0f} ثانية)")
+        return True
+
+    def pop_due(self, timeout=0.5, stop_event=None):
+        """أقرب ناخب حان موعده، أو None بعد انتظار timeout (أو عند طلب الإيقاف)"""
+        with self._lock:
+            if self._heap:
+                due = self._heap[0][0] - time.monotonic()
+                if due <= 0:
+                    return heapq.heappop(self._heap)[2]
+                timeout = min(timeout, due)
+        if stop_event is not None:
+            stop_event.wait(max(timeout, 0))
+        else:
+            time.sleep(max(timeout, 0))
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'waiting': len(self._heap),
+                'scheduled': self.scheduled,
+                'exhausted': self.exhausted,
+            }
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+حد مشترك لطلبات Google Sheets: كل قراءة وكتابة تمر من token bucket منفصل حسب حصة الدقيقة،
+فينتظر البوت بدلاً من أن يفشل عند استهلاك الحصة، وعند رد 429 أو 5xx يعيد المحاولة
+بعد المدة في Retry-After (أو بتأخير أُسّي) مع إيقاف كل الطلبات من نفس النوع خلال هذه المدة
+"""
+
+import time
+import random
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import requests
+import gspread
+
+from metrics import METRICS
+
+# نوع كل دالة من دوال gspread (قراءة أو كتابة) - الدوال غير المذكورة لا تمر من الحد
+METHOD_KINDS = {
+    'open_by_key': 'read',
+    'worksheet': 'read',
+    'worksheets': 'read',
+    'get': 'read',
+    'get_all_values': 'read',
+    'get_values': 'read',
+    'batch_get': 'read',
+    'row_values': 'read',
+    'col_values': 'read',
+    'acell': 'read',
+    'cell': 'read',
+    'update': 'write',
+    'batch_update': 'write',
+    'update_cell': 'write',
+    'append_row': 'write',
+    'append_rows': 'write',
+    'add_rows': 'write',
+    'add_worksheet': 'write',
+    'resize': 'write',
+    'clear': 'write',
+}
+
+# الدوال التي ترجع ورقة أو ملفاً يجب أن تمر طلباته أيضاً من الحد
+WRAPPED_RESULTS = {'open_by_key', 'worksheet', 'add_worksheet'}
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def retry_after_seconds(response):
+    """المدة المطلوبة في Retry-After (ثوانٍ أو تاريخ HTTP)، أو None"""
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    per_minute طلب في الدقيقة مع دفعة أولى حتى burst طلب
+    معدل الامتلاء (per_minute - burst) في الدقيقة حتى لا يتجاوز أي نافذة 60 ثانية الحصة
+    """
+
+    def __init__(self, per_minute, burst=10):
+        self.capacity = max(1, min(burst, per_minute))
+        self.rate = max(per_minute - self.capacity, 1) / 60.0
+        self.tokens = float(self.capacity)
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """انتظار توفر طلب؛ يرجع مدة الانتظار بالثواني"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """إيقاف كل الطلبات من هذا النوع (بعد رد 429) وتفريغ الدفعة"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+
+class SheetsRateLimiter:
+    """حد واحد لكل طلبات Google Sheets في البوت (قراءة وكتابة)"""
+
+    def __init__(self, read_per_minute=60, write_per_minute=60, burst=10,
+                 max_retries=6, base_delay=2, max_delay=64):
+        self.budgets = {'read': read_per_minute, 'write': write_per_minute}
+        self.buckets = {
+            'read': TokenBucket(read_per_minute, burst),
+            'write': TokenBucket(write_per_minute, burst),
+        }
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._recent = {'read': deque(), 'write': deque()}
+        self._stats = {
+            kind: {'calls': 0, 'peak_minute': 0, 'waited_seconds': 0.0, 'retries': 0, 'quota_errors': 0}
+            for kind in self.buckets
+        }
+
+    def _record(self, kind, waited):
+        now = time.monotonic()
+        with self._lock:
+            recent = self._recent[kind]
+            recent.append(now)
+            while recent and now - recent[0] >= 60:
+                recent.popleft()
+            stats = self._stats[kind]
+            stats['calls'] += 1
+            stats['waited_seconds'] += waited
+            stats['peak_minute'] = max(stats['peak_minute'], len(recent))
+            used = len(recent)
+        METRICS.inc('sheets_requests_total', kind=kind)
+        METRICS.set_gauge(f'sheets_{kind}_quota_used_percent', round(used / self.budgets[kind] * 100, 1))
+
+    def backoff(self, attempt):
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * random.uniform(0.8, 1.2)
+
+    def call(self, kind, func, *args, **kwargs):
+        """تنفيذ طلب واحد بعد انتظار دوره، مع إعادة المحاولة عند 429/5xx وأخطاء الشبكة"""
+        bucket = self.buckets[kind]
+        attempt = 0
+        while True:
+            self._record(kind, bucket.acquire())
+            try:
+                return func(*args, **kwargs)
+            except gspread.exceptions.APIError as e:
+                status = getattr(e.response, 'status_code', None)
+                if status not in RETRYABLE_STATUS or attempt >= self.max_retries:
+                    raise
+                delay = retry_after_seconds(e.response)
+                if delay is None:
+                    delay = self.backoff(attempt)
+                if status == 429:
+                    # الحصة انتهت لكل الطلبات من هذا النوع وليس لهذا الطلب فقط
+                    bucket.pause(delay)
+                    with self._lock:
+                        self._stats[kind]['quota_errors'] += 1
+                reason = str(status)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                reason = 'network'
+
+            attempt += 1
+            with self._lock:
+                self._stats[kind]['retries'] += 1
+            METRICS.inc('sheets_retries_total', kind=kind, reason=reason)
+            print(f"  ⏳ Google Sheets ({reason}) - إعادة المحاولة {attempt}/{self.max_retries} بعد {delay:.0f} ثانية")
+            if reason == '429':
+                continue  # الانتظار يتم في bucket.acquire() لكل الطلبات معاً
+            time.sleep(delay)
+
+    def wrap(self, target):
+        """ملف أو ورقة gspread تمر كل طلباتها من هذا الحد"""
+        if target is None or isinstance(target, LimitedSheetsObject):
+            return target
+        return LimitedSheetsObject(target, self)
+
+    def usage(self):
+        """استهلاك الحصة لكل نوع: آخر دقيقة، أعلى دقيقة، الانتظار وإعادة المحاولة"""
+        now = time.monotonic()
+        with self._lock:
+            usage = {}
+            for kind, stats in self._stats.items():
+                recent = self._recent[kind]
+                while recent and now - recent[0] >= 60:
+                    recent.popleft()
+                usage[kind] = dict(
+                    stats,
+                    budget=self.budgets[kind],
+                    last_minute=len(recent),
+                    peak_percent=round(stats['peak_minute'] / self.budgets[kind] * 100, 1),
+                    waited_seconds=round(stats['waited_seconds'], 1),
+                )
+            return usage
+
+    def report(self):
+        labels = {'read': 'قراءة', 'write': 'كتابة'}
+        for kind, stats in self.usage().items():
+            if not stats['calls']:
+                continue
+            print(f"حصة Google Sheets ({labels[kind]}): {stats['calls']} طلب | أعلى دقيقة "
+                  f"{stats['peak_minute']}/{stats['budget']} ({stats['peak_percent']}%) | "
+                  f"انتظار {stats['waited_seconds']} ثانية | {stats['retries']} إعادة محاولة "
+                  f"({stats['quota_errors']} خطأ 429)")
+
+
+class LimitedSheetsObject:
+    """غلاف لكائن gspread (Client أو Spreadsheet أو Worksheet): الدوال المعروفة تمر من الحد"""
+
+    def __init__(self, target, limiter):
+        self._target = target
+        self._limiter = limiter
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        kind = METHOD_KINDS.get(name)
+        if kind is None or not callable(attr):
+            return attr
+
+        def limited(*args, **kwargs):
+            result = self._limiter.call(kind, attr, *args, **kwargs)
+            if name in WRAPPED_RESULTS:
+                return self._limiter.wrap(result)
+            return result
+
+        return limited
+
+    def __repr__(self):
+        return f"Limited({self._target!r})"
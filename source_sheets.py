@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+أوراق المصدر التي يعالجها البوت في نفس التشغيل (بالترتيب):
+كل مصدر ورقة في ملف، ونتائجه تُكتب في ورقة نتائج خاصة به في نفس الملف،
+وسجل تقدمه (وقاعدة الحجز عند تشغيل عدة نسخ) في ملف منفصل باسم المصدر
+"""
+
+import os
+import re
+
+
+def parse_sources(value, default_spreadsheet_id, default_title, results_title):
+    """
+    'Voters, Voters2, <معرف ملف>:Sheet1' -> [{'spreadsheet_id', 'title', 'results_title', 'key'}]
+    قيمة فارغة = ورقة المصدر الافتراضية فقط
+    """
+    sources = []
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        spreadsheet_id, _, title = item.rpartition(':')
+        sources.append(make_source(spreadsheet_id.strip() or default_spreadsheet_id, title.strip(),
+                                   default_spreadsheet_id, default_title, results_title))
+    if not sources:
+        sources.append(make_source(default_spreadsheet_id, default_title,
+                                   default_spreadsheet_id, default_title, results_title))
+    return sources
+
+
+def make_source(spreadsheet_id, title, default_spreadsheet_id, default_title, results_title):
+    """
+    المصدر الافتراضي يحتفظ بأسماء الملفات وورقة النتائج الحالية (key فارغ)
+    وأي مصدر آخر يُميز باسم الورقة (ومعرف الملف إذا كان ملفاً آخر)
+    """
+    if spreadsheet_id == default_spreadsheet_id and title == default_title:
+        return {'spreadsheet_id': spreadsheet_id, 'title': title, 'results_title': results_title, 'key': ''}
+    key = title if spreadsheet_id == default_spreadsheet_id else f"{spreadsheet_id[:10]}-{title}"
+    return {
+        'spreadsheet_id': spreadsheet_id,
+        'title': title,
+        'results_title': f"{results_title}_{title}",
+        'key': re.sub(r'[^\w-]+', '_', key),
+    }
+
+
+def source_file(path, source):
+    """مسار ملف خاص بالمصدر: checkpoints.db -> checkpoints.Voters2.db (المصدر الافتراضي بدون تغيير)"""
+    if not path or not source['key']:
+        return path
+    base, ext = os.path.splitext(path)
+    return f"{base}.{source['key']}{ext}"
+
+
+def describe(source, default_spreadsheet_id):
+    if source['spreadsheet_id'] == default_spreadsheet_id:
+        return f"'{source['title']}'"
+    return f"'{source['title']}' ({source['spreadsheet_id']})"
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار توزيع الصفوف بين نسختين عبر قاعدة الحجز (lease_store.py) بدون إنترنت:
+1. نسختان تحجزان نطاقات مختلفة، والنطاق المتروك تأخذه النسخة الأخرى بعد انتهاء حجزه
+2. نسختان من البوت (شيت في الذاكرة والموقع المحلي) مع أخطاء مؤقتة:
+   كل نسخة تنتهي من القراءة وفي نطاقها أرقام تنتظر إعادة المحاولة بينما تنتظر نطاق الأخرى،
+   ويجب أن تنتهي النسختان وتُكتب كل الصفوف (بدون انتظار متبادل إلى الأبد)
+"""
+
+import io
+import os
+import sys
+import time
+import tempfile
+import threading
+import contextlib
+
+import main as bot_module
+from lease_store import LeaseStore
+from fake_inquiry_site import FakeSiteServer
+from fake_sheets import FakeSheetsClient, synthetic_voters, seed_source_sheet
+
+ROWS = 200
+RUN_TIMEOUT = 180
+
+
+def check(condition, message):
+    if condition:
+        print(f"   ✓ {message}")
+        return True
+    print(f"   ✗ {message}")
+    return False
+
+
+def check_lease_store(workdir):
+    print("\n1️⃣ حجز النطاقات بين نسختين...")
+    path = os.path.join(workdir, 'store.db')
+    first = LeaseStore(path, range_size=100, lease_seconds=1, owner='A')
+    second = LeaseStore(path, range_size=100, lease_seconds=1, owner='B')
+    first.mark_end(201)
+
+    ok = check(first.claim() == (2, 101) and second.claim() == (102, 201), "كل نسخة حجزت نطاقاً مختلفاً")
+
+    # كل نسخة انتهت من قراءة نطاقها وبقي فيه صف واحد لم يُكتب (ينتظر إعادة المحاولة)
+    first.add_rows(2, [2, 3])
+    second.add_rows(102, [102, 103])
+    first.rows_done([2])
+    second.rows_done([102])
+    ok &= check(first.claim() is None and first.others_active() is not None,
+                "النطاق لا يُسجل منتهياً قبل كتابة كل صفوفه")
+
+    first.rows_done([3])
+    second.rows_done([103])
+    ok &= check(first.others_active() is None and second.others_active() is None,
+                "بعد كتابة الصفوف المتبقية لا تنتظر أي نسخة الأخرى")
+
+    for store in (first, second):
+        store.close()
+
+    # نسخة توقفت فجأة بعد حجز نطاق: تأخذه النسخة الأخرى بعد انتهاء مدة الحجز
+    path = os.path.join(workdir, 'crash.db')
+    crashed = LeaseStore(path, range_size=100, lease_seconds=1, owner='crashed')
+    survivor = LeaseStore(path, range_size=100, lease_seconds=1, owner='survivor')
+    crashed.mark_end(101)
+    ok &= check(crashed.claim() == (2, 101) and survivor.claim() is None, "النطاق محجوز للنسخة الأولى")
+    time.sleep(1.2)
+    with contextlib.redirect_stdout(io.StringIO()):
+        taken = survivor.claim()
+    ok &= check(taken == (2, 101), "النطاق المتروك أخذته نسخة أخرى بعد انتهاء الحجز")
+    survivor.close()
+    return ok
+
+
+class ShardedBot(bot_module.VoterInquiryBot):
+    """نفس البوت متصلاً بشيت مشترك في الذاكرة"""
+
+    def __init__(self, client):
+        super().__init__()
+        self.shared_client = client
+
+    def connect_to_sheets(self):
+        self.gc = self.shared_client
+        self.spreadsheet = self.open_spreadsheet()
+
+
+def check_two_bots(workdir):
+    print("\n2️⃣ نسختان من البوت مع أرقام تنتظر إعادة المحاولة...")
+    voters = synthetic_voters(ROWS, duplicate_rate=0)
+    client = FakeSheetsClient()
+    seed_source_sheet(client, bot_module.SPREADSHEET_ID, bot_module.SOURCE_SHEET, voters)
+
+    settings = {
+        'QUERY_BACKEND': 'http',
+        'WORKER_COUNT': 2,
+        'MAX_REQUESTS_PER_SECOND': 0,
+        'RETRY_BASE_DELAY': 1,
+        'RETRY_MAX_DELAY': 2,
+        'RESULTS_FLUSH_INTERVAL': 1,
+        'PIPELINE_STATS_INTERVAL': 60,
+        'LEASE_DB': os.path.join(workdir, 'leases.db'),
+        # نطاقان فقط: كل نسخة تنتهي من نطاقها وتنتظر نطاق الأخرى
+        'LEASE_RANGE_SIZE': ROWS // 2,
+        'LEASE_SECONDS': 30,
+        'LEASE_POLL_INTERVAL': 0.5,
+    }
+    # نسبة Captcha عالية حتى يبقى في نطاق كل نسخة أرقام مؤجلة عند انتهاء القراءة
+    with FakeSiteServer('127.0.0.1', latency=0.01, jitter=0, page_latency=0, captcha_rate=0.3) as site:
+        settings['INQUIRY_URL'] = site.inquiry_url
+        for name, value in settings.items():
+            setattr(bot_module, name, value)
+
+        bots = []
+        for index in range(2):
+            bot_module.CHECKPOINT_DB = os.path.join(workdir, f'checkpoints{index}.db')
+            bots.append(ShardedBot(client))
+
+        errors = []
+
+        def run(bot):
+            try:
+                bot.run()
+            except Exception as e:
+                errors.append(e)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            threads = [threading.Thread(target=run, args=(bot,), daemon=True) for bot in bots]
+            for thread in threads:
+                thread.start()
+            deadline = time.monotonic() + RUN_TIMEOUT
+            for thread in threads:
+                thread.join(max(0, deadline - time.monotonic()))
+
+        ok = check(not any(thread.is_alive() for thread in threads),
+                   f"انتهت النسختان خلال {RUN_TIMEOUT} ثانية")
+        if any(thread.is_alive() for thread in threads):
+            return False
+        ok &= check(not errors, f"بدون أخطاء {errors if errors else ''}")
+
+        results = client.spreadsheet(bot_module.SPREADSHEET_ID).sheet(bot_module.RESULTS_SHEET).rows
+        written = len([row for row in results if row > 1])
+        ok &= check(written == ROWS, f"تمت كتابة {written} من {ROWS} صف")
+        ok &= check(site.counters.get('captcha', 0) > 0,
+                    f"حدثت أخطاء مؤقتة ({site.counters.get('captcha', 0)} Captcha) وتمت إعادة محاولتها")
+        return ok
+
+
+def main():
+    print("=" * 60)
+    print("اختبار توزيع الصفوف بين عدة نسخ")
+    print("=" * 60)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            ok = check_lease_store(workdir)
+            ok &= check_two_bots(workdir)
+        finally:
+            os.chdir(cwd)
+
+    print("\n" + "=" * 60)
+    if not ok:
+        print("✗ فشل الاختبار")
+        sys.exit(1)
+    print("✓ نجح الاختبار")
+
+
+if __name__ == "__main__":
+    main()
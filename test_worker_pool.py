@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار مجموعة العمال بدون إنترنت ولا متصفح (شيت في الذاكرة واستعلام وهمي):
+عامل يفشل في تشغيل متصفحه بعد سحب ناخب من الطابور - الناخب لا يضيع،
+ويكمل العامل الآخر كل الصفوف وينتهي التشغيل
+"""
+
+import io
+import os
+import sys
+import time
+import tempfile
+import threading
+import contextlib
+
+import main as bot_module
+from extraction import empty_result
+from fake_sheets import FakeSheetsClient, synthetic_voters, seed_source_sheet
+
+ROWS = 20
+RUN_TIMEOUT = 60
+
+
+def check(condition, message):
+    if condition:
+        print(f"   ✓ {message}")
+        return True
+    print(f"   ✗ {message}")
+    return False
+
+
+class BrokenWorkerBot(bot_module.VoterInquiryBot):
+    """العامل الأول لا يستطيع تشغيل متصفحه، والاستعلام وهمي لبقية العمال"""
+
+    def __init__(self, client):
+        super().__init__()
+        self.shared_client = client
+
+    def connect_to_sheets(self):
+        self.gc = self.shared_client
+        self.spreadsheet = self.open_spreadsheet()
+
+    def ensure_driver(self):
+        if threading.current_thread().name == 'inquiry-worker-1':
+            raise Exception("تعذر تشغيل Chrome (محاكاة)")
+        return None
+
+    def lookup(self, national_id):
+        time.sleep(0.02)
+        result = empty_result('success')
+        result['مركز_الانتخاب'] = 'مدرسة تجريبية'
+        return result
+
+
+def check_setup_failure(workdir):
+    print("\n1️⃣ عامل يفشل في تشغيل المتصفح بعد سحب ناخب...")
+    client = FakeSheetsClient()
+    seed_source_sheet(client, bot_module.SPREADSHEET_ID, bot_module.SOURCE_SHEET,
+                      synthetic_voters(ROWS, duplicate_rate=0))
+
+    settings = {
+        'QUERY_BACKEND': 'selenium',
+        'WORKER_COUNT': 2,
+        'MAX_REQUESTS_PER_SECOND': 0,
+        'RETRY_BASE_DELAY': 0.5,
+        'RETRY_MAX_DELAY': 1,
+        'RESULTS_FLUSH_INTERVAL': 1,
+        'PIPELINE_STATS_INTERVAL': 60,
+        'LEASE_DB': '',
+        'CHECKPOINT_DB': os.path.join(workdir, 'checkpoints.db'),
+        'RESULT_CACHE_FILE': os.path.join(workdir, 'results_cache.db'),
+    }
+    for name, value in settings.items():
+        setattr(bot_module, name, value)
+
+    bot = BrokenWorkerBot(client)
+    errors = []
+
+    def run():
+        try:
+            bot.run()
+        except Exception as e:
+            errors.append(e)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(RUN_TIMEOUT)
+
+    ok = check(not thread.is_alive(), f"انتهى التشغيل خلال {RUN_TIMEOUT} ثانية")
+    if thread.is_alive():
+        return False
+    ok &= check(not errors, f"بدون أخطاء {errors if errors else ''}")
+
+    results = client.spreadsheet(bot_module.SPREADSHEET_ID).sheet(bot_module.RESULTS_SHEET).rows
+    written = len([row for row in results if row > 1])
+    ok &= check(written == ROWS, f"تمت كتابة {written} من {ROWS} صف")
+    return ok
+
+
+def main():
+    print("=" * 60)
+    print("اختبار مجموعة العمال")
+    print("=" * 60)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            ok = check_setup_failure(workdir)
+        finally:
+            os.chdir(cwd)
+
+    print("\n" + "=" * 60)
+    if not ok:
+        print("✗ فشل الاختبار")
+        sys.exit(1)
+    print("✓ نجح الاختبار")
+
+
+if __name__ == "__main__":
+    main()
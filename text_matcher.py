@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مطابقة الكلمات المفتاحية في نص صفحة النتيجة
+يتم توحيد أشكال الحروف العربية مرة واحدة (إنتخاب/انتخاب، قاعدة/قاعده)
+وبناء تعبير منتظم واحد لجميع الكلمات عند الاستيراد، ثم تصنيف كل أسطر الصفحة في مرور واحد
+"""
+
+import re
+from bisect import bisect_right
+
+# توحيد أشكال الحروف: الهمزات على الألف، التاء المربوطة، الألف المقصورة، التطويل
+# (str.replace أسرع بكثير من str.translate مع الحروف العربية)
+ARABIC_REPLACEMENTS = [
+    ('إ', 'ا'),
+    ('أ', 'ا'),
+    ('آ', 'ا'),
+    ('ٱ', 'ا'),
+    ('ة', 'ه'),
+    ('ى', 'ي'),
+    ('ـ', ''),
+]
+
+# التشكيل (الفتحة، الضمة، الكسرة، الشدة، السكون...)
+ARABIC_DIACRITICS = re.compile('[\u064B-\u0652\u0670]')
+
+# الأرقام العربية (٠-٩) والفارسية (۰-۹) إلى أرقام لاتينية
+DIGITS_TABLE = str.maketrans('٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹', '0123456789' * 2)
+
+# المسافات بأنواعها والحروف غير المرئية التي تظهر عند النسخ من ملفات أخرى
+INVISIBLE_CHARACTERS = re.compile(r'[\s\u200b-\u200f\u202a-\u202e\u2066-\u2069\ufeff]')
+
+
+def normalize_arabic(text):
+    """توحيد النص للمطابقة: أشكال الحروف، حذف التشكيل، والحروف اللاتينية الصغيرة"""
+    for variant, replacement in ARABIC_REPLACEMENTS:
+        if variant in text:
+            text = text.replace(variant, replacement)
+    return ARABIC_DIACRITICS.sub('', text.lower())
+
+
+def normalize_national_id(value):
+    """توحيد كتابة الرقم القومي: حذف المسافات والحروف غير المرئية وتحويل الأرقام العربية"""
+    return INVISIBLE_CHARACTERS.sub('', str(value)).translate(DIGITS_TABLE)
+
+
+class KeywordMatcher:
+    """
+    مطابق متعدد الأنماط: كل مجموعة (تصنيف) لها قائمة كلمات،
+    ويتم البحث عن جميع الكلمات في مرور واحد على النص
+    """
+
+    def __init__(self, groups):
+        keywords = {}
+        for category, words in groups.items():
+            for word in words:
+                keywords.setdefault(normalize_arabic(word), set()).add(category)
+
+        # الكلمة الأطول تحمل أيضاً تصنيفات الكلمات الموجودة داخلها
+        # (مثل "رقم اللجنة الفرعية" تحتوي "اللجنة الفرعية")، لأن المطابقة لا تتداخل
+        self._categories = {
+            word: set().union(*(cats for other, cats in keywords.items() if other in word))
+            for word in keywords
+        }
+
+        # الأطول أولاً حتى لا يحجب النمط القصير نمطاً أطول يبدأ من نفس الموضع
+        alternation = '|'.join(
+            re.escape(word) for word in sorted(keywords, key=len, reverse=True)
+        )
+        self._pattern = re.compile(alternation)
+
+    def find(self, text):
+        """جميع التصنيفات الموجودة في النص"""
+        found = set()
+        for match in self._pattern.finditer(normalize_arabic(text)):
+            found |= self._categories[match.group()]
+        return found
+
+    def classify_lines(self, text):
+        """
+        تصنيف كل أسطر النص في مرور واحد
+        يرجع قاموس {رقم_السطر: مجموعة التصنيفات} للأسطر التي تحتوي على كلمة معروفة فقط
+        """
+        normalized = normalize_arabic(text)
+        line_starts = [0]
+        position = normalized.find('\n')
+        while position != -1:
+            line_starts.append(position + 1)
+            position = normalized.find('\n', position + 1)
+
+        lines = {}
+        for match in self._pattern.finditer(normalized):
+            line_index = bisect_right(line_starts, match.start()) - 1
+            lines.setdefault(line_index, set()).update(self._categories[match.group()])
+        return lines
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مجموعة عمال متوازية للاستعلام: كل عامل له متصفح مستقل ويسحب الناخبين من طابور مشترك،
+وجميع العمال يلتزمون بحد أقصى واحد لعدد الطلبات في الثانية للموقع
+"""
+
+import time
+import queue
+import threading
+
+from extraction import empty_result
+
+
+class RateLimiter:
+    """حد عام لعدد الطلبات في الثانية مشترك بين جميع العمال"""
+
+    def __init__(self, rate_per_second):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def acquire(self, stop_event=None):
+        """انتظار الدور التالي المسموح به (يرجع False إذا تم طلب الإيقاف أثناء الانتظار)"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+
+        delay = slot - time.monotonic()
+        if delay > 0:
+            if stop_event is not None:
+                return not stop_event.wait(delay)
+            time.sleep(delay)
+        return True
+
+
+class BrowserWorkerPool:
+    """
+    تشغيل N عامل في threads مستقلة، كل عامل يستعلم عبر bot.lookup()
+    ويفتح متصفحه الخاص عبر bot.ensure_driver() عند وصول أول ناخب إليه فقط
+    (أو عند الحاجة للرجوع للمتصفح في وضع HTTP)، ويغلقه عبر bot.browsers عند الانتهاء
+    """
+
+    def __init__(self, bot, worker_count, rate_limiter):
+        self.bot = bot
+        self.worker_count = max(1, worker_count)
+        self.rate_limiter = rate_limiter
+        self.stop_event = threading.Event()
+        self.threads = []
+        self._lock = threading.Lock()
+        self._error = None
+        self.workers_ready = 0
+        self.setup_failures = 0
+        self.completed = 0
+
+    def _fail(self, error):
+        """تسجيل أول خطأ قاتل وإيقاف جميع العمال"""
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self.stop_event.set()
+
+    def _next_voter(self, pending, done_marker):
+        """سحب الناخب التالي (أو None عند النهاية أو طلب الإيقاف)"""
+        while not self.stop_event.is_set():
+            try:
+                voter = pending.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            return None if voter is done_marker else voter
+        return None
+
+    def _prepare(self, worker_id):
+        """فتح متصفح العامل قبل أول استعلام (في وضع HTTP يُفتح عند الحاجة فقط)"""
+        if self.bot.http_backend is None:
+            try:
+                self.bot.ensure_driver()
+            except Exception as e:
+                print(f"✗ [عامل {worker_id}] فشل إعداد المتصفح: {str(e)}")
+                with self._lock:
+                    self.setup_failures += 1
+                return False
+
+        with self._lock:
+            self.workers_ready += 1
+        return True
+
+    def _worker(self, worker_id, pending, on_result, done_marker):
+        """حلقة العامل: سحب ناخب، انتظار الدور، الاستعلام، تسليم النتيجة"""
+        ready = False
+        try:
+            while True:
+                voter = self._next_voter(pending, done_marker)
+                if voter is None:
+                    break
+
+                if not ready:
+                    if not self._prepare(worker_id):
+                        # الناخب المسحوب لا يضيع: يُسلم كفشل مؤقت فيُعاد لعامل آخر (أو يُكتب كخطأ)
+                        on_result(voter, empty_result('error', 'تعذر تشغيل متصفح العامل', retryable=True), 0.0)
+                        break
+                    ready = True
+
+                if not self.rate_limiter.acquire(self.stop_event):
+                    break
+
+                print(f"\n[عامل {worker_id}] معالجة: {voter['name']} - {voter['national_id']}")
+                started = time.monotonic()
+                result = self.bot.lookup(voter['national_id'])
+
+                with self._lock:
+                    self.completed += 1
+                on_result(voter, result, time.monotonic() - started)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self.bot.browsers.close()
+
+    def start(self, pending, on_result, done_marker=None):
+        """
+        تشغيل العمال على طابور مشترك؛ كل عامل يتوقف عند سحب done_marker
+        on_result(voter, result, seconds) تُستدعى من thread العامل بترتيب الانتهاء
+        """
+        self.threads = [
+            threading.Thread(
+                target=self._worker,
+                args=(worker_id, pending, on_result, done_marker),
+                name=f"inquiry-worker-{worker_id}",
+                daemon=True
+            )
+            for worker_id in range(1, self.worker_count + 1)
+        ]
+        for worker in self.threads:
+            worker.start()
+
+    def is_alive(self):
+        return any(worker.is_alive() for worker in self.threads)
+
+    def join(self, timeout=None):
+        """انتظار العمال (بمهلة قصيرة حتى يصل KeyboardInterrupt للـ thread الرئيسي)"""
+        for worker in self.threads:
+            worker.join(timeout=timeout)
+
+    def raise_errors(self):
+        """إعادة رفع أول خطأ حدث في أي عامل"""
+        if self._error is not None:
+            raise self._error
+        if self.setup_failures and self.workers_ready == 0:
+            raise Exception("توقفت جميع العمال قبل انتهاء المعالجة - تعذر تشغيل المتصفح")
+
+    def run(self, voters, on_result):
+        """معالجة قائمة ناخبين كاملة، on_result(voter, result) تُستدعى لكل نتيجة بترتيب الانتهاء"""
+        done_marker = object()
+        pending = queue.Queue()
+        for voter in voters:
+            pending.put(voter)
+        for _ in range(self.worker_count):
+            pending.put(done_marker)
+
+        def deliver(voter, result, seconds):
+            # تسليم النتائج واحدة تلو الأخرى
+            with self._lock:
+                on_result(voter, result)
+
+        self.start(pending, deliver, done_marker)
+        try:
+            while self.is_alive():
+                self.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stop_event.set()
+            self.join(timeout=30)
+            raise
+
+        self.raise_errors()